@@ -0,0 +1,91 @@
+"""
+Compares the cost of serializing list responses with FastAPI's default path and with FastJSONResponse.
+
+Run from the project root:
+    python -m benchmarks.serialization
+
+Measured paths for 1k and 10k blogs, subscribers and contacts:
+- before: response model validation + jsonable_encoder + JSONResponse (FastAPI's default for `-> list[Model]`)
+- orjson: response model validation + jsonable_encoder + FastJSONResponse (default_response_class of the app)
+- direct: FastJSONResponse rendering the models directly, skipping validation and jsonable_encoder
+- trusted: FastJSONResponse rendering the raw documents (dicts), as the trusted-read routes do
+"""
+
+import asyncio
+import datetime
+import json
+import timeit
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from src.domain.blog import Blog
+from src.domain.contact import Contact
+from src.domain.subscriber import Subscriber
+from src.utils.responses import FastJSONResponse
+
+SIZES = [1_000, 10_000]
+REPEAT = 5
+
+
+def make_blog(i: int) -> Blog:
+    return Blog(
+        title=f'Naslov {i}',
+        kategorija='python',
+        podnaslov=f'Podnaslov {i}',
+        vsebina='<p>Lorem ipsum dolor sit amet, consectetur adipiscing elit.</p>' * 20,
+        image=f'{i}.jpg',
+        datum_vnosa=datetime.datetime(2024, 1, 1) + datetime.timedelta(minutes=i)
+    )
+
+
+def make_subscriber(i: int) -> Subscriber:
+    return Subscriber(
+        name=f'Ime {i}',
+        surname=f'Priimek {i}',
+        email=f'oseba{i}@example.com',
+        confirmed=i % 2 == 0,
+        datum_vnosa=datetime.datetime(2024, 1, 1) + datetime.timedelta(minutes=i)
+    )
+
+
+def make_contact(i: int) -> Contact:
+    return Contact(
+        name=f'Ime {i}',
+        surname=f'Priimek {i}',
+        email=f'oseba{i}@example.com',
+        message='Pozdravljeni, zanima me sodelovanje. ' * 5,
+        datum_vnosa=datetime.datetime(2024, 1, 1) + datetime.timedelta(minutes=i)
+    )
+
+
+def fastapi_path(response_class, field, items) -> bytes:
+    content = asyncio.run(serialize_response(field=field, response_content=items, is_coroutine=True))
+    return response_class(content).body
+
+
+def main():
+    print(f'{"model":<12}{"items":>8}{"before":>12}{"orjson":>12}{"direct":>12}{"trusted":>12}{"speedup":>10}')
+
+    for model, factory in [(Blog, make_blog), (Subscriber, make_subscriber), (Contact, make_contact)]:
+        field = create_response_field(name=f'Response_{model.__name__}', type_=list[model])
+
+        for size in SIZES:
+            items = [factory(i) for i in range(size)]
+            documents = [item.dict(by_alias=True) for item in items]
+
+            # All paths have to produce the same JSON document
+            assert json.loads(fastapi_path(JSONResponse, field, items)) == json.loads(FastJSONResponse(items).body)
+
+            before = min(timeit.repeat(lambda: fastapi_path(JSONResponse, field, items), number=1, repeat=REPEAT))
+            fast = min(timeit.repeat(lambda: fastapi_path(FastJSONResponse, field, items), number=1, repeat=REPEAT))
+            direct = min(timeit.repeat(lambda: FastJSONResponse(items).body, number=1, repeat=REPEAT))
+            raw = min(timeit.repeat(lambda: FastJSONResponse(documents).body, number=1, repeat=REPEAT))
+
+            print(f'{model.__name__:<12}{size:>8}{before * 1000:>10.1f}ms{fast * 1000:>10.1f}ms'
+                  f'{direct * 1000:>10.1f}ms{raw * 1000:>10.1f}ms{before / raw:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,9 @@
 # Fast API imports
+import argparse
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -10,14 +15,83 @@ from src.domain.book import Book
 from src.domain.contact import Contact
 from src.domain.newsletter import Newsletter
 from src.domain.subscriber import Subscriber
+from src.domain.user import User
 # Imported routes
 from src.routes import index, blog, login, contact, newsletter, \
-    subscriber, book
-from src.services import db
+    subscriber, book, admin, sitemap, image, health
+from src.services import db, background, revocation, stats, visits, views, popular, \
+    related, feed, sitemap as sitemap_service, snapshot, blog_render
 from src.tags_metadata import tags_metadata
+from src.utils.compression import CompressionMiddleware
 from src.utils.domain_to_txt import write_fields_to_txt
+from src.utils import synthetic
+from src.utils.responses import FastJSONResponse
+from src.utils.static_files import OptionalStaticFiles
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Starts the database client and the background jobs when the app starts, and stops them on shutdown.
+    """
+
+    # Create the Mongo client with the pool size and timeouts from env.py
+    db.connect()
+
+    # Create the indexes the routes rely on (no-op if they already exist)
+    db.ensure_indexes()
+
+    # Render blogs stored without the rendered content
+    blog_render.backfill()
+
+    # Load the revoked tokens and keep them in sync with other workers
+    revocation.sync()
+    background.register(revocation.sync, env.REVOCATION_SYNC_SECONDS)
+
+    # Serve the last stored dashboard statistics and rebuild them a few seconds after writes
+    stats.load()
+    background.register(stats.refresh_if_due, 5)
+
+    # Write the buffered start page visits periodically and once more on shutdown
+    background.register(visits.flush, env.VISIT_FLUSH_SECONDS, run_on_shutdown=True)
+
+    # Write the buffered blog and book views periodically (the last flush on shutdown is acknowledged, see below)
+    background.register(views.flush, env.VIEW_FLUSH_SECONDS)
+
+    # Rank the most viewed blogs and keep the ranking in memory
+    popular.load()
+    background.register(popular.refresh_if_due, 5)
 
-app = FastAPI(openapi_tags=tags_metadata)
+    # Recompute the related blogs after blogs change (and once on startup)
+    background.register(related.rebuild_if_dirty, 5)
+
+    # Render the feeds a few seconds after blogs change, and periodically for writes of other workers
+    background.register(feed.rebuild_if_dirty, 5)
+
+    # Build the sitemap and apply content changes to it in the background
+    sitemap_service.load()
+    background.register(sitemap_service.refresh_if_due, 5)
+
+    # Publish the static snapshot on startup and after blogs or books change
+    if snapshot.enabled():
+        background.register(snapshot.publish_if_dirty, 5)
+
+    background.start()
+
+    yield
+
+    # Wait for running jobs and flush the buffers, only then close the pooled connections
+    await background.stop()
+    try:
+        # Wait for the server to store the last views before the client is closed
+        await asyncio.to_thread(views.flush, True)
+    except Exception as e:
+        print(f"Flushing the views failed on shutdown: {e}")
+    db.close()
+
+
+# All routes render JSON with orjson (native datetime handling, falls back to json if orjson is missing)
+app = FastAPI(openapi_tags=tags_metadata, default_response_class=FastJSONResponse, lifespan=lifespan)
 
 # Configure CORS settings
 app.add_middleware(
@@ -25,9 +99,13 @@ app.add_middleware(
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
-    allow_headers=["*"]
+    allow_headers=["*"],
+    expose_headers=["X-Total-Count"]
 )
 
+# Compress responses with brotli or gzip (cached responses are already compressed)
+app.add_middleware(CompressionMiddleware, minimum_size=env.COMPRESSION_MIN_SIZE)
+
 app.include_router(index.router, prefix='/index', tags=['Index'])
 app.include_router(blog.router, prefix='/blog', tags=['Blog'])
 app.include_router(book.router, prefix='/book', tags=['Book'])
@@ -38,26 +116,94 @@ app.include_router(contact.router, prefix='/contact', tags=['Contact'])
 app.include_router(newsletter.router, prefix='/newsletter', tags=['Newsletter'])
 app.include_router(subscriber.router, prefix='/subscriber', tags=['Subscriber'])
 
-if __name__ == '__main__':
+app.include_router(admin.router, prefix='/admin', tags=['Admin'])
+
+app.include_router(image.router, prefix='/image', tags=['Image'])
 
-    # Confirm if you want to drop and seed database
-    yes = input('Type "y" if you want to run drop and seed: ').strip().lower()
-    if yes == 'y':
-        print('drop() and seed() initialized')
+app.include_router(health.router, tags=['Health'])
+
+app.include_router(sitemap.router, tags=['Sitemap'])
+
+# Static snapshots of the public endpoints, the directory is resolved on every request, so swaps are picked up.
+# Until the first release is published the requests get a 404.
+if snapshot.enabled():
+    snapshot_files = OptionalStaticFiles(directory=os.path.join(env.SNAPSHOT_DIR, 'current'), check_dir=False)
+    app.mount('/snapshot', snapshot_files, name='snapshot')
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """
+    Command line of the app. Without a command the server is started.
+
+    Examples:
+        python -m src serve --port 8000
+        python -m src drop
+        python -m src fixtures
+        python -m src normalize-subscribers
+        python -m src seed --blogs 100000 --subscribers 1000000 --seed 42
+        python -m src docs
+    """
+
+    parser = argparse.ArgumentParser(prog='python -m src', description='danilojezernik.com API')
+    commands = parser.add_subparsers(dest='command')
+
+    serve = commands.add_parser('serve', help='start the server (default)')
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=env.PORT)
+
+    commands.add_parser('drop', help='drop the blog, book, contact, newsletter and subscriber collections')
+    commands.add_parser('fixtures', help='upsert the fixtures from src/database (safe to run again)')
+    commands.add_parser('normalize-subscribers',
+                        help='lowercase subscriber emails, merge duplicates and make the email index unique')
+
+    seed = commands.add_parser('seed', help='insert deterministic synthetic data for load tests')
+    for collection in synthetic.GENERATORS:
+        seed.add_argument(f'--{collection}s', type=int, default=0, metavar='N', help=f'number of {collection}s')
+    seed.add_argument('--seed', type=int, default=42, help='the same seed gives the same documents')
+    seed.add_argument('--batch-size', type=int, default=10000, help='documents per insert_many')
+    seed.add_argument('--workers', type=int, default=4, help='batches written in parallel')
+    seed.add_argument('--drop', action='store_true', help='drop the collections first')
+
+    commands.add_parser('docs', help='write the fields of the domain models to output.txt')
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # Command line tools use the same client settings as the server
+    if args.command in ('drop', 'fixtures', 'normalize-subscribers', 'seed'):
+        db.connect()
+
+    if args.command == 'drop':
         db.drop()
-        db.seed()
-    else:
-        print('Database drop and seed skipped')
+        print('Collections dropped')
 
+    elif args.command == 'fixtures':
+        for collection, inserted in db.upsert_fixtures().items():
+            print(f'{collection}: {inserted} inserted')
 
-    # Confirm if you want to write fields to output.txt
-    yes_doc = input('Type "y" if you want to write the document and press enter: ').strip().lower()
-    if yes_doc == 'y':
+    elif args.command == 'normalize-subscribers':
+        print(f'{db.normalize_subscriber_emails()} duplicate subscribers merged, email index is unique')
+
+    elif args.command == 'seed':
+        if args.drop:
+            db.drop()
+        for collection in synthetic.GENERATORS:
+            count = getattr(args, f'{collection}s')
+            if count:
+                synthetic.insert(collection, count, seed=args.seed, batch_size=args.batch_size,
+                                 workers=args.workers)
+
+    elif args.command == 'docs':
         print('Writing fields to output.txt...')
-        write_fields_to_txt(
-            [Blog, Contact, Newsletter, Subscriber, User, Book])
+        write_fields_to_txt([Blog, Contact, Newsletter, Subscriber, User, Book])
         print('Done! Fields have been written to output.txt')
+
     else:
-        print('Document writing aborted')
+        uvicorn.run(app, host=getattr(args, 'host', '127.0.0.1'), port=getattr(args, 'port', env.PORT))
 
-    uvicorn.run(app, host="127.0.0.1", port=env.PORT)
+
+if __name__ == '__main__':
+    main()
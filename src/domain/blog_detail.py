@@ -0,0 +1,11 @@
+from typing import Optional
+
+from src.domain.blog import Blog
+from src.domain.related_blog import RelatedBlog
+
+
+class BlogDetail(Blog):
+    vsebina_html: Optional[str] = None
+    excerpt: Optional[str] = None
+    reading_time: Optional[int] = None
+    related: list[RelatedBlog] = []
@@ -0,0 +1,13 @@
+import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class BlogPatch(BaseModel):
+    title: Optional[str]
+    kategorija: Optional[str]
+    podnaslov: Optional[str]
+    vsebina: Optional[str]
+    image: Optional[str]
+    datum_vnosa: Optional[datetime.datetime]
@@ -0,0 +1,12 @@
+import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class BlogRevision(BaseModel):
+    n: int
+    kind: str
+    author: Optional[str] = None
+    size: int
+    datum_vnosa: datetime.datetime
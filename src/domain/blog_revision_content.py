@@ -0,0 +1,11 @@
+import datetime
+
+from pydantic import BaseModel
+
+
+class BlogRevisionContent(BaseModel):
+    n: int
+    title: str
+    podnaslov: str
+    vsebina: str
+    datum_vnosa: datetime.datetime
@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+
+
+class BulkItemResult(BaseModel):
+    index: int
+    id: str
+    status: str
+    error: str | None = None
@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+
+from src.domain.bulk_item_result import BulkItemResult
+
+
+class BulkResult(BaseModel):
+    ordered: bool
+    inserted: int = 0
+    matched: int = 0
+    modified: int = 0
+    deleted: int = 0
+    items: list[BulkItemResult] = []
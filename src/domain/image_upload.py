@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+
+
+class ImageUpload(BaseModel):
+    image: str
+    width: int
+    height: int
+    variants: dict[str, str] = {}
@@ -0,0 +1,5 @@
+from src.domain.blog import Blog
+
+
+class PopularBlog(Blog):
+    views: int = 0
@@ -0,0 +1,12 @@
+import datetime
+
+from pydantic import BaseModel, Field
+
+
+class RelatedBlog(BaseModel):
+    id: str = Field(alias='_id')
+    title: str
+    kategorija: str
+    podnaslov: str
+    image: str
+    datum_vnosa: datetime.datetime
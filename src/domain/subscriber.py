@@ -2,7 +2,7 @@ import datetime
 from typing import Optional
 
 from bson import ObjectId
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, validator
 
 
 class Subscriber(BaseModel):
@@ -12,3 +12,8 @@ class Subscriber(BaseModel):
     email: str
     confirmed: bool = False
     datum_vnosa: datetime.datetime = Field(default_factory=datetime.datetime.now)
+
+    # Emails are stored lowercase, so the unique index treats differently cased addresses as the same subscriber
+    @validator('email')
+    def normalize_email(cls, email: str) -> str:
+        return email.strip().lower()
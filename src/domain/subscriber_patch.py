@@ -0,0 +1,17 @@
+import datetime
+from typing import Optional
+
+from pydantic import BaseModel, validator
+
+
+class SubscriberPatch(BaseModel):
+    name: Optional[str]
+    surname: Optional[str]
+    email: Optional[str]
+    confirmed: Optional[bool]
+    datum_vnosa: Optional[datetime.datetime]
+
+    # Emails are stored lowercase, see Subscriber
+    @validator('email')
+    def normalize_email(cls, email: str | None) -> str | None:
+        return email.strip().lower() if email is not None else None
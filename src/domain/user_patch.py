@@ -0,0 +1,18 @@
+import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class UserPatch(BaseModel):
+    username: Optional[str]
+    email: Optional[str]
+    full_name: Optional[str]
+    profession: Optional[str]
+    technology: Optional[str]
+    description: Optional[str]
+    hashed_password: Optional[str]
+    confirmed: Optional[bool]
+    registered: Optional[bool]
+    blog_notification: Optional[bool]
+    datum_vnosa: Optional[datetime.datetime]
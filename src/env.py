@@ -9,9 +9,42 @@ PORT = int(os.getenv('PORT'))
 DB_MAIN = str(os.getenv('DB_MAIN'))
 DB_PROCESS = str(os.getenv('DB_PROCESS'))
 
+# Connection pool and timeouts (milliseconds, 0 disables the optional ones), they override the same options in DB_MAIN
+DB_MAX_POOL_SIZE = int(os.getenv('DB_MAX_POOL_SIZE') or 100)
+DB_MIN_POOL_SIZE = int(os.getenv('DB_MIN_POOL_SIZE') or 0)
+DB_MAX_IDLE_TIME_MS = int(os.getenv('DB_MAX_IDLE_TIME_MS') or 0)
+DB_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv('DB_WAIT_QUEUE_TIMEOUT_MS') or 0)
+DB_CONNECT_TIMEOUT_MS = int(os.getenv('DB_CONNECT_TIMEOUT_MS') or 5000)
+DB_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('DB_SERVER_SELECTION_TIMEOUT_MS') or 5000)
+DB_SOCKET_TIMEOUT_MS = int(os.getenv('DB_SOCKET_TIMEOUT_MS') or 20000)
+# Limit for a whole operation (maxTimeMS), it also bounds iterating a cursor, so keep it above the longest export
+DB_MAX_TIME_MS = int(os.getenv('DB_MAX_TIME_MS') or 0)
+
 # Fast API security
 ALGORITHM = str(os.getenv('ALGORITHM'))
 SECRET_KEY = str(os.getenv('SECRET_KEY'))
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE') or 1024)
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv('REFRESH_TOKEN_EXPIRE_DAYS') or 30)
+REVOCATION_SYNC_SECONDS = float(os.getenv('REVOCATION_SYNC_SECONDS') or 5)
+
+# Responses
+RESPONSE_CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL') or 60)
+RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE') or 512)
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE') or 1024)
+COUNT_CACHE_TTL = float(os.getenv('COUNT_CACHE_TTL') or 30)
+COUNT_RESYNC_SECONDS = float(os.getenv('COUNT_RESYNC_SECONDS') or 600)
+STATS_REFRESH_SECONDS = float(os.getenv('STATS_REFRESH_SECONDS') or 300)
+VISIT_FLUSH_SECONDS = float(os.getenv('VISIT_FLUSH_SECONDS') or 5)
+VIEW_FLUSH_SECONDS = float(os.getenv('VIEW_FLUSH_SECONDS') or 10)
+POPULAR_SIZE = int(os.getenv('POPULAR_SIZE') or 100)
+POPULAR_RELOAD_SECONDS = float(os.getenv('POPULAR_RELOAD_SECONDS') or 3600)
+SITEMAP_RELOAD_SECONDS = float(os.getenv('SITEMAP_RELOAD_SECONDS') or 3600)
+
+# Health checks
+HEALTH_CACHE_SECONDS = float(os.getenv('HEALTH_CACHE_SECONDS') or 2)
+HEALTH_TIMEOUT_SECONDS = float(os.getenv('HEALTH_TIMEOUT_SECONDS') or 2)
+HEALTH_MAX_LATENCY_MS = float(os.getenv('HEALTH_MAX_LATENCY_MS') or 500)
+HEALTH_CHECK_SMTP = (os.getenv('HEALTH_CHECK_SMTP') or '').lower() in ('1', 'true', 'yes')
 
 # User in database
 USERNAME = str(os.getenv('USERNAME'))
@@ -26,6 +59,16 @@ GITHUB_TOKEN = str(os.getenv('GITHUB_TOKEN'))
 DOMAIN = str(os.getenv('DOMAIN'))
 DOMAIN_REGISTER = str(os.getenv('DOMAIN_REGISTER'))
 
+# Public URL the sitemap files are served from (the pages of a split sitemap are linked from the index)
+SITEMAP_URL = os.getenv('SITEMAP_URL') or DOMAIN
+
+# Directory of the static JSON snapshots of the public endpoints, disabled if empty
+SNAPSHOT_DIR = os.getenv('SNAPSHOT_DIR') or None
+
+# Uploaded images
+MEDIA_DIR = os.getenv('MEDIA_DIR') or 'media'
+IMAGE_MAX_BYTES = int(os.getenv('IMAGE_MAX_BYTES') or 10 * 1024 * 1024)
+
 # TESTING
 EMAIL_1 = str(os.getenv('EMAIL_1'))
 EMAIL_2 = str(os.getenv('EMAIL_2'))
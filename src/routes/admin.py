@@ -1,9 +1,19 @@
 """
 Route is used to get to the admin page where all the settings are
+
+Routes Overview:
+1. POST / - Check if the user is logged in.
+2. GET /stats - Dashboard statistics.
+3. GET /pool - Database connection pool statistics.
 """
 
+import os
+
 from fastapi import APIRouter, Depends
+
+from src.services import stats, db
 from src.services.security import get_current_user
+from src.utils.responses import FastJSONResponse
 
 router = APIRouter()
 
@@ -12,3 +22,33 @@ router = APIRouter()
 @router.post("/")
 async def post(current_user: str = Depends(get_current_user)):
     return {'msg': 'Ste vpisani!'}
+
+
+# DASHBOARD STATISTICS
+@router.get("/stats", operation_id="get_admin_stats")
+async def get_admin_stats(current_user: str = Depends(get_current_user)):
+    """
+    Returns the dashboard statistics: subscriber growth per month, confirmation rate, contact volume per month,
+    posts per category and books per technology.
+
+    The statistics are precomputed in the background and served from memory.
+    """
+
+    return FastJSONResponse(stats.get())
+
+
+# DATABASE CONNECTION POOL
+@router.get("/pool", operation_id="get_admin_pool")
+async def get_admin_pool(current_user: str = Depends(get_current_user)):
+    """
+    Returns the connection pool statistics of this worker together with the pool settings.
+
+    Use 'max_checked_out' and the wait times to size DB_MAX_POOL_SIZE for the number of workers: every worker
+    has its own pool, so the database sees up to workers * DB_MAX_POOL_SIZE connections.
+    """
+
+    return {
+        'pid': os.getpid(),
+        'settings': db.options(),
+        'stats': db.pool_stats.snapshot()
+    }
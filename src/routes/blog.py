@@ -8,14 +8,34 @@ Routes:
 6. ADD a new blog - Add a new blog to the database.
 7. EDIT a blog by ID - Edit an existing blog by its ID.
 8. DELETE a blog by ID - Delete a blog by its ID.
+9. ADD many blogs - Add many blogs with a single bulk write.
+10. EDIT many blogs - Edit many blogs by their IDs with a single bulk write.
+11. DELETE many blogs - Delete many blogs by their IDs with a single bulk write.
+12. PATCH a blog by ID - Edit only the given fields of a blog by its ID.
+13. GET number of blogs - Retrieve the (cached) number of blogs.
+14. GET popular blogs - Retrieve the most viewed blogs, overall or over the last 7 or 30 days.
+15. GET feed - RSS or Atom feed of the newest blogs, overall or of one category.
+16. GET revisions of a blog - List the stored revisions of a blog (private).
+17. GET revision of a blog - Rebuild one revision of a blog (private).
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Query, Response
+from fastapi.concurrency import run_in_threadpool
 
 from src.domain.blog import Blog
-from src.services import db, blog_notification
+from src.domain.blog_detail import BlogDetail
+from src.domain.blog_patch import BlogPatch
+from src.domain.blog_revision import BlogRevision
+from src.domain.blog_revision_content import BlogRevisionContent
+from src.domain.bulk_result import BulkResult
+from src.domain.popular_blog import PopularBlog
+from src.services import db, blog_notification, trusted, response_cache, hooks, bulk, counts, \
+    views, popular, feed, blog_render, revisions
 from src.services.security import get_current_user
 from src.template import blog_notifications
+from src.utils.responses import FastJSONResponse
 
 router = APIRouter()
 
@@ -25,64 +45,119 @@ THIS ROUTES ARE PUBLIC
 
 
 # This route gets all the blogs from the database
-@router.get('/', operation_id='get_all_blogs_public')
-async def get_all_blogs_public() -> list[Blog]:
+@router.get('/', operation_id='get_all_blogs_public', response_model=list[Blog])
+async def get_all_blogs_public(request: Request):
     """
     This route handles the retrieval of all the blogs from the database
 
-    :return: a list of Blog objects containing all the blogs in the database
+    :return: a list of blogs containing all the blogs in the database
+    """
+
+    # Retrieve all blogs from the database, they were validated on write so they are not validated again
+    # The (precompressed) response is cached until a blog changes
+    def build():
+        blog_list = trusted.find_many(db.process.blog, Blog)
+        return FastJSONResponse(blog_list, headers={'X-Total-Count': str(len(blog_list))})
+
+    return response_cache.cached(request, 'blog', build)
+
+
+# Get the number of blogs
+@router.get('/count', operation_id='count_blogs')
+async def count_blogs():
+    """
+    Returns the number of blogs in the database, for pagination and dashboards.
+    The number is estimated from the collection metadata and cached, so it doesn't scan the collection.
+    """
+
+    return {'count': counts.total('blog')}
+
+
+# Get the most viewed blogs
+@router.get('/popular', operation_id='get_popular_blogs', response_model=list[PopularBlog])
+async def get_popular_blogs(window: Literal['all', '7d', '30d'] = 'all', limit: int = Query(10, ge=1, le=100)):
+    """
+    Returns the most viewed blogs with their number of views, overall or over the last 7 or 30 days.
+    The ranking is kept up to date in memory as views are flushed, so it doesn't sort the collection.
+
+    :param window: 'all', '7d' or '30d'
+    :param limit: The maximum number of blogs to return (at most POPULAR_SIZE are kept)
+    """
+
+    return FastJSONResponse(popular.get(window, limit))
+
+
+# Get the RSS or Atom feed
+@router.get('/feed.xml', operation_id='get_blog_feed', response_class=Response)
+async def get_blog_feed(request: Request, feed_format: Literal['rss', 'atom'] = Query('rss', alias='format'),
+                        kategorija: str | None = None):
+    """
+    Returns the RSS (default) or Atom feed of the newest blogs, optionally of one category.
+    Feeds are rendered in the background after blogs change and sent from memory, requests with a matching
+    If-None-Match get a 304.
+
+    :param feed_format: 'rss' or 'atom'
+    :param kategorija: Only blogs of this category
     """
 
-    # Retrieve all blogs from the database using the find method
-    cursor = db.process.blog.find()
+    # Only the first request of a worker renders the feeds, keep that off the event loop
+    entry = await run_in_threadpool(feed.get, feed_format, kategorija)
 
-    # Create a list of Blog objects by unpacking data from each document retrieved
-    blog_list = [Blog(**document) for document in cursor]
+    # Categories without blogs have no feed
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f'Category ({kategorija}) has no blogs')
 
-    # Return the list of Blog objects
-    return blog_list
+    return response_cache.respond(request, entry)
 
 
 # This route get one blog by its ID
-@router.get('/{_id}', operation_id='get_blog_by_id_public')
-async def get_blog_by_id_public(_id: str):
+@router.get('/{_id}', operation_id='get_blog_by_id_public', response_model=BlogDetail)
+async def get_blog_by_id_public(_id: str, request: Request):
     """
-    This route handles the retrieval of one blog by its ID from the database
+    This route handles the retrieval of one blog by its ID from the database, together with its related blogs
+    (precomputed and stored on the blog)
 
     :param _id: The ID of the blog to be retrieved
     :return: If the blog is found, returns the blog data; otherwise, returns a 404 error
     """
 
-    # Attempt to find a blog in the database based on the provided ID
-    cursor = db.process.blog.find_one({'_id': _id})
+    def build():
+        # Attempt to find a blog in the database based on the provided ID
+        cursor = trusted.find_one(db.process.blog, BlogDetail, {'_id': _id})
 
-    # If no blog is found, return a 404 error with a relevant detail message
-    if cursor is None:
-        raise HTTPException(status_code=404, detail=f'Blog by ID: ({_id}) does not exist')
-    else:
+        # If no blog is found, return a 404 error with a relevant detail message
+        if cursor is None:
+            raise HTTPException(status_code=404, detail=f'Blog by ID: ({_id}) does not exist')
+
+        # New blogs get their related blogs with the next rebuild
+        cursor.setdefault('related', [])
+
+        # If the blog is found, return the document as it is stored
+        return FastJSONResponse(cursor)
 
-        # If the blog is found, convert the cursor data into a Blog object and return it
-        return Blog(**cursor)
+    response = response_cache.cached(request, 'blog', build)
+
+    # Count the view in memory, it is written to the database in the background
+    views.record('blog', _id)
+    return response
 
 
 # This route gets a limited amount of blogs
-@router.get('/limited/', operation_id='get_limited_blogs')
-async def get_limited_blogs(limit: int = 4) -> list[Blog]:
+@router.get('/limited/', operation_id='get_limited_blogs', response_model=list[Blog])
+async def get_limited_blogs(request: Request, limit: int = 4):
     """
     Handles the retrieval of a limited amount of blogs from the database.
 
-    :param limit: The maximum number of blogs to retrieve (default is 2).
-    :return: A list of Blog objects containing information about the limited blogs.
+    :param limit: The maximum number of blogs to retrieve (default is 4).
+    :return: A list of blogs containing information about the limited blogs.
     """
 
-    # Retrieve a limited number of blogs from the database using the limit method
-    cursor = db.process.blog.find().limit(limit)
-
-    # Create a list of Blog objects by unpacking data from each document retrieved
-    blog_limited_list = [Blog(**document) for document in cursor]
+    # Retrieve a limited number of blogs from the database, cached until a blog changes
+    def build():
+        blog_limited_list = trusted.find_many(db.process.blog, Blog, limit=limit)
+        return FastJSONResponse(blog_limited_list, headers={'X-Total-Count': str(counts.total('blog'))})
 
-    # Return the list of Blog objects
-    return blog_limited_list
+    return response_cache.cached(request, 'blog', build, limit=limit)
 
 
 """
@@ -93,27 +168,24 @@ User/Admin has to login!
 
 
 # This route gets all the blogs from the database
-@router.get('/admin/', operation_id='get_all_blogs_private')
-async def get_all_blogs_private(current_user: str = Depends(get_current_user)) -> list[Blog]:
+@router.get('/admin/', operation_id='get_all_blogs_private', response_model=list[Blog])
+async def get_all_blogs_private(current_user: str = Depends(get_current_user)):
     """
     This route handles the retrieval of all the blogs from the database
 
-    :return: a list of Blog objects
+    :return: a list of blogs
     """
 
-    # Retrieve all blogs from the database using the find method
-    cursor = db.process.blog.find()
-
-    # Create a list of Blog objects by unpacking data from each document retrieved
-    blog_list = [Blog(**document) for document in cursor]
+    # Retrieve all blogs from the database, they were validated on write so they are not validated again
+    blog_list = trusted.find_many(db.process.blog, Blog)
 
-    # Return the list of Blog objects
-    return blog_list
+    # Return the list of blogs
+    return FastJSONResponse(blog_list, headers={'X-Total-Count': str(len(blog_list))})
 
 
 # This route get one blog by its ID
-@router.get('/admin/{_id}', operation_id='get_blog_by_id_private')
-async def get_blog_by_id_private(_id: str, current_user: str = Depends(get_current_user)) -> Blog:
+@router.get('/admin/{_id}', operation_id='get_blog_by_id_private', response_model=Blog)
+async def get_blog_by_id_private(_id: str, current_user: str = Depends(get_current_user)):
     """
     This route handles the retrieval of one blog by its ID from the database
 
@@ -123,14 +195,50 @@ async def get_blog_by_id_private(_id: str, current_user: str = Depends(get_curre
     """
 
     # Attempt to find a blog in the database based on the provided ID
-    cursor = db.process.blog.find_one({'_id': _id})
+    cursor = trusted.find_one(db.process.blog, Blog, {'_id': _id})
 
     # If no blog is found, return a 404 error with a relevant detail message
     if cursor is None:
         raise HTTPException(status_code=404, detail=f'Blog by ID: ({_id}) does not exist')
     else:
-        # If the blog is found, convert the cursor data into a Blog object and return it
-        return Blog(**cursor)
+        # If the blog is found, return the document as it is stored
+        return FastJSONResponse(cursor)
+
+
+# This route lists the revisions of a blog
+@router.get('/admin/{_id}/revisions', operation_id='get_blog_revisions_private', response_model=list[BlogRevision])
+async def get_blog_revisions_private(_id: str, current_user: str = Depends(get_current_user)):
+    """
+    This route lists the stored revisions of a blog, newest first, without their content
+
+    :param current_user: Current user that is registered
+    :param _id: The ID of the blog
+    :return: The number, kind (snapshot or delta), author, compressed size and date of every revision
+    """
+
+    return FastJSONResponse(revisions.history(_id))
+
+
+# This route gets one revision of a blog
+@router.get('/admin/{_id}/revisions/{n}', operation_id='get_blog_revision_private',
+            response_model=BlogRevisionContent)
+async def get_blog_revision_private(_id: str, n: int, current_user: str = Depends(get_current_user)):
+    """
+    This route rebuilds one revision of a blog (title, podnaslov and vsebina) from the stored deltas
+
+    :param current_user: Current user that is registered
+    :param _id: The ID of the blog
+    :param n: The number of the revision, 0 is the blog before its first edit
+    :return: The revision, or a 404 error if it is not stored (anymore)
+    """
+
+    revision = revisions.get(_id, n)
+
+    # If the revision is not stored, return a 404 error with a relevant detail message
+    if revision is None:
+        raise HTTPException(status_code=404, detail=f'Revision ({n}) of blog ({_id}) does not exist')
+
+    return FastJSONResponse(revision)
 
 
 # This route adds a new blog
@@ -144,8 +252,8 @@ async def add_new_blog(blog: Blog, current_user: str = Depends(get_current_user)
     :return: If the addition is successful, returns the newly added Blog object; otherwise, returns None.
     """
 
-    # Convert the Blog object to a dictionary for database insertion
-    blog_dict = blog.dict(by_alias=True)
+    # Convert the Blog object to a dictionary for database insertion, with the content rendered once
+    blog_dict = blog_render.with_rendered(blog.dict(by_alias=True))
 
     # Insert the blog data into the database
     insert_result = db.process.blog.insert_one(blog_dict)
@@ -155,6 +263,9 @@ async def add_new_blog(blog: Blog, current_user: str = Depends(get_current_user)
         # If insertion is successful, update the dictionary with the newly assigned _id
         blog_dict['_id'] = str(insert_result.inserted_id)
 
+        # Refresh everything derived from the blogs
+        hooks.content_changed('blog', [blog_dict['_id']])
+
         # Generate the body content for the blog notification email
         body = blog_notifications.html(title=blog.title)
 
@@ -170,39 +281,147 @@ async def add_new_blog(blog: Blog, current_user: str = Depends(get_current_user)
         return None
 
 
+"""
+BULK ROUTES
+
+Must be declared before the /{_id} routes, otherwise /bulk would be matched as an ID.
+"""
+
+
+# This route adds many blogs at once
+@router.post('/bulk', operation_id='add_blogs_bulk_private')
+async def add_blogs_bulk_private(blogs: list[Blog], ordered: bool = True,
+                                 current_user: str = Depends(get_current_user)) -> BulkResult:
+    """
+    Handles the addition of many blogs with a single bulk write.
+
+    :param blogs: The Blog objects to be added.
+    :param ordered: If True, the insertion stops at the first error; otherwise all blogs are attempted.
+    :param current_user: The current user, obtained from the authentication system.
+    :return: The number of inserted blogs and the result of every item.
+    """
+
+    # Insert all blogs with a single round-trip
+    result = bulk.insert_many(db.process.blog, [blog_render.with_rendered(blog.dict(by_alias=True)) for blog in blogs],
+                              ordered)
+
+    # Refresh everything derived from the blogs
+    hooks.content_changed('blog', bulk.succeeded(result))
+
+    return result
+
+
+# This route edits many blogs at once
+@router.put('/bulk', operation_id='edit_blogs_bulk_private')
+async def edit_blogs_bulk_private(blogs: list[Blog], ordered: bool = True,
+                                  current_user: str = Depends(get_current_user)) -> BulkResult:
+    """
+    Handles the editing of many blogs by their IDs with a single bulk write.
+
+    :param blogs: The updated Blog objects, each one must contain the ID of the blog to be edited.
+    :param ordered: If True, the update stops at the first error; otherwise all blogs are attempted.
+    :param current_user: The current user, obtained from the authentication system.
+    :return: The number of matched and modified blogs and the result of every item.
+    """
+
+    # Every item must name the blog it edits
+    bulk.require_ids(blogs)
+
+    # Update all blogs with a single round-trip
+    result = bulk.update_many(db.process.blog, [blog_render.with_rendered(blog.dict(by_alias=True)) for blog in blogs],
+                              ordered)
+
+    # Refresh everything derived from the blogs
+    hooks.content_changed('blog', bulk.succeeded(result))
+
+    return result
+
+
+# This route deletes many blogs at once
+@router.post('/bulk/delete', operation_id='delete_blogs_bulk_private')
+async def delete_blogs_bulk_private(ids: list[str], ordered: bool = True,
+                                    current_user: str = Depends(get_current_user)) -> BulkResult:
+    """
+    Handles the deletion of many blogs by their IDs with a single bulk write.
+
+    :param ids: The IDs of the blogs to be deleted.
+    :param ordered: If True, the deletion stops at the first error; otherwise all blogs are attempted.
+    :param current_user: The current user, obtained from the authentication system.
+    :return: The number of deleted blogs and the result of every item.
+    """
+
+    # Delete all blogs with a single round-trip
+    result = bulk.delete_many(db.process.blog, ids, ordered)
+
+    # Refresh everything derived from the blogs
+    hooks.content_changed('blog', bulk.succeeded(result), deleted=True)
+
+    return result
+
+
 # This route is to edit a blog by its ID
-@router.put('/{_id}', operation_id='edit_blog_by_id_private')
-async def edit_blog_by_id_private(_id: str, blog: Blog, current_user: str = Depends(get_current_user)) -> Blog | None:
+@router.put('/{_id}', operation_id='edit_blog_by_id_private', response_model=Blog)
+async def edit_blog_by_id_private(_id: str, blog: Blog, current_user: str = Depends(get_current_user)):
     """
     Handles the editing of a blog by its ID in the database.
 
     :param _id: The ID of the blog to be edited.
     :param blog: The updated Blog object with the new data.
     :param current_user: The current user, obtained from the authentication system.
-    :return: If the blog is successfully edited, returns the updated Blog object; otherwise, returns None.
+    :return: If the blog exists, returns the updated blog; otherwise, raises a 404 error.
     """
 
-    # Convert the Blog object to a dictionary
-    blog_dict = blog.dict(by_alias=True)
+    # Convert the Blog object to a dictionary, with the content rendered once
+    blog_dict = blog_render.with_rendered(blog.dict(by_alias=True))
 
     # Delete the '_id' field from the blog dictionary to avoid updating the ID
     del blog_dict['_id']
 
-    # Update the blog in the database using the update_one method
-    cursor = db.process.blog.update_one({'_id': _id}, {'$set': blog_dict})
+    # Update the blog and store a revision if the title, subtitle or content changed
+    updated_document = revisions.update(_id, blog_dict, current_user.username)
+
+    # If no blog is found, return a 404 error
+    if updated_document is None:
+        raise HTTPException(status_code=404, detail=f'Blog by ID: ({_id}) not found!')
+
+    # Refresh everything derived from the blogs
+    hooks.content_changed('blog', [_id])
+
+    return FastJSONResponse(updated_document)
 
-    # Check if the blog was successfully updated
-    if cursor.modified_count > 0:
-        # Retrieve the updated blog from the database
-        updated_document = db.process.blog.find_one({'_id': _id})
 
-        # Check if the updated blog exists
-        if updated_document:
-            updated_document['_id'] = str(updated_document['_id'])
-            return Blog(**updated_document)
+# This route is to edit only the given fields of a blog by its ID
+@router.patch('/{_id}', operation_id='patch_blog_by_id_private', response_model=Blog)
+async def patch_blog_by_id_private(_id: str, blog: BlogPatch, current_user: str = Depends(get_current_user)):
+    """
+    Handles the partial editing of a blog by its ID in the database. Only the fields sent by the client are written.
+
+    :param _id: The ID of the blog to be edited.
+    :param blog: The fields of the blog to be changed.
+    :param current_user: The current user, obtained from the authentication system.
+    :return: If the blog exists, returns the updated blog; otherwise, raises a 404 error.
+    """
+
+    # Keep only the fields that were sent (null means unchanged)
+    changes = blog.dict(exclude_unset=True, exclude_none=True)
+
+    if not changes:
+        raise HTTPException(status_code=400, detail='No fields to update')
+
+    # Render the content again if it changed
+    changes = blog_render.with_rendered(changes)
+
+    # Update the blog and store a revision if the title, subtitle or content changed
+    updated_document = revisions.update(_id, changes, current_user.username)
+
+    # If no blog is found, return a 404 error
+    if updated_document is None:
+        raise HTTPException(status_code=404, detail=f'Blog by ID: ({_id}) not found!')
+
+    # Refresh everything derived from the blogs
+    hooks.content_changed('blog', [_id])
 
-    # Return None if the blog was not updated
-    return None
+    return FastJSONResponse(updated_document)
 
 
 # Delete a blog by its ID from the database
@@ -221,6 +440,8 @@ async def delete_blog_by_id_private(_id: str, current_user: str = Depends(get_cu
 
     # Check if the blog was successfully deleted
     if delete_result.deleted_count > 0:
+        # Refresh everything derived from the blogs
+        hooks.content_changed('blog', [_id], deleted=True)
         return {'message': 'Blog deleted successfully!'}
     else:
         # If the blog was not found, raise a 404 error
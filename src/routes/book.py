@@ -5,14 +5,22 @@ Routes Overview:
 3. POST / - Add a new book to the database.
 4. PUT /{_id} - Edit an existing book by its ID.
 5. DELETE /{_id} - Delete a book by its ID.
+6. POST /bulk - Add many books with a single bulk write.
+7. PUT /bulk - Edit many books by their IDs with a single bulk write.
+8. POST /bulk/delete - Delete many books by their IDs with a single bulk write.
+9. PATCH /{_id} - Edit only the given fields of a book by its ID.
+10. GET /count - Retrieve the (cached) number of books.
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 
 from src.domain.book import Book
-from src.services import db
+from src.domain.book_patch import BookPatch
+from src.domain.bulk_result import BulkResult
+from src.services import db, trusted, response_cache, hooks, bulk, counts, views
 
 from src.services.security import get_current_user
+from src.utils.responses import FastJSONResponse
 
 router = APIRouter()
 
@@ -22,27 +30,37 @@ THIS ROUTES ARE PUBLIC
 
 
 # Get all the book from database
-@router.get('/', operation_id='get_all_book_public')
-async def get_all_book_public() -> list[Book]:
+@router.get('/', operation_id='get_all_book_public', response_model=list[Book])
+async def get_all_book_public(request: Request):
     """
     This route handles the retrieval of all the book from the database
 
-    :return: a list of Book objects containing all the book in the database
+    :return: a list of books containing all the book in the database
     """
 
-    # Retrieve all blogs from the database using the find method
-    cursor = db.process.book.find()
+    # Retrieve all books from the database, they were validated on write so they are not validated again
+    # The (precompressed) response is cached until a book changes
+    def build():
+        book_list = trusted.find_many(db.process.book, Book)
+        return FastJSONResponse(book_list, headers={'X-Total-Count': str(len(book_list))})
 
-    # Create a list of Blog objects by unpacking data from each document retrieved
-    book_list = [Book(**document) for document in cursor]
+    return response_cache.cached(request, 'book', build)
 
-    # Return the list of Blog objects
-    return book_list
+
+# Get the number of books
+@router.get('/count', operation_id='count_books')
+async def count_books():
+    """
+    Returns the number of books in the database, for pagination and dashboards.
+    The number is estimated from the collection metadata and cached, so it doesn't scan the collection.
+    """
+
+    return {'count': counts.total('book')}
 
 
 # Get book by its ID
-@router.get('/{_id}', operation_id='get_book_by_id_public')
-async def get_book_by_id_public(_id: str):
+@router.get('/{_id}', operation_id='get_book_by_id_public', response_model=Book)
+async def get_book_by_id_public(_id: str, request: Request):
     """
     This route handles the retrieval of one book by its ID from the database
 
@@ -50,15 +68,22 @@ async def get_book_by_id_public(_id: str):
     :return: If the book is found, returns the book data; otherwise, returns a 404 error
     """
 
-    # Attempt to find book in the database based on the provided ID
-    cursor = db.process.book.find_one({'_id': _id})
+    def build():
+        # Attempt to find book in the database based on the provided ID
+        cursor = trusted.find_one(db.process.book, Book, {'_id': _id})
 
-    # If no book is found, return a 404 error with a relevant detail message
-    if cursor is None:
-        raise HTTPException(status_code=404, detail=f'Book by ID: ({_id}) does not exist')
-    else:
-        # If the book is found, convert the cursor data into a Book object and return it
-        return Book(**cursor)
+        # If no book is found, return a 404 error with a relevant detail message
+        if cursor is None:
+            raise HTTPException(status_code=404, detail=f'Book by ID: ({_id}) does not exist')
+
+        # If the book is found, return the document as it is stored
+        return FastJSONResponse(cursor)
+
+    response = response_cache.cached(request, 'book', build)
+
+    # Count the view in memory, it is written to the database in the background
+    views.record('book', _id)
+    return response
 
 
 """
@@ -67,26 +92,23 @@ THIS ROUTES ARE PRIVATE
 
 
 # Get all the book from database
-@router.get('/admin/', operation_id='get_all_book_private')
-async def get_all_book_private(current_user: str = Depends(get_current_user)) -> list[Book]:
+@router.get('/admin/', operation_id='get_all_book_private', response_model=list[Book])
+async def get_all_book_private(current_user: str = Depends(get_current_user)):
     """
     This route handles the retrieval of all the book from the database
 
-    :return: a list of Book objects containing all the book in the database
+    :return: a list of books containing all the book in the database
     """
 
-    # Retrieve all blogs from the database using the find method
-    cursor = db.process.book.find()
+    # Retrieve all books from the database, they were validated on write so they are not validated again
+    book_list = trusted.find_many(db.process.book, Book)
 
-    # Create a list of Blog objects by unpacking data from each document retrieved
-    book_list = [Book(**document) for document in cursor]
-
-    # Return the list of Blog objects
-    return book_list
+    # Return the list of books
+    return FastJSONResponse(book_list, headers={'X-Total-Count': str(len(book_list))})
 
 
 # Get book by its ID
-@router.get('/admin/{_id}', operation_id='get_book_by_id_private')
+@router.get('/admin/{_id}', operation_id='get_book_by_id_private', response_model=Book)
 async def get_book_by_id_private(_id: str, current_user: str = Depends(get_current_user)):
     """
     This route handles the retrieval of one book by its ID from the database
@@ -97,14 +119,14 @@ async def get_book_by_id_private(_id: str, current_user: str = Depends(get_curre
     """
 
     # Attempt to find book in the database based on the provided ID
-    cursor = db.process.book.find_one({'_id': _id})
+    cursor = trusted.find_one(db.process.book, Book, {'_id': _id})
 
     # If no book is found, return a 404 error with a relevant detail message
     if cursor is None:
         raise HTTPException(status_code=404, detail=f'Book by ID: ({_id}) does not exist')
     else:
-        # If the book is found, convert the cursor data into a Book object and return it
-        return Book(**cursor)
+        # If the book is found, return the document as it is stored
+        return FastJSONResponse(cursor)
 
 
 # This route adds a new book
@@ -131,6 +153,9 @@ async def add_new_book_private(book: Book,
         # Update the dictionary with the newly assigned _id
         book_dict['_id'] = str(book_dict['_id'])
 
+        # Refresh everything derived from the books
+        hooks.content_changed('book', [book_dict['_id']])
+
         # Return the newly added Book object
         return Book(**book_dict)
     else:
@@ -139,17 +164,93 @@ async def add_new_book_private(book: Book,
         return None
 
 
+"""
+BULK ROUTES
+
+Must be declared before the /{_id} routes, otherwise /bulk would be matched as an ID.
+"""
+
+
+# This route adds many books at once
+@router.post('/bulk', operation_id='add_books_bulk_private')
+async def add_books_bulk_private(books: list[Book], ordered: bool = True,
+                                 current_user: str = Depends(get_current_user)) -> BulkResult:
+    """
+    Handles the addition of many books with a single bulk write.
+
+    :param books: The Book objects to be added.
+    :param ordered: If True, the insertion stops at the first error; otherwise all books are attempted.
+    :param current_user: The current user, obtained from the authentication system.
+    :return: The number of inserted books and the result of every item.
+    """
+
+    # Insert all books with a single round-trip
+    result = bulk.insert_many(db.process.book, [book.dict(by_alias=True) for book in books], ordered)
+
+    # Refresh everything derived from the books
+    hooks.content_changed('book', bulk.succeeded(result))
+
+    return result
+
+
+# This route edits many books at once
+@router.put('/bulk', operation_id='edit_books_bulk_private')
+async def edit_books_bulk_private(books: list[Book], ordered: bool = True,
+                                  current_user: str = Depends(get_current_user)) -> BulkResult:
+    """
+    Handles the editing of many books by their IDs with a single bulk write.
+
+    :param books: The updated Book objects, each one must contain the ID of the book to be edited.
+    :param ordered: If True, the update stops at the first error; otherwise all books are attempted.
+    :param current_user: The current user, obtained from the authentication system.
+    :return: The number of matched and modified books and the result of every item.
+    """
+
+    # Every item must name the book it edits
+    bulk.require_ids(books)
+
+    # Update all books with a single round-trip
+    result = bulk.update_many(db.process.book, [book.dict(by_alias=True) for book in books], ordered)
+
+    # Refresh everything derived from the books
+    hooks.content_changed('book', bulk.succeeded(result))
+
+    return result
+
+
+# This route deletes many books at once
+@router.post('/bulk/delete', operation_id='delete_books_bulk_private')
+async def delete_books_bulk_private(ids: list[str], ordered: bool = True,
+                                    current_user: str = Depends(get_current_user)) -> BulkResult:
+    """
+    Handles the deletion of many books by their IDs with a single bulk write.
+
+    :param ids: The IDs of the books to be deleted.
+    :param ordered: If True, the deletion stops at the first error; otherwise all books are attempted.
+    :param current_user: The current user, obtained from the authentication system.
+    :return: The number of deleted books and the result of every item.
+    """
+
+    # Delete all books with a single round-trip
+    result = bulk.delete_many(db.process.book, ids, ordered)
+
+    # Refresh everything derived from the books
+    hooks.content_changed('book', bulk.succeeded(result), deleted=True)
+
+    return result
+
+
 # Edit book by its ID
-@router.put('/{_id}', operation_id='edit_book_by_id_private')
+@router.put('/{_id}', operation_id='edit_book_by_id_private', response_model=Book)
 async def edit_book_by_id_private(_id: str, book: Book,
-                                         current_user: str = Depends(get_current_user)):
+                                  current_user: str = Depends(get_current_user)):
     """
     Handles the editing of book by its ID in the database.
 
     :param _id: The ID of the book to be edited.
     :param book: The updated Book object with the new data.
     :param current_user: The current user, obtained from the authentication system.
-    :return: If the book are successfully edited, returns the updated Book object; otherwise, returns None.
+    :return: If the book exists, returns the updated book; otherwise, raises a 404 error.
     """
 
     # Convert the Book object to a dictionary
@@ -158,21 +259,49 @@ async def edit_book_by_id_private(_id: str, book: Book,
     # Delete the '_id' field from the book dictionary to avoid updating the ID
     del book_dict['_id']
 
-    # Update the book in the database using the update_one method
-    cursor = db.process.book.update_one({'_id': _id}, {'$set': book_dict})
+    # Update the book and get the updated document back in a single round-trip
+    updated_document = trusted.update_one(db.process.book, Book, {'_id': _id}, book_dict)
 
-    # Check if the book were successfully updated
-    if cursor.modified_count > 0:
-        # Retrieve the updated book from the database
-        updated_document = db.process.book.find_one({'_id': _id})
+    # If no book is found, return a 404 error
+    if updated_document is None:
+        raise HTTPException(status_code=404, detail=f'Book with ID: ({_id}) not found!')
 
-        # Check if the updated book exist
-        if updated_document:
-            updated_document['_id'] = str(updated_document['_id'])
-            return Book(**updated_document)
+    # Refresh everything derived from the books
+    hooks.content_changed('book', [_id])
 
-    # Return None if the book were not updated
-    return None
+    return FastJSONResponse(updated_document)
+
+
+# Edit only the given fields of a book by its ID
+@router.patch('/{_id}', operation_id='patch_book_by_id_private', response_model=Book)
+async def patch_book_by_id_private(_id: str, book: BookPatch,
+                                   current_user: str = Depends(get_current_user)):
+    """
+    Handles the partial editing of book by its ID in the database. Only the fields sent by the client are written.
+
+    :param _id: The ID of the book to be edited.
+    :param book: The fields of the book to be changed.
+    :param current_user: The current user, obtained from the authentication system.
+    :return: If the book exists, returns the updated book; otherwise, raises a 404 error.
+    """
+
+    # Keep only the fields that were sent (null means unchanged)
+    changes = book.dict(exclude_unset=True, exclude_none=True)
+
+    if not changes:
+        raise HTTPException(status_code=400, detail='No fields to update')
+
+    # Update the book and get the updated document back in a single round-trip
+    updated_document = trusted.update_one(db.process.book, Book, {'_id': _id}, changes)
+
+    # If no book is found, return a 404 error
+    if updated_document is None:
+        raise HTTPException(status_code=404, detail=f'Book with ID: ({_id}) not found!')
+
+    # Refresh everything derived from the books
+    hooks.content_changed('book', [_id])
+
+    return FastJSONResponse(updated_document)
 
 
 # Delete book by ID
@@ -191,6 +320,9 @@ async def delete_book_by_id_private(_id: str, current_user: str = Depends(get_cu
 
     # Check if the book were successfully deleted
     if delete_results.deleted_count > 0:
+        # Refresh everything derived from the books
+        hooks.content_changed('book', [_id], deleted=True)
+
         # Return a success message if the book were found and deleted
         return {'message': 'Experience deleted successfully'}
     else:
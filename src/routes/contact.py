@@ -4,14 +4,19 @@ Routes Overview:
 2. GET / - Retrieve all emails from the database (private route, requires authentication).
 3. GET /{_id} - Retrieve an email by its ID (private route, requires authentication).
 4. DELETE /{_id} - Delete an email by its ID (private route, requires authentication).
+5. GET /export - Export all emails as a CSV or XLSX download (private route, requires authentication).
+6. GET /count - Retrieve the (cached) number of emails (private route, requires authentication).
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 
 from src.domain.contact import Contact
-from src.services import db, emails
+from src.services import db, emails, trusted, export, hooks, counts
 from src.services.security import get_current_user
 from src.template import email_template
+from src.utils.responses import FastJSONResponse
 
 router = APIRouter()
 
@@ -55,6 +60,7 @@ async def client_sent_email_public(emailing: Contact):
     }
     # Insert the email data into the 'contact' collection of the 'process' database
     db.process.contact.insert_one(email_data)
+    hooks.content_changed('contact', [emailing.id])
 
     # If the email is sent successfully and stored in the database, return a success message
     return {"message": "Message was sent"}
@@ -66,25 +72,51 @@ THIS ROUTES ARE PRIVATE
 
 
 # Get all emails private
-@router.get('/', operation_id='get_all_emails_private')
+@router.get('/', operation_id='get_all_emails_private', response_model=list[Contact])
 async def get_all_emails_private(current_user: str = Depends(get_current_user)):
     """
-    This route handles the retrieval of all the projects from the database
+    This route handles the retrieval of all the emails from the database
 
-    :return: a list of Projects objects containing all the projects in the database
+    :return: a list of emails containing all the emails in the database
     """
 
-    # Retrieve all projects from the database using the find method
-    cursor = db.process.contact.find()
+    # Retrieve all emails from the database, they were validated on write so they are not validated again
+    contact_list = trusted.find_many(db.process.contact, Contact)
+
+    # Return the list of emails
+    return FastJSONResponse(contact_list, headers={'X-Total-Count': str(len(contact_list))})
 
-    # Create a list of Projects objects by unpacking data from each document retrieved
-    contact_list = [Contact(**document) for document in cursor]
 
-    # Return the list of Blog objects
-    return contact_list
+# Get the number of emails
+@router.get('/count', operation_id='count_emails_private')
+async def count_emails_private(current_user: str = Depends(get_current_user)):
+    """
+    Returns the number of emails in the database, for pagination and dashboards.
+    The number is estimated from the collection metadata and cached, so it doesn't scan the collection.
+    """
 
+    return {'count': counts.total('contact')}
+
+
+# Export all emails
+@router.get('/export', operation_id='export_emails')
+async def export_emails(file_format: Literal['csv', 'xlsx'] = Query('csv', alias='format'),
+                        current_user: str = Depends(get_current_user)):
+    """
+    This route exports all emails as a CSV or XLSX download.
 
-@router.get('/{_id}', operation_id='get_email_by_id_admin')
+    Parameters:
+    - format (str): 'csv' (default) or 'xlsx'.
+
+    Behavior:
+    - Streams the rows straight from a database cursor, so memory doesn't grow with the number of emails.
+    - CSV downloads start immediately, XLSX downloads start once the workbook is complete.
+    """
+
+    return export.response(db.process.contact, Contact, file_format, 'emails')
+
+
+@router.get('/{_id}', operation_id='get_email_by_id_admin', response_model=Contact)
 async def get_email_by_id_admin(_id: str):
     """
     This route handles the retrieval of one email by its ID from the database
@@ -94,15 +126,15 @@ async def get_email_by_id_admin(_id: str):
     """
 
     # Attempt to find a project in the database based on the provided ID
-    cursor = db.process.contact.find_one({'_id': _id})
+    cursor = trusted.find_one(db.process.contact, Contact, {'_id': _id})
 
     # If no contact is found, return a 404 error with a relevant detail message
     if cursor is None:
         raise HTTPException(status_code=404, detail=f'Contact by ID: ({_id}) not found!')
     else:
 
-        # If the contact is found, convert the cursor data into a Contact object and return it
-        return Contact(**cursor)
+        # If the contact is found, return the document as it is stored
+        return FastJSONResponse(cursor)
 
 
 # Delete email by ID
@@ -125,6 +157,8 @@ async def delete_email_by_id_private(_id: str, current_user: str = Depends(get_c
 
     # Check if any email was deleted (deleted_count > 0)
     if delete_result.deleted_count > 0:
+        hooks.content_changed('contact', [_id], deleted=True)
+
         # Return a success message if the email was deleted successfully
         return {'message': 'Email deleted successfully'}
     else:
@@ -0,0 +1,41 @@
+"""
+Routes Overview:
+1. GET /healthz - Liveness, the process is running and serving requests.
+2. GET /readyz - Readiness, the dependencies are reachable and fast enough (503 otherwise).
+"""
+
+from fastapi import APIRouter
+
+from src.services import health
+from src.utils.responses import FastJSONResponse
+
+router = APIRouter()
+
+# Probes must always see the current state
+NO_STORE = {'Cache-Control': 'no-store'}
+
+
+# Liveness
+@router.get('/healthz', operation_id='get_healthz')
+async def get_healthz():
+    """
+    Returns 200 while the worker is able to serve requests. It doesn't check the dependencies, so a database
+    outage doesn't get healthy workers restarted.
+    """
+
+    return FastJSONResponse({'status': 'ok'}, headers=NO_STORE)
+
+
+# Readiness
+@router.get('/readyz', operation_id='get_readyz')
+async def get_readyz():
+    """
+    Pings MongoDB (and the SMTP server if HEALTH_CHECK_SMTP is set) and returns the status and latency of every
+    dependency. Returns 503 when a dependency is down or slower than HEALTH_MAX_LATENCY_MS, so load balancers
+    move traffic away from the worker. Results are cached for HEALTH_CACHE_SECONDS.
+    """
+
+    result = await health.readiness()
+    status_code = 200 if result['status'] == 'ok' else 503
+
+    return FastJSONResponse(result, status_code=status_code, headers=NO_STORE)
@@ -0,0 +1,115 @@
+"""
+Routes Overview:
+1. POST / - Upload a blog or book image, it is stored by its content hash and resized variants are generated.
+2. GET /{name} - Get an uploaded image (or a variant), with immutable cache headers and range support.
+"""
+
+import os
+from typing import Callable
+
+from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from fastapi.routing import APIRoute
+
+from src import env
+from src.domain.image_upload import ImageUpload
+from src.services import images
+from src.services.security import get_current_user
+
+# Room for the multipart boundaries and headers around the file
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadLimitRoute(APIRoute):
+    """
+    Rejects uploads with a Content-Length over IMAGE_MAX_BYTES with 413, before FastAPI reads the body.
+    """
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def limited_handler(request: Request) -> Response:
+            length = request.headers.get('content-length')
+            if length is not None and length.isdigit() and int(length) > env.IMAGE_MAX_BYTES + MULTIPART_OVERHEAD:
+                raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                                    detail=f'Image is larger than {env.IMAGE_MAX_BYTES} bytes')
+            return await handler(request)
+
+        return limited_handler
+
+
+router = APIRouter(route_class=UploadLimitRoute)
+
+# Content addressed images never change, so clients and proxies may keep them forever
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+# UPLOAD IMAGE
+@router.post("/", operation_id="upload_image", response_model=ImageUpload)
+async def upload_image(file: UploadFile, current_user: str = Depends(get_current_user)):
+    """
+    This route uploads a blog or book image.
+
+    Parameters:
+    - file (UploadFile): A JPEG, PNG, WEBP or GIF image.
+
+    Behavior:
+    - Rejects a Content-Length over IMAGE_MAX_BYTES with 413 before the upload is read (limit the body size at the
+      proxy as well, uploads without a Content-Length are only checked after they were received).
+    - Rejects files that are not images or have more pixels than Pillow allows with 400.
+    - Streams the file to disk in chunks and names it by its sha256 hash, so duplicates are stored once.
+    - Generates smaller variants (480, 960 and 1920 pixels wide) of larger images.
+    - Returns the name to store in Blog.image or Book.image and the names of the variants.
+    """
+
+    # Hashing, writing and resizing are blocking, so keep them off the event loop
+    try:
+        return await run_in_threadpool(images.save, file.file)
+    except images.InvalidImage as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+# GET IMAGE
+@router.get("/{name}", operation_id="get_image")
+async def get_image(name: str, request: Request):
+    """
+    This route returns an uploaded image or one of its variants.
+
+    Behavior:
+    - Sends immutable cache headers, the name is the hash of the content.
+    - Answers If-None-Match with 304 and a single 'Range: bytes=...' with 206 Partial Content.
+    """
+
+    file_path = images.path(name)
+
+    # If the image doesn't exist, return a 404 error
+    if file_path is None or not os.path.isfile(file_path):
+        raise HTTPException(status_code=404, detail=f'Image ({name}) does not exist')
+
+    size = os.path.getsize(file_path)
+    headers = {
+        'Cache-Control': CACHE_CONTROL,
+        'ETag': f'"{name}"',
+        'Accept-Ranges': 'bytes'
+    }
+    media_type = images.MEDIA_TYPES[name.rsplit('.', 1)[1]]
+
+    # The content of a name never changes, so any cached copy is still valid
+    if request.headers.get('if-none-match') in (headers['ETag'], f'W/{headers["ETag"]}', '*'):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    try:
+        byte_range = images.parse_range(request.headers.get('range'), size)
+    except ValueError:
+        return Response(status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                        headers={**headers, 'Content-Range': f'bytes */{size}'})
+
+    if byte_range is None:
+        return FileResponse(file_path, media_type=media_type, headers=headers)
+
+    first, last = byte_range
+    headers['Content-Range'] = f'bytes {first}-{last}/{size}'
+    headers['Content-Length'] = str(last - first + 1)
+    return StreamingResponse(images.read_range(file_path, first, last), status_code=status.HTTP_206_PARTIAL_CONTENT,
+                             media_type=media_type, headers=headers)
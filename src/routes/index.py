@@ -1,8 +1,12 @@
 from fastapi import APIRouter
 
+from src.services import visits
+
 router = APIRouter()
 
 
 @router.get('/')
 async def get_index():
+    # Count the visit in memory, it is written to the database in the background
+    visits.record()
     return {'page': 'Index'}
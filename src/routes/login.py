@@ -1,6 +1,9 @@
 """
 Routes Overview:
-1. POST / - User authentication route to obtain an access token.
+1. POST / - User authentication route to obtain an access token and a refresh token.
+2. POST /refresh - Exchange a refresh token for a new access token and refresh token.
+3. POST /logout - Revoke the current access token and the refresh token.
+4. POST /revoke/{username} - Sign a user out of all sessions.
 """
 
 from datetime import timedelta
@@ -9,25 +12,30 @@ from typing import Annotated
 from fastapi import Depends, HTTPException, status, APIRouter
 from fastapi.security import OAuth2PasswordRequestForm
 
+from src.domain.refresh_request import RefreshRequest
 from src.domain.token import Token
-from src.services.security import authenticate_user, create_access_token
+from src.services import refresh_tokens, revocation
+from src.services.security import authenticate_user, create_access_token, get_user, get_payload, get_current_user
 
 # Create a new APIRouter instance for this module
 router = APIRouter()
 
+# Access tokens are short-lived, sessions are continued with refresh tokens
+ACCESS_TOKEN_EXPIRE_MINUTES = 30
+
 
 # Route for user authentication and obtaining an access token
 @router.post("/", response_model=Token)
 async def login_for_access_token(form_data: Annotated[OAuth2PasswordRequestForm, Depends()]):
     """
     This route handles user authentication by validating the provided credentials (username and password).
-    If the credentials are correct, it generates an access token and returns it to the client.
+    If the credentials are correct, it generates an access token and a refresh token and returns them to the client.
 
     Args:
         form_data (OAuth2PasswordRequestForm): The user's credentials.
 
     Returns:
-        dict: A dictionary containing the access token and its type.
+        dict: A dictionary containing the access token, its type and the refresh token.
     """
 
     # Authenticate the user using the provided username and password
@@ -42,12 +50,103 @@ async def login_for_access_token(form_data: Annotated[OAuth2PasswordRequestForm,
         )
 
     # Set the expiration time for the access token to 30 minutes
-    access_token_expires = timedelta(minutes=30)
+    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
 
     # Create an access token for the authenticated user
     access_token = create_access_token(
         data={"sub": user.username}, expires_delta=access_token_expires
     )
 
-    # Return the access token and token type
-    return {"access_token": access_token, "token_type": "bearer"}
+    # Start a new refresh token family for this login
+    refresh_token = refresh_tokens.issue(user.username)
+
+    # Return the access token, token type and refresh token
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+
+# Route for continuing a session without the password
+@router.post("/refresh", response_model=Token)
+async def refresh_access_token(request: RefreshRequest):
+    """
+    This route exchanges a refresh token for a new access token and a new refresh token (rotation).
+    It replaces the password login with a single lookup, so the bcrypt check runs only once per session.
+
+    Args:
+        request (RefreshRequest): The refresh token received on login or on the previous refresh.
+
+    Returns:
+        dict: A dictionary containing the new access token, its type and the new refresh token.
+    """
+
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+    # Rotate the refresh token, the old one can't be used again
+    rotated = refresh_tokens.rotate(request.refresh_token)
+
+    if rotated is None:
+        raise credentials_exception
+
+    username, refresh_token = rotated
+
+    # Make sure the user still exists and is allowed to log in
+    user = get_user(username)
+    if user is None or user.registered is False:
+        refresh_tokens.revoke(refresh_token)
+        raise credentials_exception
+
+    # Create a new access token for the user
+    access_token = create_access_token(
+        data={"sub": user.username}, expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+
+# Route for ending a session
+@router.post("/logout")
+async def logout(payload: dict = Depends(get_payload), request: RefreshRequest | None = None):
+    """
+    This route revokes the access token used for the request and, if provided, the refresh token of the session,
+    so the session can't be used or renewed anymore.
+
+    Args:
+        payload (dict): The decoded access token of the current request.
+        request (RefreshRequest | None): The refresh token of the session.
+
+    Returns:
+        dict: A message indicating that the user was logged out.
+    """
+
+    # Revoke the access token before its expiration
+    revocation.revoke_token(payload)
+
+    # Revoke the refresh token so the session can't be renewed
+    if request is not None:
+        refresh_tokens.revoke(request.refresh_token)
+
+    return {"message": "Logged out"}
+
+
+# Route for forced sign-out of a user
+@router.post("/revoke/{username}")
+async def revoke_user_sessions(username: str, current_user: str = Depends(get_current_user)):
+    """
+    This route signs a user out of all sessions by revoking every access token issued to the user so far
+    and all of the user's refresh tokens.
+
+    Args:
+        username (str): The user to sign out.
+        current_user: The current user, obtained from the authentication system.
+
+    Returns:
+        dict: A message indicating that the user was signed out.
+    """
+
+    revocation.revoke_user(username)
+    refresh_tokens.revoke_all(username)
+
+    return {"message": f"User {username} was signed out of all sessions"}
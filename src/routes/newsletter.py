@@ -4,35 +4,69 @@ Routes Overview:
 2. GET /{_id} - Retrieve a specific newsletter by its ID from the database.
 3. DELETE /{_id} - Delete a specific newsletter by its ID from the database.
 4. POST / - Add and send a new newsletter to all recipients.
+5. GET /export - Export all newsletters as a CSV or XLSX download.
+6. GET /count - Retrieve the (cached) number of newsletters.
 """
 
-from fastapi import APIRouter, HTTPException, Depends
+from typing import Literal
+
+from fastapi import APIRouter, HTTPException, Depends, Query
 
 from src.domain.newsletter import Newsletter
-from src.services import newsletters, db
+from src.services import newsletters, db, trusted, export, hooks, counts
 from src.services.security import get_current_user
 from src.template import newsletter_body
+from src.utils.responses import FastJSONResponse
 
 router = APIRouter()
 
 
 # GET ALL NEWSLETTER
-@router.get("/", operation_id="get_all_newsletter")
-async def get_all_newsletter(current_user: str = Depends(get_current_user)) -> list[Newsletter]:
+@router.get("/", operation_id="get_all_newsletter", response_model=list[Newsletter])
+async def get_all_newsletter(current_user: str = Depends(get_current_user)):
     """
     This route handles the retrieval of all newsletter from the database.
 
     Behavior:
-    - Retrieves all newsletter from the database.
-    - Returns a list of Newsletter objects.
+    - Retrieves all newsletter from the database without validating them again (they were validated on write).
+    - Returns a list of newsletters.
+    """
+
+    newsletter_list = trusted.find_many(db.process.newsletter, Newsletter)
+    return FastJSONResponse(newsletter_list, headers={'X-Total-Count': str(len(newsletter_list))})
+
+
+# COUNT NEWSLETTERS
+@router.get("/count", operation_id="count_newsletters_private")
+async def count_newsletters_private(current_user: str = Depends(get_current_user)):
+    """
+    Returns the number of newsletters in the database, for pagination and dashboards.
+    The number is estimated from the collection metadata and cached, so it doesn't scan the collection.
+    """
+
+    return {'count': counts.total('newsletter')}
+
+
+# EXPORT NEWSLETTERS
+@router.get("/export", operation_id="export_newsletters")
+async def export_newsletters(file_format: Literal['csv', 'xlsx'] = Query('csv', alias='format'),
+                             current_user: str = Depends(get_current_user)):
+    """
+    This route exports all newsletters as a CSV or XLSX download.
+
+    Parameters:
+    - format (str): 'csv' (default) or 'xlsx'.
+
+    Behavior:
+    - Streams the rows straight from a database cursor, so memory doesn't grow with the number of newsletters.
+    - CSV downloads start immediately, XLSX downloads start once the workbook is complete.
     """
 
-    cursor = db.process.newsletter.find()
-    return [Newsletter(**document) for document in cursor]
+    return export.response(db.process.newsletter, Newsletter, file_format, 'newsletters')
 
 
 # GET NEWSLETTER BY ID
-@router.get('/{_id}', operation_id='get_newsletter_by_id')
+@router.get('/{_id}', operation_id='get_newsletter_by_id', response_model=Newsletter)
 async def get_newsletter_by_id(_id: str, current_user: str = Depends(get_current_user)):
     """
     This route handles the retrieval of a newsletter by its ID from the database.
@@ -45,11 +79,11 @@ async def get_newsletter_by_id(_id: str, current_user: str = Depends(get_current
     - Returns the Newsletter object if found, or raises an exception if not found.
     """
 
-    cursor = db.process.newsletter.find_one({'_id': _id})
+    cursor = trusted.find_one(db.process.newsletter, Newsletter, {'_id': _id})
     if cursor is None:
         raise HTTPException(status_code=400, detail=f'Newsletter by ID {_id} does not exist')
     else:
-        return Newsletter(**cursor)
+        return FastJSONResponse(cursor)
 
 
 # DELETE NEWSLETTER BY ID
@@ -74,6 +108,7 @@ async def delete_newsletter_by_id(_id: str, current_user: str = Depends(get_curr
 
     # Check if the blog was successfully deleted
     if delete_result.deleted_count > 0:
+        hooks.content_changed('newsletter', [_id], deleted=True)
         return {"message": "Newsletter was successfully deleted"}
     else:
         # Raise an exception if the newsletter was not found for deletion
@@ -100,6 +135,7 @@ async def send_newsletter_to_all(newsletter: Newsletter, current_user: str = Dep
     # Add a new newsletter to the database
     newsletter_dict = newsletter.dict(by_alias=True)
     insert_result = db.process.newsletter.insert_one(newsletter_dict)
+    hooks.content_changed('newsletter', [newsletter_dict['_id']])
 
     # Generate the HTML content for the newsletter
     body = newsletter_body.html_newsletter(title=newsletter.title, content=newsletter.content)
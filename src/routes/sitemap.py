@@ -0,0 +1,37 @@
+"""
+Routes Overview:
+1. GET /sitemap.xml - Sitemap of all blogs and books, or a sitemap index above 50k URLs.
+2. GET /sitemap-{page}.xml - One page of a sitemap that was split.
+"""
+
+from fastapi import APIRouter, HTTPException, Request, Response
+
+from src.services import sitemap, response_cache
+
+router = APIRouter()
+
+
+# Get the sitemap
+@router.get('/sitemap.xml', operation_id='get_sitemap', response_class=Response)
+async def get_sitemap(request: Request):
+    """
+    Returns the sitemap, served precompressed from memory.
+    """
+
+    return response_cache.respond(request, sitemap.get())
+
+
+# Get one page of the sitemap
+@router.get('/sitemap-{page:int}.xml', operation_id='get_sitemap_page', response_class=Response)
+async def get_sitemap_page(page: int, request: Request):
+    """
+    Returns one page of a sitemap that has more than 50k URLs.
+    """
+
+    entry = sitemap.get(page)
+
+    # If there is no such page, return a 404 error
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f'Sitemap page ({page}) does not exist')
+
+    return response_cache.respond(request, entry)
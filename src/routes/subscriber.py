@@ -7,39 +7,85 @@ Routes Overview:
 5. DELETE /{_id} - Delete a subscriber by their ID.
 6. POST /subscribe - Subscribe a client to the newsletter and send a confirmation email.
 7. GET /confirm/{token} - Confirm a client's email for the newsletter subscription.
+8. POST /bulk - Add many subscribers with a single bulk write.
+9. PUT /bulk - Edit many subscribers by their IDs with a single bulk write.
+10. POST /bulk/delete - Delete many subscribers by their IDs with a single bulk write.
+11. POST /import - Import subscribers from a CSV or XLSX file.
+12. GET /export - Export all subscribers as a CSV or XLSX download.
+13. PATCH /{_id} - Edit only the given fields of a subscriber by their ID.
+14. GET /count - Retrieve the (cached) number of subscribers and confirmed subscribers.
 """
 
+import json
 from datetime import timedelta
+from typing import Literal
 
-from fastapi import APIRouter, HTTPException, Depends, status
-from fastapi.responses import RedirectResponse
+from fastapi import APIRouter, HTTPException, Depends, status, UploadFile, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import RedirectResponse, StreamingResponse
+from pymongo.errors import DuplicateKeyError
 
 from src import env
+from src.domain.bulk_result import BulkResult
 from src.domain.subscriber import Subscriber
-from src.services import db, security, emails
+from src.domain.subscriber_patch import SubscriberPatch
+from src.services import db, security, emails, trusted, bulk, hooks, subscriber_import, export, counts
 from src.services.security import get_current_user
 from src.template import confirmation_newsletter_email
+from src.utils.responses import FastJSONResponse
 
 router = APIRouter()
 
 
 # GET ALL SUBSCRIBERS
-@router.get("/", operation_id="get_all_subscribers")
-async def get_all_subscribers(current_user: str = Depends(get_current_user)) -> list[Subscriber]:
+@router.get("/", operation_id="get_all_subscribers", response_model=list[Subscriber])
+async def get_all_subscribers(current_user: str = Depends(get_current_user)):
     """
     This route handles the retrieval of all subscribers from the database.
 
     Behavior:
-    - Retrieves all subscribers from the database.
-    - Returns a list of Subscriber objects.
+    - Retrieves all subscribers from the database without validating them again (they were validated on write).
+    - Returns a list of subscribers.
     """
 
-    cursor = db.process.subscriber.find()
-    return [Subscriber(**document) for document in cursor]
+    subscriber_list = trusted.find_many(db.process.subscriber, Subscriber)
+    return FastJSONResponse(subscriber_list, headers={'X-Total-Count': str(len(subscriber_list))})
+
+
+# COUNT SUBSCRIBERS
+@router.get("/count", operation_id="count_subscribers")
+async def count_subscribers(current_user: str = Depends(get_current_user)):
+    """
+    This route returns the number of subscribers and the number of confirmed subscribers, for pagination and dashboards.
+
+    Behavior:
+    - The total is estimated from the collection metadata and cached, so it doesn't scan the collection.
+    - The confirmed count is counted once and then kept up to date by the routes that change it.
+    """
+
+    return {'count': counts.total('subscriber'), 'confirmed': counts.filtered('confirmed_subscribers')}
+
+
+# EXPORT SUBSCRIBERS
+@router.get("/export", operation_id="export_subscribers")
+async def export_subscribers(file_format: Literal['csv', 'xlsx'] = Query('csv', alias='format'),
+                             current_user: str = Depends(get_current_user)):
+    """
+    This route exports all subscribers as a CSV or XLSX download.
+
+    Parameters:
+    - format (str): 'csv' (default) or 'xlsx'.
+
+    Behavior:
+    - Streams the rows straight from a database cursor, so memory doesn't grow with the number of subscribers.
+    - CSV downloads start immediately, XLSX downloads start once the workbook is complete.
+    """
+
+    return export.response(db.process.subscriber, Subscriber, file_format, 'subscribers')
 
 
 # GET SUBSCRIBER BY ID
-@router.get("/{_id}", operation_id="get_subscriber_by_id")
+@router.get("/{_id}", operation_id="get_subscriber_by_id", response_model=Subscriber)
 async def get_subscriber_id(_id: str, current_user: str = Depends(get_current_user)):
     """
     This route handles the retrieval of a subscriber by its ID from the database.
@@ -53,11 +99,11 @@ async def get_subscriber_id(_id: str, current_user: str = Depends(get_current_us
     """
 
     # Retrieve a blog by its ID from the database
-    cursor = db.process.subscriber.find_one({'_id': _id})
+    cursor = trusted.find_one(db.process.subscriber, Subscriber, {'_id': _id})
     if cursor is None:
         raise HTTPException(status_code=400, detail=f"Subscriber by ID:{_id} does not exist")
     else:
-        return Subscriber(**cursor)
+        return FastJSONResponse(cursor)
 
 
 # ADD SUBSCRIBER
@@ -77,52 +123,216 @@ async def post_subscriber(subscriber: Subscriber, current_user: str = Depends(ge
 
     # Add a new blog to the database
     subscriber_dict = subscriber.dict(by_alias=True)
-    insert_result = db.process.subscriber.insert_one(subscriber_dict)
+    try:
+        insert_result = db.process.subscriber.insert_one(subscriber_dict)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail=f"Subscriber with email ({subscriber.email}) already exists")
 
     # Check if the insertion was acknowledged and update the blog's ID
     if insert_result.acknowledged:
         subscriber_dict['_id'] = str(insert_result.inserted_id)
+
+        hooks.content_changed('subscriber', [subscriber_dict['_id']])
+        if subscriber.confirmed:
+            counts.adjust('confirmed_subscribers', 1)
+
         return Subscriber(**subscriber_dict)
     else:
         return None
 
 
+"""
+BULK ROUTES
+
+Must be declared before the /{_id} routes, otherwise /bulk would be matched as an ID.
+"""
+
+
+# This route adds many subscribers at once
+@router.post('/bulk', operation_id='add_subscribers_bulk_private')
+async def add_subscribers_bulk_private(subscribers: list[Subscriber], ordered: bool = True,
+                                       current_user: str = Depends(get_current_user)) -> BulkResult:
+    """
+    Handles the addition of many subscribers with a single bulk write.
+
+    :param subscribers: The Subscriber objects to be added.
+    :param ordered: If True, the insertion stops at the first error; otherwise all subscribers are attempted.
+    :param current_user: The current user, obtained from the authentication system.
+    :return: The number of inserted subscribers and the result of every item.
+    """
+
+    # Insert all subscribers with a single round-trip
+    result = bulk.insert_many(db.process.subscriber, [subscriber.dict(by_alias=True) for subscriber in subscribers], ordered)
+    counts.invalidate('subscriber', filtered_counts=True)
+
+    # Refresh everything derived from the subscribers
+    hooks.content_changed('subscriber', bulk.succeeded(result))
+
+    return result
+
+
+# This route edits many subscribers at once
+@router.put('/bulk', operation_id='edit_subscribers_bulk_private')
+async def edit_subscribers_bulk_private(subscribers: list[Subscriber], ordered: bool = True,
+                                        current_user: str = Depends(get_current_user)) -> BulkResult:
+    """
+    Handles the editing of many subscribers by their IDs with a single bulk write.
+
+    :param subscribers: The updated Subscriber objects, each one must contain the ID of the subscriber to be edited.
+    :param ordered: If True, the update stops at the first error; otherwise all subscribers are attempted.
+    :param current_user: The current user, obtained from the authentication system.
+    :return: The number of matched and modified subscribers and the result of every item.
+    """
+
+    # Every item must name the subscriber it edits
+    bulk.require_ids(subscribers)
+
+    # Update all subscribers with a single round-trip
+    result = bulk.update_many(db.process.subscriber, [subscriber.dict(by_alias=True) for subscriber in subscribers], ordered)
+    counts.invalidate('subscriber', filtered_counts=True)
+
+    # Refresh everything derived from the subscribers
+    hooks.content_changed('subscriber', bulk.succeeded(result))
+
+    return result
+
+
+# This route deletes many subscribers at once
+@router.post('/bulk/delete', operation_id='delete_subscribers_bulk_private')
+async def delete_subscribers_bulk_private(ids: list[str], ordered: bool = True,
+                                          current_user: str = Depends(get_current_user)) -> BulkResult:
+    """
+    Handles the deletion of many subscribers by their IDs with a single bulk write.
+
+    :param ids: The IDs of the subscribers to be deleted.
+    :param ordered: If True, the deletion stops at the first error; otherwise all subscribers are attempted.
+    :param current_user: The current user, obtained from the authentication system.
+    :return: The number of deleted subscribers and the result of every item.
+    """
+
+    # Delete all subscribers with a single round-trip
+    result = bulk.delete_many(db.process.subscriber, ids, ordered)
+    counts.invalidate('subscriber', filtered_counts=True)
+
+    # Refresh everything derived from the subscribers
+    hooks.content_changed('subscriber', bulk.succeeded(result), deleted=True)
+
+    return result
+
+
+# IMPORT SUBSCRIBERS FROM CSV/XLSX
+@router.post("/import", operation_id="import_subscribers")
+async def import_subscribers(file: UploadFile, batch_size: int = Query(1000, ge=1, le=10000),
+                             current_user: str = Depends(get_current_user)):
+    """
+    This route imports subscribers from an uploaded CSV or XLSX file.
+
+    Parameters:
+    - file (UploadFile): The file, the first row must contain the column names (name/ime, surname/priimek, email).
+    - batch_size (int): The number of subscribers written with one bulk write (1 to 10000).
+
+    Behavior:
+    - Recognizes the encoding (UTF-8, cp1250, latin-1) and the delimiter of CSV files, returns 400 if the file
+      can't be read or has no email column.
+    - Streams the rows of the file, so memory stays bounded for files with hundreds of thousands of rows.
+    - Skips rows without a valid email address and upserts the rest by their lowercased email in batched bulk writes.
+    - Streams the progress as one JSON object per line after every batch, the last line has "done" set to true.
+      If the import fails after the response started, the last line is {"error": ..., "done": true}.
+    """
+
+    # Check the file before the response starts, so an unreadable file gets a proper 400
+    try:
+        rows = await run_in_threadpool(subscriber_import.read_rows, file.file, file.filename or '', batch_size)
+    except subscriber_import.InvalidFile as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    def progress():
+        try:
+            for item in subscriber_import.import_rows(rows, batch_size=batch_size):
+                if item['done']:
+                    hooks.content_changed('subscriber')
+                    counts.invalidate('subscriber', filtered_counts=True)
+                yield json.dumps(item) + '\n'
+        except Exception as e:
+            # The status was already sent, so the error is reported as the last line
+            hooks.content_changed('subscriber')
+            counts.invalidate('subscriber', filtered_counts=True)
+            yield json.dumps({'error': str(e), 'done': True}) + '\n'
+
+    return StreamingResponse(progress(), media_type='application/x-ndjson')
+
+
 # EDIT SUBSCRIBER BY ID
-@router.put("/{_id}")
+@router.put("/{_id}", response_model=Subscriber)
 async def edit_subscriber(_id: str, subscriber: Subscriber,
-                          current_user: str = Depends(get_current_user)) -> Subscriber | None:
+                          current_user: str = Depends(get_current_user)):
     """
     This route edits an existing subscriber by its ID in the database.
 
     Parameters:
     - _id (str): The ID of the subscriber to be edited.
-    - blog (Blog): The updated subscriber object.
+    - subscriber (Subscriber): The updated subscriber object.
     - current_user (str): The username of the authenticated user.
 
     Behavior:
-    - Edits an existing subscriber by its ID in the database.
-    - Returns the updated Subscriber object if successful, or None if unsuccessful.
+    - Edits an existing subscriber by its ID and gets the updated document back in a single round-trip.
+    - Returns the updated subscriber, or raises an exception if the subscriber doesn't exist.
     """
 
     # Edit an existing subscriber by its ID in the database
     subscriber = subscriber.dict(by_alias=True)
     del subscriber['_id']
 
-    # Update the newsletter in the database
-    cursor = db.process.subscriber.update_one({'_id': _id}, {'$set': subscriber})
+    try:
+        updated_document = trusted.update_one(db.process.subscriber, Subscriber, {'_id': _id}, subscriber)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail=f"Subscriber with email ({subscriber['email']}) already exists")
 
-    # Check if the newsletter was successfully updated
-    if cursor.modified_count > 0:
-        # Retrieve the updated newsletter from the database
-        updated_document = db.process.subscriber.find_one({'_id': _id})
+    if updated_document is None:
+        raise HTTPException(status_code=404, detail=f"Subscriber by ID:({_id}) not found")
 
-        # Check if the updated newsletter exists
-        if updated_document:
-            updated_document['_id'] = str(updated_document['_id'])
-            return Subscriber(**updated_document)
+    hooks.content_changed('subscriber', [_id])
+    counts.invalidate('subscriber', filtered_counts=True)
 
-    # Return None if the newsletter was not updated
-    return None
+    return FastJSONResponse(updated_document)
+
+
+# PATCH SUBSCRIBER BY ID
+@router.patch("/{_id}", operation_id="patch_subscriber", response_model=Subscriber)
+async def patch_subscriber(_id: str, subscriber: SubscriberPatch,
+                           current_user: str = Depends(get_current_user)):
+    """
+    This route edits only the given fields of an existing subscriber by its ID in the database.
+
+    Parameters:
+    - _id (str): The ID of the subscriber to be edited.
+    - subscriber (SubscriberPatch): The fields of the subscriber to be changed.
+    - current_user (str): The username of the authenticated user.
+
+    Behavior:
+    - Writes only the fields sent by the client and gets the updated document back in a single round-trip.
+    - Returns the updated subscriber, or raises an exception if the subscriber doesn't exist.
+    """
+
+    # Keep only the fields that were sent (null means unchanged)
+    changes = subscriber.dict(exclude_unset=True, exclude_none=True)
+
+    if not changes:
+        raise HTTPException(status_code=400, detail="No fields to update")
+
+    try:
+        updated_document = trusted.update_one(db.process.subscriber, Subscriber, {'_id': _id}, changes)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail=f"Subscriber with email ({changes['email']}) already exists")
+
+    if updated_document is None:
+        raise HTTPException(status_code=404, detail=f"Subscriber by ID:({_id}) not found")
+
+    hooks.content_changed('subscriber', [_id])
+    if 'confirmed' in changes:
+        counts.invalidate('subscriber', filtered_counts=True)
+
+    return FastJSONResponse(updated_document)
 
 
 # DELETE SUBSCRIBER BY ID
@@ -142,11 +352,14 @@ async def delete_subscriber(_id: str, current_user: str = Depends(get_current_us
         HTTPException: If the blog is not found for deletion.
     """
 
-    # Attempt to delete the blog from the database
-    delete_result = db.process.subscriber.delete_one({'_id': _id})
+    # Attempt to delete the subscriber from the database, returning its confirmation status
+    deleted = db.process.subscriber.find_one_and_delete({'_id': _id}, projection={'confirmed': 1})
 
-    # Check if the blog was successfully deleted
-    if delete_result.deleted_count > 0:
+    # Check if the subscriber was successfully deleted
+    if deleted is not None:
+        hooks.content_changed('subscriber', [_id], deleted=True)
+        if deleted.get('confirmed'):
+            counts.adjust('confirmed_subscribers', -1)
         return {"message": "Subscriber deleted successfully"}
     else:
         # Raise an exception if the blog was not found for deletion
@@ -170,6 +383,10 @@ async def subscribe(subscriber: Subscriber):
     - If any step fails, returns an appropriate error response.
     """
 
+    # Don't send a confirmation for an email that is already subscribed
+    if db.process.subscriber.find_one({'email': subscriber.email}, {'_id': 1}) is not None:
+        raise HTTPException(status_code=409, detail="Email is already subscribed")
+
     # Create an access token with a short expiration time
     token = security.create_access_token(data={'user_id': subscriber.id}, expires_delta=timedelta(minutes=10))
 
@@ -183,7 +400,14 @@ async def subscribe(subscriber: Subscriber):
         return HTTPException(status_code=500, detail="Email not sent")
 
     # Insert the subscriber's data into the database
-    db.process.subscriber.insert_one(subscriber.dict(by_alias=True))
+    try:
+        db.process.subscriber.insert_one(subscriber.dict(by_alias=True))
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="Email is already subscribed")
+
+    hooks.content_changed('subscriber', [subscriber.id])
+    if subscriber.confirmed:
+        counts.adjust('confirmed_subscribers', 1)
 
     return {"message": "Message was sent"}
 
@@ -206,7 +430,10 @@ async def confirm(token: str):
     # Extract the user_id from the confirmation token
     payload = await security.get_payload(token=token)
 
-    # Mark the subscriber as confirmed in the database
-    db.process.subscriber.update_one({"_id": payload['user_id']}, {"$set": {"confirmed": True}})
+    # Mark the subscriber as confirmed in the database (only if not confirmed yet, so the count stays exact)
+    result = db.process.subscriber.update_one({"_id": payload['user_id'], "confirmed": {"$ne": True}},
+                                              {"$set": {"confirmed": True}})
+    if result.modified_count > 0:
+        counts.adjust('confirmed_subscribers', 1)
 
     return RedirectResponse(url=f'{env.DOMAIN}/index', status_code=status.HTTP_303_SEE_OTHER)
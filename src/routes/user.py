@@ -7,13 +7,16 @@ Routes Overview:
 5. GET /admin/{_id} - Retrieves a user by their ID (private).
 6. PUT /{_id} - Edits a user by their ID (private).
 7. DELETE /{_id} - Deletes a user by their ID (private).
+8. PATCH /{_id} - Edits only the given fields of a user by their ID (private).
 """
 
 from fastapi import APIRouter, Depends, HTTPException
 
 from src.domain.user import User
-from src.services import db
+from src.domain.user_patch import UserPatch
+from src.services import db, trusted
 from src.services.security import get_current_user, pwd_context, make_hash
+from src.utils.responses import FastJSONResponse
 
 router = APIRouter()
 
@@ -23,27 +26,24 @@ THIS ROUTES ARE PUBLIC
 
 
 # Get all users from database
-@router.get('/', operation_id='get_user_public')
-async def get_user_public() -> list[User]:
+@router.get('/', operation_id='get_user_public', response_model=list[User])
+async def get_user_public():
     """
     This route handles the retrieval of all the users from the database
 
-    :return: a list of Users objects containing all the users in the database
+    :return: a list of users containing all the users in the database
     """
 
-    # Retrieve all users from the database using the find method
-    cursor = db.process.user.find()
+    # Retrieve all users from the database, they were validated on write so they are not validated again
+    user_list = trusted.find_many(db.process.user, User)
 
-    # Create a list of Users objects by unpacking data from each document retrieved
-    user_list = [User(**document) for document in cursor]
-
-    # Return the list of User objects
-    return user_list
+    # Return the list of users
+    return FastJSONResponse(user_list)
 
 
 # Get user by ID
-@router.get('/{_id}', operation_id='get_user_by_id')
-async def get_user_by_id(_id: str) -> User:
+@router.get('/{_id}', operation_id='get_user_by_id', response_model=User)
+async def get_user_by_id(_id: str):
     """
     This route handles the retrieval of one user by its ID from the database
 
@@ -52,14 +52,14 @@ async def get_user_by_id(_id: str) -> User:
     """
 
     # Attempt to find a user in the database based on the provided ID
-    cursor = db.process.user.find_one({'_id': _id})
+    cursor = trusted.find_one(db.process.user, User, {'_id': _id})
 
     # If no user is found, return a 404 error with a relevant detail message
     if cursor is None:
         raise HTTPException(status_code=404, detail=f'Blog by ID: ({_id}) does not exist')
     else:
-        # If the user is found, convert the cursor data into a User object and return it
-        return User(**cursor)
+        # If the user is found, return the document as it is stored
+        return FastJSONResponse(cursor)
 
 
 """
@@ -68,22 +68,19 @@ THIS ROUTES ARE PRIVATE
 
 
 # Get all users from database
-@router.get('/admin/', operation_id='get_user_private')
-async def get_user_private(current_user: str = Depends(get_current_user)) -> list[User]:
+@router.get('/admin/', operation_id='get_user_private', response_model=list[User])
+async def get_user_private(current_user: str = Depends(get_current_user)):
     """
     This route handles the retrieval of all the users from the database
 
-    :return: a list of Users objects containing all the users in the database
+    :return: a list of users containing all the users in the database
     """
 
-    # Retrieve all users from the database using the find method
-    cursor = db.process.user.find()
-
-    # Create a list of Users objects by unpacking data from each document retrieved
-    user_list = [User(**document) for document in cursor]
+    # Retrieve all users from the database, they were validated on write so they are not validated again
+    user_list = trusted.find_many(db.process.user, User)
 
-    # Return the list of User objects
-    return user_list
+    # Return the list of users
+    return FastJSONResponse(user_list)
 
 
 # ADD USER BY ID
@@ -137,8 +134,8 @@ async def add_new_user(user_data: User, current_user: str = Depends(get_current_
 
 
 # Get user by ID
-@router.get('/admin/{_id}', operation_id='get_user_by_id_admin')
-async def get_user_by_id_admin(_id: str, current_user: str = Depends(get_current_user)) -> User:
+@router.get('/admin/{_id}', operation_id='get_user_by_id_admin', response_model=User)
+async def get_user_by_id_admin(_id: str, current_user: str = Depends(get_current_user)):
     """
     This route handles the retrieval of one user by its ID from the database
 
@@ -148,26 +145,26 @@ async def get_user_by_id_admin(_id: str, current_user: str = Depends(get_current
     """
 
     # Attempt to find a user in the database based on the provided ID
-    cursor = db.process.user.find_one({'_id': _id})
+    cursor = trusted.find_one(db.process.user, User, {'_id': _id})
 
     # If no user is found, return a 404 error with a relevant detail message
     if cursor is None:
         raise HTTPException(status_code=404, detail=f'Blog by ID: ({_id}) does not exist')
     else:
-        # If the user is found, convert the cursor data into a User object and return it
-        return User(**cursor)
+        # If the user is found, return the document as it is stored
+        return FastJSONResponse(cursor)
 
 
 # Define a route for updating a user by ID - password is hashed when changed
-@router.put('/{_id}', operation_id='edit_user_by_id')
-async def edit_user_by_id(_id: str, user: User, current_user: str = Depends(get_current_user)) -> User | None:
+@router.put('/{_id}', operation_id='edit_user_by_id', response_model=User)
+async def edit_user_by_id(_id: str, user: User, current_user: str = Depends(get_current_user)):
     """
     Handles the editing of a user by its ID in the database.
 
     :param current_user: The current user, obtained from the authentication system.
     :param _id: The ID of the user to be edited.
     :param user: The updated User object with the new data.
-    :return: If the user is successfully edited, returns the updated User object; otherwise, returns None.
+    :return: If the user exists, returns the updated user; otherwise, raises a 404 error.
     """
 
     # Convert the user object to a dictionary with alias
@@ -185,23 +182,48 @@ async def edit_user_by_id(_id: str, user: User, current_user: str = Depends(get_
     # Remove '_id' from the dictionary as it shouldn't be updated
     user_dict.pop('_id', None)
 
-    # Update the user document in the database
-    cursor = db.process.user.update_one({'_id': _id}, {'$set': user_dict})
+    # Update the user and get the updated document back in a single round-trip
+    updated_document = trusted.update_one(db.process.user, User, {'_id': _id}, user_dict)
+
+    # If no user is found, return a 404 error
+    if updated_document is None:
+        raise HTTPException(status_code=404, detail=f'User by ID: ({_id}) not found!')
+
+    return FastJSONResponse(updated_document)
 
-    # Check if the user was successfully updated
-    if cursor.modified_count > 0:
-        # Retrieve the updated user from the database
-        updated_document = db.process.user.find_one({'_id': _id})
 
-        # Check if the updated user exists
-        if updated_document:
-            # Convert the ObjectId to a string for the User model
-            updated_document['_id'] = str(updated_document['_id'])
-            # Create a User instance from the updated document
-            return User(**updated_document)
+# Define a route for updating only the given fields of a user by ID - password is hashed when changed
+@router.patch('/{_id}', operation_id='patch_user_by_id', response_model=User)
+async def patch_user_by_id(_id: str, user: UserPatch, current_user: str = Depends(get_current_user)):
+    """
+    Handles the partial editing of a user by its ID in the database. Only the fields sent by the client are written.
+
+    :param current_user: The current user, obtained from the authentication system.
+    :param _id: The ID of the user to be edited.
+    :param user: The fields of the user to be changed.
+    :return: If the user exists, returns the updated user; otherwise, raises a 404 error.
+    """
+
+    # Keep only the fields that were sent (null means unchanged)
+    changes = user.dict(exclude_unset=True, exclude_none=True)
+
+    # Hash the password if it was sent, an empty password leaves the current one unchanged
+    if changes.get('hashed_password'):
+        changes['hashed_password'] = pwd_context.hash(changes['hashed_password'])
+    else:
+        changes.pop('hashed_password', None)
+
+    if not changes:
+        raise HTTPException(status_code=400, detail='No fields to update')
+
+    # Update the user and get the updated document back in a single round-trip
+    updated_document = trusted.update_one(db.process.user, User, {'_id': _id}, changes)
+
+    # If no user is found, return a 404 error
+    if updated_document is None:
+        raise HTTPException(status_code=404, detail=f'User by ID: ({_id}) not found!')
 
-    # Return None if the user was not updated
-    return None
+    return FastJSONResponse(updated_document)
 
 
 # Delete user by ID
@@ -0,0 +1,81 @@
+import asyncio
+from typing import Callable
+
+# Seconds stop() waits for running jobs to finish
+STOP_TIMEOUT = 30
+
+# Registered periodic jobs: (function, interval in seconds, run once more on shutdown)
+_jobs: list[tuple[Callable[[], None], float, bool]] = []
+_tasks: list[asyncio.Task] = []
+
+# Set by stop(), the jobs finish their current run and exit
+_stopping: asyncio.Event | None = None
+
+
+def register(job: Callable[[], None], interval: float, run_on_shutdown: bool = False):
+    """
+    Registers a blocking function that is run periodically in a worker thread while the app is running.
+
+    Args:
+        job (Callable): The function to run, it must not take any arguments.
+        interval (float): Seconds to wait between two runs.
+        run_on_shutdown (bool): Run the job once more when the app shuts down, for example to flush buffers.
+    """
+    _jobs.append((job, interval, run_on_shutdown))
+
+
+async def _run(job: Callable[[], None], interval: float, stopping: asyncio.Event):
+    while not stopping.is_set():
+        # Wait for the next run, or return right away when the app stops
+        try:
+            await asyncio.wait_for(stopping.wait(), interval)
+            return
+        except asyncio.TimeoutError:
+            pass
+
+        try:
+            # Jobs use the blocking pymongo client, so keep them off the event loop
+            await asyncio.to_thread(job)
+        except Exception as e:
+            print(f"Background job {job.__name__} failed: {e}")
+
+
+def start():
+    """
+    Starts all registered jobs on the running event loop.
+    """
+
+    global _stopping
+    _stopping = asyncio.Event()
+
+    for job, interval, _ in _jobs:
+        _tasks.append(asyncio.create_task(_run(job, interval, _stopping), name=job.__name__))
+
+
+async def stop():
+    """
+    Stops all jobs and runs the jobs registered with run_on_shutdown one last time. A job that is running is
+    awaited (at most STOP_TIMEOUT seconds), cancelling it wouldn't stop its worker thread, which could then run
+    concurrently with the last run or with closing the database client. The jobs are unregistered, so they can
+    be registered again when the app starts again.
+    """
+
+    if _stopping is not None:
+        _stopping.set()
+
+    if _tasks:
+        _, pending = await asyncio.wait(_tasks, timeout=STOP_TIMEOUT)
+        for task in pending:
+            print(f"Background job {task.get_name()} didn't finish in {STOP_TIMEOUT} seconds")
+            task.cancel()
+        await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
+
+    for job, _, run_on_shutdown in _jobs:
+        if run_on_shutdown:
+            try:
+                await asyncio.to_thread(job)
+            except Exception as e:
+                print(f"Background job {job.__name__} failed on shutdown: {e}")
+
+    _jobs.clear()
@@ -0,0 +1,95 @@
+"""
+Rendering of blog content at write time.
+
+'vsebina' is written in Markdown (HTML is allowed). When a blog is added or edited it is rendered to HTML and
+sanitized once, and the result is stored on the blog together with a plain-text excerpt and the estimated
+reading time, so reads only look them up.
+"""
+
+import html
+import math
+import re
+
+import bleach
+import markdown
+
+from src.services import db
+
+# Tags and attributes kept in the rendered HTML, other tags are stripped (their text is kept), other attributes dropped
+ALLOWED_TAGS = bleach.sanitizer.ALLOWED_TAGS | {
+    'p', 'br', 'hr', 'pre', 'span', 'div', 'img', 'del',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'table', 'thead', 'tbody', 'tr', 'th', 'td'
+}
+ALLOWED_ATTRIBUTES = {
+    **bleach.sanitizer.ALLOWED_ATTRIBUTES,
+    'img': ['src', 'alt', 'title', 'width', 'height'],
+    'code': ['class'],
+    'span': ['class'],
+    'div': ['class'],
+    'th': ['align'],
+    'td': ['align']
+}
+ALLOWED_PROTOCOLS = {'http', 'https', 'mailto'}
+
+# Number of characters in the excerpt
+EXCERPT_LENGTH = 200
+
+# Reading speed used for the reading time estimate
+WORDS_PER_MINUTE = 200
+
+# Fields added to the stored blog
+FIELDS = ('vsebina_html', 'excerpt', 'reading_time')
+
+
+def render(vsebina: str) -> dict:
+    """
+    Renders the content of a blog.
+
+    Args:
+        vsebina (str): The Markdown content.
+
+    Returns:
+        dict: The sanitized HTML ('vsebina_html'), a plain-text excerpt ('excerpt') and the reading time in
+        minutes ('reading_time').
+    """
+
+    rendered = markdown.markdown(vsebina, extensions=['fenced_code', 'tables', 'sane_lists'])
+    vsebina_html = bleach.clean(rendered, tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES,
+                                protocols=ALLOWED_PROTOCOLS, strip=True)
+
+    # Plain text without tags and entities, with collapsed whitespace
+    text = ' '.join(html.unescape(bleach.clean(vsebina_html, tags=set(), strip=True)).split())
+
+    # Cut the excerpt at a word boundary
+    excerpt = text
+    if len(text) > EXCERPT_LENGTH:
+        excerpt = text[:EXCERPT_LENGTH].rsplit(' ', 1)[0].rstrip('.,;:') + '…'
+
+    words = len(re.findall(r'\w+', text))
+
+    return {
+        'vsebina_html': vsebina_html,
+        'excerpt': excerpt,
+        'reading_time': max(1, math.ceil(words / WORDS_PER_MINUTE))
+    }
+
+
+def with_rendered(blog: dict) -> dict:
+    """
+    Returns the blog document (or the changed fields of a blog) with the rendered fields added, if it contains
+    'vsebina'.
+    """
+
+    if 'vsebina' not in blog:
+        return blog
+    return {**blog, **render(blog['vsebina'])}
+
+
+def backfill():
+    """
+    Renders the blogs that were written without the rendered fields, for example before rendering was added.
+    """
+
+    for blog in db.process.blog.find({'vsebina_html': {'$exists': False}}, {'vsebina': 1}):
+        db.process.blog.update_one({'_id': blog['_id']}, {'$set': render(blog.get('vsebina') or '')})
@@ -0,0 +1,117 @@
+from fastapi import HTTPException, status
+from pydantic import BaseModel
+from pymongo import InsertOne, UpdateOne, DeleteOne
+from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError
+
+from src.domain.bulk_item_result import BulkItemResult
+from src.domain.bulk_result import BulkResult
+
+
+def _existing(collection: Collection, ids: list[str]) -> set[str]:
+    # The IDs that exist, read with a single query
+    return {document['_id'] for document in collection.find({'_id': {'$in': ids}}, {'_id': 1})}
+
+
+def _write(collection: Collection, ids: list[str], requests: list, ordered: bool,
+           existing: set[str] | None = None) -> BulkResult:
+    """
+    Executes the write requests in a single bulk_write and reports the result of every item.
+
+    Args:
+        collection (Collection): The collection to write to.
+        ids (list[str]): The document ID of every request, in the same order.
+        requests (list): The pymongo write requests.
+        ordered (bool): Ordered writes stop at the first error, unordered writes execute every request.
+        existing (set[str] | None): For updates and deletes, the IDs that existed before the write.
+
+    Returns:
+        BulkResult: The totals and the status of every item ('ok', 'not_found', 'error' or 'skipped').
+    """
+
+    if not requests:
+        return BulkResult(ordered=ordered)
+
+    try:
+        details = collection.bulk_write(requests, ordered=ordered).bulk_api_result
+    except BulkWriteError as e:
+        details = e.details
+
+    errors = {error['index']: error['errmsg'] for error in details['writeErrors']}
+
+    # Ordered writes stop at the first error, the requests after it were not executed
+    stopped_at = min(errors) if ordered and errors else None
+
+    items = []
+    for index, _id in enumerate(ids):
+        if index in errors:
+            items.append(BulkItemResult(index=index, id=_id, status='error', error=errors[index]))
+        elif stopped_at is not None and index > stopped_at:
+            items.append(BulkItemResult(index=index, id=_id, status='skipped'))
+        elif existing is not None and _id not in existing:
+            items.append(BulkItemResult(index=index, id=_id, status='not_found'))
+        else:
+            items.append(BulkItemResult(index=index, id=_id, status='ok'))
+
+    return BulkResult(
+        ordered=ordered,
+        inserted=details['nInserted'],
+        matched=details['nMatched'],
+        modified=details['nModified'],
+        deleted=details['nRemoved'],
+        items=items
+    )
+
+
+def insert_many(collection: Collection, documents: list[dict], ordered: bool = True) -> BulkResult:
+    """
+    Inserts the documents with a single bulk write.
+    """
+    return _write(collection, [document['_id'] for document in documents],
+                  [InsertOne(document) for document in documents], ordered)
+
+
+def require_ids(models: list[BaseModel]):
+    """
+    Raises a 422 error if an item of a bulk edit was sent without '_id'. The domain models generate a new ID when
+    it is missing, so such an item would silently update nothing.
+    """
+
+    missing = [
+        {'loc': ['body', index, '_id'], 'msg': 'field required', 'type': 'value_error.missing'}
+        for index, model in enumerate(models)
+        if 'id' not in model.__fields_set__
+    ]
+
+    if missing:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=missing)
+
+
+def update_many(collection: Collection, documents: list[dict], ordered: bool = True) -> BulkResult:
+    """
+    Updates every document by its '_id' with a single bulk write, setting all the other fields. IDs that don't
+    exist are reported as 'not_found'.
+    """
+
+    ids = [document['_id'] for document in documents]
+
+    requests = []
+    for document in documents:
+        fields = {key: value for key, value in document.items() if key != '_id'}
+        requests.append(UpdateOne({'_id': document['_id']}, {'$set': fields}))
+
+    return _write(collection, ids, requests, ordered, _existing(collection, ids))
+
+
+def delete_many(collection: Collection, ids: list[str], ordered: bool = True) -> BulkResult:
+    """
+    Deletes the documents by their IDs with a single bulk write. IDs that don't exist are reported as 'not_found'.
+    """
+    return _write(collection, ids, [DeleteOne({'_id': _id}) for _id in ids], ordered, _existing(collection, ids))
+
+
+def succeeded(result: BulkResult) -> list[str]:
+    """
+    Returns the IDs of the items that were written without an error.
+    """
+    return [item.id for item in result.items if item.status == 'ok']
@@ -0,0 +1,78 @@
+"""
+Cached document counts for pagination headers and dashboards.
+
+Total counts use estimated_document_count (collection metadata, no scan) and are cached for COUNT_CACHE_TTL
+seconds. Filtered counts are counted once with count_documents and then maintained incrementally by the routes
+that change them; they are recounted every COUNT_RESYNC_SECONDS to correct writes made by other workers.
+"""
+
+import time
+
+from src import env
+from src.services import db
+
+# Filtered counts by name: (collection, filter)
+FILTERS = {
+    'confirmed_subscribers': ('subscriber', {'confirmed': True})
+}
+
+# Cached counts: name -> (count, monotonic time it was read from the database)
+_totals: dict[str, tuple[int, float]] = {}
+_filtered: dict[str, tuple[int, float]] = {}
+
+
+def total(collection: str) -> int:
+    """
+    Returns the (estimated) number of documents in a collection.
+    """
+
+    cached = _totals.get(collection)
+    if cached is not None and cached[1] + env.COUNT_CACHE_TTL > time.monotonic():
+        return cached[0]
+
+    count = db.process[collection].estimated_document_count()
+    _totals[collection] = (count, time.monotonic())
+    return count
+
+
+def filtered(name: str) -> int:
+    """
+    Returns the exact number of documents matching one of the FILTERS.
+    """
+
+    cached = _filtered.get(name)
+    if cached is not None and cached[1] + env.COUNT_RESYNC_SECONDS > time.monotonic():
+        return cached[0]
+
+    collection, query = FILTERS[name]
+    count = db.process[collection].count_documents(query)
+    _filtered[name] = (count, time.monotonic())
+    return count
+
+
+def adjust(name: str, delta: int):
+    """
+    Applies a known change to a filtered count, for example +1 when a subscriber confirms the subscription.
+    """
+
+    cached = _filtered.get(name)
+    if cached is not None:
+        _filtered[name] = (cached[0] + delta, cached[1])
+
+
+def invalidate(collection: str, filtered_counts: bool = False):
+    """
+    Drops the cached total of a collection, so the next read gets the new number of documents.
+
+    Args:
+        collection (str): The collection that changed.
+        filtered_counts (bool): Also drop the filtered counts of the collection, for writes whose effect on them
+            is unknown (edits, bulk writes, imports).
+    """
+
+    _totals.pop(collection, None)
+
+    if filtered_counts:
+        for name, (filter_collection, _) in FILTERS.items():
+            if filter_collection == collection:
+                _filtered.pop(name, None)
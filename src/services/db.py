@@ -1,15 +1,146 @@
-from pymongo import MongoClient
+import threading
+import time
+
+from pymongo import MongoClient, UpdateOne, monitoring
+from pymongo.errors import OperationFailure
+from pymongo.database import Database
 
 from src import env
 
-from src.database.blog import blog
-from src.database.book import book
-from src.database.contact import contact
-from src.database.newsletter import newsletter
-from src.database.subscriber import subscriber
+# Created by connect() when the app starts (see the lifespan in src/__main__.py) or a command line tool runs
+client: MongoClient | None = None
+process: Database | None = None
+
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """
+    Counts connection pool events, so the pool can be sized for the number of workers (see GET /admin/pool).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started = threading.local()
+        self.created = 0
+        self.closed = 0
+        self.checked_out = 0
+        self.max_checked_out = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.clears = 0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                'open': self.created - self.closed,
+                'created': self.created,
+                'closed': self.closed,
+                'checked_out': self.checked_out,
+                'max_checked_out': self.max_checked_out,
+                'checkouts': self.checkouts,
+                'checkout_failures': self.checkout_failures,
+                'wait_avg_ms': round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                'wait_max_ms': round(self.wait_max * 1000, 3),
+                'clears': self.clears
+            }
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.clears += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.created += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.closed += 1
+
+    def connection_check_out_started(self, event):
+        # Connections are checked out in the thread that runs the operation
+        self._started.time = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        wait = time.perf_counter() - getattr(self._started, 'time', time.perf_counter())
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+
+pool_stats = PoolStats()
+
+
+def options() -> dict:
+    """
+    Returns the client options from the environment (see src/env.py).
+    """
+
+    kwargs = {
+        'maxPoolSize': env.DB_MAX_POOL_SIZE,
+        'minPoolSize': env.DB_MIN_POOL_SIZE,
+        'maxIdleTimeMS': env.DB_MAX_IDLE_TIME_MS or None,
+        'waitQueueTimeoutMS': env.DB_WAIT_QUEUE_TIMEOUT_MS or None,
+        'connectTimeoutMS': env.DB_CONNECT_TIMEOUT_MS,
+        'serverSelectionTimeoutMS': env.DB_SERVER_SELECTION_TIMEOUT_MS,
+        'socketTimeoutMS': env.DB_SOCKET_TIMEOUT_MS or None
+    }
+
+    # Client side operation timeout, the driver also sends it to the server as maxTimeMS
+    if env.DB_MAX_TIME_MS:
+        kwargs['timeoutMS'] = env.DB_MAX_TIME_MS
+
+    return kwargs
+
+
+def connect():
+    """
+    Creates the client, does nothing if it already exists. The client connects in the background, so this doesn't
+    wait for the database.
+    """
+
+    global client, process
+
+    if client is not None:
+        return
+
+    client = MongoClient(env.DB_MAIN, event_listeners=[pool_stats], **options())
+    process = client[env.DB_PROCESS]
+
+
+def close():
+    """
+    Closes the client and all its pooled connections.
+    """
 
-client = MongoClient(env.DB_MAIN)
-process = client[env.DB_PROCESS]
+    global client, process
+
+    if client is not None:
+        client.close()
+    client = process = None
 
 
 def drop():
@@ -18,13 +149,134 @@ def drop():
     process.newsletter.drop()
     process.subscriber.drop()
     process.book.drop()
-    pass
-
-def seed():
-    process.blog.insert_many(blog)
-    process.contact.insert_many(contact)
-    process.newsletter.insert_many(newsletter)
-    process.subscriber.insert_many(subscriber)
-    process.book.insert_many(book)
-    pass
+
+
+# Fields identifying a fixture, so running upsert_fixtures() again doesn't duplicate it
+FIXTURE_KEYS = {
+    'blog': ('title',),
+    'book': ('naslov',),
+    'contact': ('email', 'message'),
+    'newsletter': ('title', 'content'),
+    'subscriber': ('email',)
+}
+
+
+def upsert_fixtures() -> dict[str, int]:
+    """
+    Writes the fixtures from src/database by their natural keys (see FIXTURE_KEYS). Existing documents keep
+    their ID and datum_vnosa and get the fixture's other fields, missing ones are inserted.
+
+    Returns:
+        dict[str, int]: The number of inserted documents per collection.
+    """
+
+    from src.database.blog import blog
+    from src.database.book import book
+    from src.database.contact import contact
+    from src.database.newsletter import newsletter
+    from src.database.subscriber import subscriber
+    from src.services import blog_render
+
+    fixtures = {'blog': blog, 'book': book, 'contact': contact, 'newsletter': newsletter, 'subscriber': subscriber}
+    inserted = {}
+
+    for collection, documents in fixtures.items():
+        operations = []
+        for document in documents:
+            # Subscriber emails are stored lowercase (see ensure_indexes)
+            if collection == 'subscriber':
+                document = {**document, 'email': document['email'].strip().lower()}
+
+            # Blogs are stored with their rendered content, backfill() only renders blogs that have none
+            if collection == 'blog':
+                document = blog_render.with_rendered(document)
+
+            key = {field: document[field] for field in FIXTURE_KEYS[collection]}
+            fields = {field: value for field, value in document.items() if field not in ('_id', 'datum_vnosa')}
+            operations.append(UpdateOne(key, {
+                '$set': fields,
+                '$setOnInsert': {'_id': document['_id'], 'datum_vnosa': document['datum_vnosa']}
+            }, upsert=True))
+
+        inserted[collection] = process[collection].bulk_write(operations, ordered=False).upserted_count
+
+    return inserted
+
+
+def normalize_subscriber_emails() -> int:
+    """
+    Lowercases the stored subscriber emails and merges subscribers whose emails only differed in case or
+    surrounding whitespace, then replaces a non-unique 'email' index with a unique one. The oldest subscriber is
+    kept and stays confirmed if any of the merged ones was.
+
+    Deletes documents, so it is only run explicitly (python -m src normalize-subscribers), never on startup.
+
+    Returns:
+        int: The number of removed duplicates.
+    """
+
+    # Group the subscribers by their normalized email, oldest first
+    groups = process.subscriber.aggregate([
+        {'$sort': {'datum_vnosa': 1}},
+        {'$group': {
+            '_id': {'$toLower': {'$trim': {'input': '$email'}}},
+            'ids': {'$push': '$_id'},
+            'emails': {'$addToSet': '$email'},
+            'confirmed': {'$max': '$confirmed'}
+        }},
+        {'$match': {'$expr': {'$or': [{'$gt': [{'$size': '$ids'}, 1]}, {'$ne': ['$emails', ['$_id']]}]}}}
+    ], allowDiskUse=True)
+
+    operations = []
+    duplicates = []
+    for group in groups:
+        keep, *others = group['ids']
+        fields = {'email': group['_id'], 'confirmed': bool(group['confirmed'])}
+        operations.append(UpdateOne({'_id': keep}, {'$set': fields}))
+        duplicates.extend(others)
+
+    # Remove the duplicates first, so the lowercased emails don't collide with them
+    if duplicates:
+        process.subscriber.delete_many({'_id': {'$in': duplicates}})
+    if operations:
+        process.subscriber.bulk_write(operations, ordered=False)
+
+    email_index = process.subscriber.index_information().get('email_1')
+    if email_index is not None and not email_index.get('unique'):
+        process.subscriber.drop_index('email_1')
+    process.subscriber.create_index('email', unique=True)
+
+    return len(duplicates)
+
+
+def ensure_indexes():
+    # Subscribers are matched by email on import. Databases with duplicate or mixed case emails (or the old
+    # non-unique index) have to be migrated first, the app doesn't start until then.
+    try:
+        process.subscriber.create_index('email', unique=True)
+    except OperationFailure as e:
+        raise RuntimeError('Cannot create the unique subscriber email index, run '
+                           '"python -m src normalize-subscribers" first') from e
+
+    # Expired refresh tokens are removed by MongoDB
+    process.refresh_token.create_index('expires_at', expireAfterSeconds=0)
+    process.refresh_token.create_index('family')
+    process.refresh_token.create_index('username')
+
+    # Revoked access tokens are kept only until they expire
+    process.revoked_token.create_index('exp', expireAfterSeconds=0)
+    process.revoked_token.create_index('datum_vnosa')
+
+    # Daily view buckets are upserted by document and day
+    process.view.create_index([('collection', 1), ('document', 1), ('day', 1)], unique=True)
+
+    # The feeds read the newest blogs, overall and per category
+    process.blog.create_index([('datum_vnosa', -1)])
+    process.blog.create_index([('kategorija', 1), ('datum_vnosa', -1)])
+
+    # Blogs listing a changed blog as related are updated with it
+    process.blog.create_index('related._id')
+
+    # Blog revisions are read by blog and number
+    process.blog_revision.create_index([('blog', 1), ('n', 1)])
 
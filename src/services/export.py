@@ -0,0 +1,107 @@
+import csv
+import datetime
+import io
+import tempfile
+from typing import Iterator
+
+from fastapi.responses import StreamingResponse
+from openpyxl import Workbook
+from pydantic import BaseModel
+from pymongo.collection import Collection
+
+from src.services import trusted
+
+# Rows written before the buffered CSV text is sent to the client
+CSV_ROWS_PER_CHUNK = 500
+
+# Size of the chunks the finished XLSX file is sent in
+XLSX_CHUNK_SIZE = 64 * 1024
+
+MEDIA_TYPES = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+}
+
+
+def _cell(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return value
+
+
+def stream_csv(documents: Iterator[dict], fields: list[str]) -> Iterator[bytes]:
+    """
+    Streams documents as CSV, a few hundred rows at a time, so memory doesn't grow with the number of documents.
+
+    Args:
+        documents (Iterator[dict]): The documents, usually a pymongo cursor.
+        fields (list[str]): The fields written as columns, in order.
+    """
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    # The BOM makes Excel open the file as UTF-8 (č, š, ž)
+    buffer.write('\ufeff')
+    writer.writerow(fields)
+
+    for index, document in enumerate(documents, start=1):
+        writer.writerow([_cell(document.get(field, '')) for field in fields])
+
+        if index % CSV_ROWS_PER_CHUNK == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue().encode()
+
+
+def stream_xlsx(documents: Iterator[dict], fields: list[str]) -> Iterator[bytes]:
+    """
+    Streams documents as an XLSX workbook.
+
+    The workbook is built with openpyxl's write-only mode, which writes rows to a temporary file instead of keeping
+    them in memory. An XLSX file is a zip archive that is only complete after the last row, so the download starts
+    once all rows are written.
+
+    Args:
+        documents (Iterator[dict]): The documents, usually a pymongo cursor.
+        fields (list[str]): The fields written as columns, in order.
+    """
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(fields)
+
+    for document in documents:
+        sheet.append([document.get(field) for field in fields])
+
+    with tempfile.TemporaryFile() as file:
+        workbook.save(file)
+        file.seek(0)
+        while chunk := file.read(XLSX_CHUNK_SIZE):
+            yield chunk
+
+
+def response(collection: Collection, model: type[BaseModel], file_format: str, name: str) -> StreamingResponse:
+    """
+    Builds a chunked download of all documents of a collection, read straight from a cursor.
+
+    Args:
+        collection (Collection): The collection to export.
+        model (type[BaseModel]): The domain model of the documents, its fields become the columns.
+        file_format (str): 'csv' or 'xlsx'.
+        name (str): The file name without the extension.
+    """
+
+    projection = trusted.projection(model)
+    cursor = collection.find({}, projection, batch_size=1000)
+
+    stream = stream_xlsx if file_format == 'xlsx' else stream_csv
+    today = datetime.date.today().isoformat()
+
+    return StreamingResponse(
+        stream(cursor, list(projection)),
+        media_type=MEDIA_TYPES[file_format],
+        headers={'Content-Disposition': f'attachment; filename="{name}-{today}.{file_format}"'}
+    )
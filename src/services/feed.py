@@ -0,0 +1,159 @@
+"""
+RSS and Atom feeds of the newest blogs, overall and per category.
+
+The feeds are kept as ready, compressed bytes with an ETag, so polling feed readers get a memory read or a 304.
+Writes only mark them dirty (see hooks.py), they are rebuilt by a background job a few seconds later and also
+every RESPONSE_CACHE_TTL seconds, to pick up writes handled by other workers. A rebuild reads only the newest
+SIZE blogs overall and of every category, with one indexed query each.
+"""
+
+import datetime
+import email.utils
+import time
+import xml.etree.ElementTree as ET
+
+from src import env
+from src.services import db, response_cache
+from src.services.response_cache import CacheEntry
+
+# Feed format -> media type
+FORMATS = {'rss': 'application/rss+xml', 'atom': 'application/atom+xml'}
+
+# Number of blogs in a feed
+SIZE = 20
+
+TITLE = 'Danilo Jezernik - Blog'
+
+# Rendered feeds by (format, category), None is the feed of all categories
+_feeds: dict[tuple[str, str | None], CacheEntry] = {}
+
+_dirty = True
+_rebuilt_at = 0.0
+
+
+def _link(blog: dict) -> str:
+    return f"{env.DOMAIN}/blog/{blog['_id']}"
+
+
+def _date(value: datetime.datetime) -> datetime.datetime:
+    # Dates are stored in local time without a timezone
+    return value.astimezone()
+
+
+def _render(root: ET.Element) -> bytes:
+    return ET.tostring(root, encoding='utf-8', xml_declaration=True)
+
+
+def render_rss(blogs: list[dict], kategorija: str | None = None) -> bytes:
+    """
+    Renders an RSS 2.0 feed of the blogs.
+    """
+
+    rss = ET.Element('rss', version='2.0')
+    channel = ET.SubElement(rss, 'channel')
+    ET.SubElement(channel, 'title').text = f'{TITLE} - {kategorija}' if kategorija else TITLE
+    ET.SubElement(channel, 'link').text = f'{env.DOMAIN}/blog'
+    ET.SubElement(channel, 'description').text = TITLE
+
+    if blogs:
+        ET.SubElement(channel, 'lastBuildDate').text = email.utils.format_datetime(_date(blogs[0]['datum_vnosa']))
+
+    for blog in blogs:
+        item = ET.SubElement(channel, 'item')
+        ET.SubElement(item, 'title').text = blog['title']
+        ET.SubElement(item, 'link').text = _link(blog)
+        ET.SubElement(item, 'guid', isPermaLink='true').text = _link(blog)
+        ET.SubElement(item, 'description').text = blog.get('podnaslov')
+        ET.SubElement(item, 'category').text = blog.get('kategorija')
+        ET.SubElement(item, 'pubDate').text = email.utils.format_datetime(_date(blog['datum_vnosa']))
+
+    return _render(rss)
+
+
+def render_atom(blogs: list[dict], kategorija: str | None = None) -> bytes:
+    """
+    Renders an Atom feed of the blogs.
+    """
+
+    feed = ET.Element('feed', xmlns='http://www.w3.org/2005/Atom')
+    ET.SubElement(feed, 'title').text = f'{TITLE} - {kategorija}' if kategorija else TITLE
+    ET.SubElement(feed, 'id').text = f'{env.DOMAIN}/blog' + (f'?kategorija={kategorija}' if kategorija else '')
+    ET.SubElement(feed, 'link', href=f'{env.DOMAIN}/blog')
+
+    updated = _date(blogs[0]['datum_vnosa']) if blogs else datetime.datetime.now().astimezone()
+    ET.SubElement(feed, 'updated').text = updated.isoformat()
+
+    for blog in blogs:
+        entry = ET.SubElement(feed, 'entry')
+        ET.SubElement(entry, 'title').text = blog['title']
+        ET.SubElement(entry, 'id').text = _link(blog)
+        ET.SubElement(entry, 'link', href=_link(blog))
+        ET.SubElement(entry, 'updated').text = _date(blog['datum_vnosa']).isoformat()
+        ET.SubElement(entry, 'summary').text = blog.get('podnaslov')
+        ET.SubElement(entry, 'category', term=blog.get('kategorija') or '')
+        ET.SubElement(ET.SubElement(entry, 'author'), 'name').text = 'Danilo Jezernik'
+
+    return _render(feed)
+
+
+def _newest() -> dict[str | None, list[dict]]:
+    # The newest blogs of all categories (None) and of every category, each read with a limited query
+    projection = {'title': 1, 'kategorija': 1, 'podnaslov': 1, 'datum_vnosa': 1}
+
+    groups = {None: list(db.process.blog.find({}, projection).sort('datum_vnosa', -1).limit(SIZE))}
+    for kategorija in db.process.blog.distinct('kategorija'):
+        query = {'kategorija': kategorija}
+        groups[kategorija] = list(db.process.blog.find(query, projection).sort('datum_vnosa', -1).limit(SIZE))
+
+    return groups
+
+
+def rebuild():
+    """
+    Renders all feeds from the newest blogs and replaces the served ones.
+    """
+
+    global _feeds, _dirty, _rebuilt_at
+
+    # Reset the flag first, so writes made while rendering trigger another rebuild
+    _dirty = False
+    _rebuilt_at = time.monotonic()
+
+    groups = _newest()
+
+    feeds = {}
+    for kategorija, group in groups.items():
+        for feed_format, render in (('rss', render_rss), ('atom', render_atom)):
+            body = render(group, kategorija)
+            headers = {'ETag': response_cache.etag(body), 'Cache-Control': 'public, max-age=300'}
+            feeds[(feed_format, kategorija)] = response_cache.build_entry(body, FORMATS[feed_format], headers)
+
+    _feeds = feeds
+
+
+def rebuild_if_dirty():
+    """
+    Background job: rebuilds the feeds after blogs were added, edited or deleted, or every RESPONSE_CACHE_TTL.
+    """
+
+    if _dirty or _rebuilt_at + env.RESPONSE_CACHE_TTL <= time.monotonic():
+        rebuild()
+
+
+def mark_dirty():
+    """
+    Marks the feeds as outdated, they are rebuilt by the background job.
+    """
+
+    global _dirty
+    _dirty = True
+
+
+def get(feed_format: str, kategorija: str | None = None) -> CacheEntry | None:
+    """
+    Returns the rendered feed, or None if there are no blogs in the category.
+    """
+
+    if not _feeds:
+        rebuild()
+    return _feeds.get((feed_format, kategorija))
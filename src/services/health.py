@@ -0,0 +1,86 @@
+"""
+Readiness checks of the dependencies (MongoDB and optionally the SMTP server).
+
+Results are cached for HEALTH_CACHE_SECONDS, so frequent load balancer probes don't add load, and concurrent
+probes share one check. A dependency that answers slower than HEALTH_MAX_LATENCY_MS is reported as degraded, so
+traffic can be moved away from the worker before requests start failing.
+"""
+
+import asyncio
+import smtplib
+import time
+from typing import Callable
+
+import pymongo
+
+from src import env
+from src.services import db
+
+# SMTP server used by emails.py
+SMTP_HOST = 'smtp.gmail.com'
+SMTP_PORT = 465
+
+_result: dict | None = None
+_checked_at = 0.0
+_lock = asyncio.Lock()
+
+
+def _mongo():
+    if db.client is None:
+        raise RuntimeError('Client is not connected')
+
+    # Bound the ping, so a stuck database fails the check instead of hanging the probe
+    with pymongo.timeout(env.HEALTH_TIMEOUT_SECONDS):
+        db.client.admin.command('ping')
+
+
+def _smtp():
+    with smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT, timeout=env.HEALTH_TIMEOUT_SECONDS) as smtp:
+        smtp.noop()
+
+
+def _check(check: Callable[[], None]) -> dict:
+    # Run one check and measure its latency
+    started = time.perf_counter()
+    try:
+        check()
+    except Exception as e:
+        return {'status': 'down', 'latency_ms': round((time.perf_counter() - started) * 1000, 1), 'error': str(e)}
+
+    latency = (time.perf_counter() - started) * 1000
+    status = 'degraded' if latency > env.HEALTH_MAX_LATENCY_MS else 'ok'
+    return {'status': status, 'latency_ms': round(latency, 1)}
+
+
+async def _check_all() -> dict:
+    checks = {'mongo': _mongo}
+    if env.HEALTH_CHECK_SMTP:
+        checks['smtp'] = _smtp
+
+    # The checks are blocking, run them in parallel in worker threads
+    results = await asyncio.gather(*(asyncio.to_thread(_check, check) for check in checks.values()))
+    dependencies = dict(zip(checks, results))
+
+    statuses = {result['status'] for result in results}
+    status = 'down' if 'down' in statuses else 'degraded' if 'degraded' in statuses else 'ok'
+
+    return {'status': status, 'checked_at': time.time(), 'dependencies': dependencies}
+
+
+async def readiness() -> dict:
+    """
+    Returns the (cached) result of the dependency checks.
+
+    Returns:
+        dict: 'status' is 'ok', 'degraded' or 'down', 'dependencies' holds the status and latency of every
+        dependency.
+    """
+
+    global _result, _checked_at
+
+    async with _lock:
+        if _result is None or _checked_at + env.HEALTH_CACHE_SECONDS <= time.monotonic():
+            _result = await _check_all()
+            _checked_at = time.monotonic()
+
+    return _result
@@ -0,0 +1,43 @@
+from src.services import response_cache, counts, stats, popular, related, feed, sitemap, snapshot, revisions
+
+
+def content_changed(collection: str, ids: list[str] | None = None, deleted: bool = False):
+    """
+    Called by the routes after documents of a collection were added, edited or deleted. Drops or refreshes
+    everything that was derived from the collection.
+
+    Args:
+        collection (str): The name of the collection that changed.
+        ids (list[str] | None): The IDs of the changed documents, None if unknown.
+        deleted (bool): True if the documents were deleted.
+    """
+
+    # Only the changed documents are reread for the sitemap
+    if collection in sitemap.SOURCES:
+        sitemap.changed(collection, ids)
+
+    # Public responses built from the collection are stale now
+    response_cache.invalidate(collection)
+
+    # The static snapshot is republished in the background
+    if collection in snapshot.SOURCES:
+        snapshot.mark_dirty()
+
+    # The number of documents may have changed
+    counts.invalidate(collection)
+
+    # The dashboard statistics are rebuilt in the background
+    if collection in stats.SOURCES:
+        stats.mark_dirty()
+
+    # The most viewed blogs are refetched and the related blogs recomputed in the background
+    if collection == 'blog':
+        popular.mark_dirty()
+        related.mark_dirty(ids)
+
+        # Feeds are rendered in the background, so feed readers only read them from memory
+        feed.mark_dirty()
+
+        # The history of deleted blogs is not needed anymore
+        if deleted and ids:
+            revisions.delete(ids)
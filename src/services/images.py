@@ -0,0 +1,210 @@
+"""
+Uploaded blog and book images.
+
+Uploads are streamed to disk in chunks while they are hashed, and stored as <sha256>.<ext> in MEDIA_DIR, so the
+same image uploaded twice is stored once and a name never changes its content. Images over Pillow's
+MAX_IMAGE_PIXELS (decompression bombs) are rejected before they are decoded. Smaller variants
+(<sha256>-<width>.<ext>) are generated with Pillow. Because the names are content addressed, images are served
+with immutable cache headers.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+from typing import BinaryIO, Iterator
+
+from PIL import Image, UnidentifiedImageError
+
+from src import env
+
+# Bytes read from the upload at once
+CHUNK_SIZE = 1024 * 1024
+
+# Widths of the generated variants, only widths smaller than the original are generated
+VARIANTS = (480, 960, 1920)
+
+# Pillow format -> file extension
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp', 'GIF': 'gif'}
+
+# Extension -> media type
+MEDIA_TYPES = {'jpg': 'image/jpeg', 'png': 'image/png', 'webp': 'image/webp', 'gif': 'image/gif'}
+
+# Content addressed image names, with an optional variant width
+NAME = re.compile(r'^[0-9a-f]{64}(-\d+)?\.(jpg|png|webp|gif)$')
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+def path(name: str) -> str | None:
+    """
+    Returns the path of a stored image, or None if the name is not a valid image name.
+    """
+
+    if not NAME.match(name):
+        return None
+    return os.path.join(env.MEDIA_DIR, name)
+
+
+def _variants(image: Image.Image, digest: str, extension: str, written: list[str]) -> dict[str, str]:
+    # Resize the decoded image to every smaller variant width, existing variants are reused. The paths of the
+    # variants written by this call are appended to written, so they can be removed if the upload fails.
+    variants = {}
+
+    for width in VARIANTS:
+        if width >= image.width:
+            continue
+
+        name = f'{digest}-{width}.{extension}'
+        target = os.path.join(env.MEDIA_DIR, name)
+
+        if not os.path.exists(target):
+            height = round(image.height * width / image.width)
+            resized = image.resize((width, height), Image.LANCZOS)
+
+            # Write to a unique temporary file first, so a half written variant is never served
+            with tempfile.NamedTemporaryFile(dir=env.MEDIA_DIR, suffix='.tmp', delete=False) as temporary:
+                try:
+                    resized.save(temporary, format=image.format, optimize=True)
+                except BaseException:
+                    temporary.close()
+                    os.remove(temporary.name)
+                    raise
+            os.replace(temporary.name, target)
+            written.append(target)
+
+        variants[str(width)] = name
+
+    return variants
+
+
+def save(file: BinaryIO) -> dict:
+    """
+    Stores an uploaded image and generates its variants.
+
+    IMAGE_MAX_BYTES is checked again while the file is read, for uploads sent without a Content-Length. By then
+    the server has already received the whole upload: the route rejects a too large Content-Length before the
+    body is read, and the proxy in front of the app should limit the body size too (nginx client_max_body_size).
+
+    Args:
+        file (BinaryIO): The uploaded file.
+
+    Returns:
+        dict: The stored name ('image'), the size of the original and the names of the variants by width.
+
+    Raises:
+        InvalidImage: If the file is too large or not a supported image.
+    """
+
+    os.makedirs(env.MEDIA_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+
+    # Stream the upload to a temporary file next to the images, hashing it on the way
+    with tempfile.NamedTemporaryFile(dir=env.MEDIA_DIR, suffix='.upload', delete=False) as temporary:
+        try:
+            while chunk := file.read(CHUNK_SIZE):
+                size += len(chunk)
+                if size > env.IMAGE_MAX_BYTES:
+                    raise InvalidImage(f'Image is larger than {env.IMAGE_MAX_BYTES} bytes')
+                digest.update(chunk)
+                temporary.write(chunk)
+        except BaseException:
+            temporary.close()
+            os.remove(temporary.name)
+            raise
+
+    # Variants written for this upload, removed again if it fails
+    written = []
+
+    try:
+        # Check that the file is a supported image before it gets a public name
+        with Image.open(temporary.name) as image:
+            image.verify()
+            image_format, width, height = image.format, image.width, image.height
+
+        # Pillow only warns below twice the limit, decoding such an image would still take gigabytes of memory
+        if Image.MAX_IMAGE_PIXELS and width * height > Image.MAX_IMAGE_PIXELS:
+            raise InvalidImage(f'Image is too large ({width}x{height} pixels)')
+
+        if image_format not in EXTENSIONS:
+            raise InvalidImage(f'Unsupported image format: {image_format}')
+
+        extension = EXTENSIONS[image_format]
+        name = f'{digest.hexdigest()}.{extension}'
+        target = os.path.join(env.MEDIA_DIR, name)
+
+        # verify() doesn't decode the pixel data (a truncated JPEG passes it), so decode the whole image and
+        # generate the variants before the original is published under its immutable name
+        with Image.open(temporary.name) as image:
+            image.load()
+            variants = _variants(image, digest.hexdigest(), extension, written)
+
+        # The same content has the same name, so a duplicate is simply dropped
+        if os.path.exists(target):
+            os.remove(temporary.name)
+        else:
+            os.replace(temporary.name, target)
+
+    except BaseException as e:
+        for leftover in [temporary.name, *written]:
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+        if isinstance(e, (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError)):
+            raise InvalidImage('File is not a valid image') from e
+        raise
+
+    return {
+        'image': name,
+        'width': width,
+        'height': height,
+        'variants': variants
+    }
+
+
+def parse_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """
+    Parses a single byte range ('bytes=start-end', 'bytes=start-' or 'bytes=-suffix').
+
+    Returns:
+        tuple[int, int] | None: The first and last byte (inclusive), None if there is no usable range header.
+
+    Raises:
+        ValueError: If the range can't be satisfied.
+    """
+
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+
+    start, _, end = header[len('bytes='):].strip().partition('-')
+    if not start.isdigit() and not end.isdigit():
+        return None
+
+    if not start:
+        # The last n bytes
+        first, last = max(size - int(end), 0), size - 1
+    else:
+        first, last = int(start), min(int(end), size - 1) if end.isdigit() else size - 1
+
+    if first > last or first >= size:
+        raise ValueError('Range not satisfiable')
+    return first, last
+
+
+def read_range(file_path: str, first: int, last: int) -> Iterator[bytes]:
+    """
+    Yields the bytes from first to last (inclusive) of a file in chunks.
+    """
+
+    with open(file_path, 'rb') as file:
+        file.seek(first)
+        remaining = last - first + 1
+        while remaining > 0:
+            chunk = file.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
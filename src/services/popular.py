@@ -0,0 +1,132 @@
+"""
+Most read blogs, overall and over the last 7 or 30 days.
+
+The view counts of every window are held in memory together with the top POPULAR_SIZE blog IDs. Counts only
+grow between two reloads, so after a flush of the view counters (see views.py) the new top is found among the
+old top and the blogs that were just viewed, without sorting every blog. The windows are reloaded from the
+database every POPULAR_RELOAD_SECONDS, which drops the days that fell out of them.
+"""
+
+import datetime
+import heapq
+import threading
+import time
+
+from src import env
+from src.domain.blog import Blog
+from src.services import db, trusted
+
+# Window name -> number of days, None means all time
+WINDOWS = {'all': None, '7d': 7, '30d': 30}
+
+# View counts per window: blog ID -> views
+_counts: dict[str, dict[str, int]] = {window: {} for window in WINDOWS}
+
+# IDs of the most viewed blogs per window, most viewed first
+_top: dict[str, list[str]] = {window: [] for window in WINDOWS}
+
+# Served results per window: blog documents with their views
+_results: dict[str, list[dict]] = {window: [] for window in WINDOWS}
+
+_lock = threading.Lock()
+_dirty = False
+_loaded_at = 0.0
+
+
+def _rank(window: str, candidates):
+    # Keep the most viewed of the candidates, ties are broken by ID so the order is stable
+    counts = _counts[window]
+    _top[window] = heapq.nlargest(env.POPULAR_SIZE, candidates, key=lambda _id: (counts[_id], _id))
+
+
+def _publish():
+    # Fetch the blogs of all windows with one query and replace the served results
+    ids = {_id for top in _top.values() for _id in top}
+    documents = {doc['_id']: doc for doc in trusted.find_many(db.process.blog, Blog, {'_id': {'$in': list(ids)}})}
+
+    for window, top in _top.items():
+        counts = _counts[window]
+        _results[window] = [{**documents[_id], 'views': counts[_id]} for _id in top if _id in documents]
+
+
+def load():
+    """
+    Loads the view counts of all windows from the database and rebuilds the top lists.
+    """
+
+    global _dirty, _loaded_at
+
+    counts = {'all': {doc['_id']: doc['views'] for doc in db.process.blog.find({'views': {'$gt': 0}}, {'views': 1})}}
+
+    today = datetime.datetime.combine(datetime.date.today(), datetime.time())
+    for window, days in WINDOWS.items():
+        if days is None:
+            continue
+
+        # Sum the daily buckets of the window, today included
+        pipeline = [
+            {'$match': {'collection': 'blog', 'day': {'$gte': today - datetime.timedelta(days=days - 1)}}},
+            {'$group': {'_id': '$document', 'views': {'$sum': '$count'}}}
+        ]
+        counts[window] = {row['_id']: row['views'] for row in db.process.view.aggregate(pipeline)}
+
+    with _lock:
+        _dirty = False
+        for window in WINDOWS:
+            _counts[window] = counts[window]
+            _rank(window, counts[window])
+        _publish()
+        _loaded_at = time.monotonic()
+
+
+def update(views: dict[str, int]):
+    """
+    Adds flushed blog views to every window and updates the top lists. Called by views.flush().
+
+    Args:
+        views (dict[str, int]): Blog ID -> number of new views.
+    """
+
+    if not views:
+        return
+
+    with _lock:
+        for window in WINDOWS:
+            counts = _counts[window]
+            for _id, count in views.items():
+                counts[_id] = counts.get(_id, 0) + count
+            _rank(window, set(_top[window]) | views.keys())
+        _publish()
+
+
+def mark_dirty():
+    """
+    Marks the served blogs as outdated after blogs were edited or deleted.
+    """
+
+    global _dirty
+    _dirty = True
+
+
+def refresh_if_due():
+    """
+    Background job: reloads the windows when they are older than POPULAR_RELOAD_SECONDS and refetches the blogs
+    after they changed.
+    """
+
+    global _dirty
+
+    if _loaded_at + env.POPULAR_RELOAD_SECONDS <= time.monotonic():
+        load()
+    elif _dirty:
+        with _lock:
+            _dirty = False
+            _publish()
+
+
+def get(window: str, limit: int) -> list[dict]:
+    """
+    Returns the most viewed blogs of a window from memory.
+    """
+
+    return _results[window][:limit]
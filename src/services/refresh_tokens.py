@@ -0,0 +1,99 @@
+import datetime
+import hashlib
+import secrets
+
+from pymongo import ReturnDocument
+
+from src import env
+from src.services import db
+
+
+def _digest(token: str) -> str:
+    """
+    Refresh tokens are stored only as their sha256 digest, so a database leak doesn't leak usable tokens.
+    """
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def issue(username: str, family: str | None = None) -> str:
+    """
+    Issues a new opaque refresh token for a user and stores it in the 'refresh_token' collection.
+
+    Args:
+        username (str): The user the token belongs to.
+        family (str | None): The rotation family of the token. A new family is started on every password login.
+
+    Returns:
+        str: The refresh token that is sent to the client.
+    """
+
+    token = secrets.token_urlsafe(32)
+    now = datetime.datetime.utcnow()
+
+    db.process.refresh_token.insert_one({
+        '_id': _digest(token),
+        'username': username,
+        'family': family or secrets.token_hex(16),
+        'revoked': False,
+        'datum_vnosa': now,
+        'expires_at': now + datetime.timedelta(days=env.REFRESH_TOKEN_EXPIRE_DAYS)
+    })
+
+    return token
+
+
+def rotate(token: str) -> tuple[str, str] | None:
+    """
+    Exchanges a refresh token for a new one. Every refresh token can be used only once.
+
+    Args:
+        token (str): The refresh token sent by the client.
+
+    Returns:
+        tuple[str, str] | None: The username and the new refresh token, or None if the token is unknown, expired or
+        was already used. Reusing an already rotated token revokes its whole family, because it means the token leaked.
+    """
+
+    # Atomically mark the token as used, so concurrent requests can't rotate it twice
+    document = db.process.refresh_token.find_one_and_update(
+        {'_id': _digest(token)},
+        {'$set': {'revoked': True}},
+        return_document=ReturnDocument.BEFORE
+    )
+
+    if document is None:
+        return None
+
+    if document['revoked']:
+        revoke_family(document['family'])
+        return None
+
+    if document['expires_at'] <= datetime.datetime.utcnow():
+        return None
+
+    return document['username'], issue(document['username'], document['family'])
+
+
+def revoke(token: str) -> bool:
+    """
+    Revokes a single refresh token, for example on logout.
+
+    Returns:
+        bool: True if the token was found and revoked, False otherwise.
+    """
+    result = db.process.refresh_token.update_one({'_id': _digest(token)}, {'$set': {'revoked': True}})
+    return result.modified_count > 0
+
+
+def revoke_family(family: str):
+    """
+    Revokes all refresh tokens issued from the same password login.
+    """
+    db.process.refresh_token.update_many({'family': family}, {'$set': {'revoked': True}})
+
+
+def revoke_all(username: str):
+    """
+    Revokes every refresh token of a user.
+    """
+    db.process.refresh_token.update_many({'username': username}, {'$set': {'revoked': True}})
@@ -0,0 +1,276 @@
+"""
+Related blogs, precomputed and stored on every blog as 'related'.
+
+Blogs are compared by the TF-IDF vectors of their title, subtitle and content (cosine similarity), blogs in the
+same 'kategorija' get a fixed boost. The vectors are kept in memory as an inverted index, capped to the top
+MAX_TERMS terms per blog and the top MAX_POSTINGS blogs per term, so the cost of ranking one blog doesn't grow
+with the number of blogs. After blogs were added, edited or deleted only those blogs, the blogs that list them as
+related and the blogs sharing terms with them are ranked again in the background. The whole index is rebuilt on
+startup and every FULL_REBUILD_SECONDS, which refreshes the IDF weights and picks up blogs changed by other
+workers. get_blog_by_id_public reads the related blogs with the blog itself.
+"""
+
+import bisect
+import heapq
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+from pymongo import UpdateOne
+
+from src.services import db, response_cache, snapshot
+
+# Number of related blogs stored on every blog
+SIZE = 4
+
+# Added to the similarity of blogs in the same category
+CATEGORY_BOOST = 0.2
+
+# How many times a term counts, depending on the field it is in
+FIELD_WEIGHTS = {'title': 3, 'podnaslov': 2, 'vsebina': 1}
+
+# Fields copied to the related blogs
+SUMMARY_FIELDS = ('_id', 'title', 'kategorija', 'podnaslov', 'image', 'datum_vnosa')
+
+# Terms kept per blog (the ones with the highest weight) and blogs kept per term (the ones it weighs most in)
+MAX_TERMS = 16
+MAX_POSTINGS = 32
+
+# Seconds between two full rebuilds
+FULL_REBUILD_SECONDS = 6 * 3600
+
+_TAGS = re.compile(r'<[^>]+>')
+_WORDS = re.compile(r'[^\W\d_]{3,}')
+
+# Summaries of all blogs: blog ID -> summary fields
+_summaries: dict[str, dict] = {}
+
+# Normalized TF-IDF vectors: blog ID -> {term: weight}
+_vectors: dict[str, dict[str, float]] = {}
+
+# Inverted index: term -> {blog ID: weight}
+_postings: dict[str, dict[str, float]] = defaultdict(dict)
+
+# Blog IDs per category, sorted
+_categories: dict[str, list[str]] = defaultdict(list)
+
+# Document frequencies and number of blogs of the last full rebuild, used for the IDF of changed blogs
+_document_frequency: Counter[str] = Counter()
+_total = 0
+
+# The index is only used by the background job, the lock guards the blogs marked by the routes
+_changed: set[str] = set()
+_full = True
+_rebuilt_at = 0.0
+_lock = threading.Lock()
+
+
+def _terms(blog: dict) -> Counter[str]:
+    # Weighted term frequencies of a blog, HTML tags are dropped from the content
+    terms = Counter()
+    for field, weight in FIELD_WEIGHTS.items():
+        text = _TAGS.sub(' ', blog.get(field) or '').lower()
+        for word in _WORDS.findall(text):
+            terms[word] += weight
+    return terms
+
+
+def _vector(terms: Counter[str]) -> dict[str, float]:
+    # Normalized TF-IDF vector of the MAX_TERMS terms with the highest weight, unknown terms count as rare
+    vector = {
+        term: (1 + math.log(count)) * math.log(max(_total, 1) / (_document_frequency[term] or 1))
+        for term, count in terms.items()
+    }
+
+    # Drop terms that are in every blog, they don't tell blogs apart
+    top = heapq.nlargest(MAX_TERMS, ((weight, term) for term, weight in vector.items() if weight > 0))
+
+    norm = math.sqrt(sum(weight * weight for weight, _ in top))
+    return {term: weight / norm for weight, term in top} if norm else {}
+
+
+def _add(blog: dict, vector: dict[str, float]):
+    # Adds a blog to the in-memory index
+    _id = blog['_id']
+    _summaries[_id] = {field: blog.get(field) for field in SUMMARY_FIELDS}
+    _vectors[_id] = vector
+    bisect.insort(_categories[blog.get('kategorija')], _id)
+
+    for term, weight in vector.items():
+        postings = _postings[term]
+        postings[_id] = weight
+
+        # Keep only the blogs the term weighs most in
+        if len(postings) > MAX_POSTINGS:
+            del postings[min(postings, key=postings.get)]
+
+
+def _remove(_id: str):
+    # Removes a blog from the in-memory index
+    summary = _summaries.pop(_id, None)
+    if summary is None:
+        return
+
+    for term in _vectors.pop(_id):
+        _postings[term].pop(_id, None)
+        if not _postings[term]:
+            del _postings[term]
+
+    ids = _categories[summary.get('kategorija')]
+    del ids[bisect.bisect_left(ids, _id)]
+
+
+def _neighbours(_id: str) -> set[str]:
+    # Blogs sharing at least one indexed term with the blog
+    return {other for term in _vectors[_id] for other in _postings.get(term, ())}
+
+
+def _rank(_id: str) -> list[dict]:
+    # Summaries of the blogs most similar to the blog, most similar first
+    kategorija = _summaries[_id].get('kategorija')
+
+    # Dot products of the normalized vectors are the cosine similarities
+    scores = defaultdict(float)
+    for term, weight in _vectors[_id].items():
+        for other, other_weight in _postings.get(term, {}).items():
+            scores[other] += weight * other_weight
+    scores.pop(_id, None)
+
+    same_category = _categories[kategorija]
+    for other in scores:
+        if _summaries[other]['kategorija'] == kategorija:
+            scores[other] += CATEGORY_BOOST
+
+    # Blogs of the same category sharing no term score only the boost, ties are broken by ID, so the first
+    # few IDs of the category are enough
+    for other in same_category[:SIZE + 1]:
+        if other != _id and other not in scores:
+            scores[other] = CATEGORY_BOOST
+
+    ranked = heapq.nsmallest(SIZE, scores.items(), key=lambda item: (-item[1], item[0]))
+    return [_summaries[other] for other, _ in ranked]
+
+
+def _write(ids, stored: dict[str, list | None]):
+    # Ranks the blogs again and writes the ones whose related blogs changed
+    operations = []
+    for _id in ids:
+        summaries = _rank(_id)
+        if summaries != stored.get(_id):
+            operations.append(UpdateOne({'_id': _id}, {'$set': {'related': summaries}}))
+
+    if operations:
+        db.process.blog.bulk_write(operations, ordered=False)
+
+        # Cached blog responses and the snapshot contain the old related blogs
+        response_cache.invalidate('blog')
+        snapshot.mark_dirty()
+
+
+def rebuild():
+    """
+    Rebuilds the index from all blogs and stores the related blogs of the blogs whose related blogs changed.
+    The blogs are read twice (document frequencies first, then the vectors), so their content is never all in
+    memory at once.
+    """
+
+    global _total, _rebuilt_at
+
+    projection = {field: 1 for field in (*SUMMARY_FIELDS, 'vsebina')}
+
+    document_frequency = Counter()
+    total = 0
+    for blog in db.process.blog.find({}, projection):
+        document_frequency.update(_terms(blog).keys())
+        total += 1
+
+    _document_frequency.clear()
+    _document_frequency.update(document_frequency)
+    _total = total
+    _summaries.clear()
+    _vectors.clear()
+    _postings.clear()
+    _categories.clear()
+
+    stored = {}
+    for blog in db.process.blog.find({}, {**projection, 'related': 1}):
+        stored[blog['_id']] = blog.get('related')
+        _add(blog, _vector(_terms(blog)))
+
+    _rebuilt_at = time.monotonic()
+
+    _write(list(_summaries), stored)
+
+
+def update(ids: set[str]):
+    """
+    Updates the index for the given blogs and stores the related blogs of the blogs affected by the change:
+    the blogs themselves, the blogs that list one of them as related and the blogs sharing terms with them.
+    """
+
+    projection = {field: 1 for field in (*SUMMARY_FIELDS, 'vsebina')}
+    blogs = list(db.process.blog.find({'_id': {'$in': list(ids)}}, projection))
+
+    # Blogs sharing terms with the old and the new version may move up or down
+    affected = {other for _id in ids if _id in _vectors for other in _neighbours(_id)}
+
+    for _id in ids:
+        _remove(_id)
+    for blog in blogs:
+        _add(blog, _vector(_terms(blog)))
+        affected |= _neighbours(blog['_id'])
+
+    # Blogs listing a changed blog have to show its new summary or drop it
+    referencing = db.process.blog.find({'related._id': {'$in': list(ids)}}, {'_id': 1})
+    affected |= {blog['_id'] for blog in referencing}
+    affected |= {_id for _id in ids if _id in _summaries}
+    affected &= _summaries.keys()
+
+    stored = {
+        blog['_id']: blog.get('related')
+        for blog in db.process.blog.find({'_id': {'$in': list(affected)}}, {'related': 1})
+    }
+
+    _write(affected, stored)
+
+
+def rebuild_if_dirty():
+    """
+    Background job: updates the related blogs after blogs were added, edited or deleted, and rebuilds them all
+    on startup and every FULL_REBUILD_SECONDS.
+    """
+
+    global _full, _changed
+
+    with _lock:
+        full = _full or time.monotonic() - _rebuilt_at > FULL_REBUILD_SECONDS
+        changed, _changed = _changed, set()
+        _full = False
+
+    # Changes made while computing trigger another update
+    try:
+        if full:
+            rebuild()
+        elif changed:
+            update(changed)
+    except Exception:
+        with _lock:
+            _full = _full or full
+            _changed |= changed
+        raise
+
+
+def mark_dirty(ids: list[str] | None = None):
+    """
+    Marks the related blogs of the given blogs as outdated, None means all blogs.
+    """
+
+    global _full
+
+    with _lock:
+        if ids is None:
+            _full = True
+        else:
+            _changed.update(ids)
@@ -0,0 +1,171 @@
+"""
+In-memory cache for public GET responses.
+
+Entries keep the rendered body together with its brotli and gzip encodings, so popular endpoints are served
+already compressed. Entries are dropped when the collection they were built from changes (see hooks.py) and
+expire after RESPONSE_CACHE_TTL seconds, so writes handled by other workers are picked up as well. At most
+RESPONSE_CACHE_SIZE entries are kept, the least recently used ones are evicted first.
+
+The key is the request path plus the parameters the route declares, so unknown query parameters can't be used
+to fill the cache.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable
+from urllib.parse import urlencode
+
+from fastapi import Request, Response
+
+from src import env
+from src.utils import compression
+
+
+@dataclass
+class CacheEntry:
+    body: bytes
+    media_type: str
+    headers: dict[str, str]
+    encoded: dict[str, bytes]
+    created: float
+
+
+# Cached responses by (namespace (collection name), key), least recently used first
+_entries: OrderedDict[tuple[str, str], CacheEntry] = OrderedDict()
+
+# Background jobs and threadpool routes invalidate entries while the event loop reads and stores them
+_lock = threading.Lock()
+
+
+def _expired(entry: CacheEntry, now: float) -> bool:
+    return entry.created + env.RESPONSE_CACHE_TTL <= now
+
+
+def get(namespace: str, key: str) -> CacheEntry | None:
+    """
+    Returns the cached entry, or None if there is none or it has expired.
+    """
+
+    with _lock:
+        entry = _entries.get((namespace, key))
+        if entry is None:
+            return None
+
+        if _expired(entry, time.monotonic()):
+            _entries.pop((namespace, key), None)
+            return None
+
+        # Mark the entry as recently used
+        _entries.move_to_end((namespace, key))
+        return entry
+
+
+def build_entry(body: bytes, media_type: str, headers: dict[str, str] | None = None, best: bool = True) -> CacheEntry:
+    """
+    Builds an entry for a rendered body, compressing it once.
+
+    Args:
+        best (bool): Use the best (slow) compression level. Bodies rendered in the background (feeds, sitemap) use
+            it, responses built while a request waits use the fast default level.
+    """
+
+    return CacheEntry(
+        body=body,
+        media_type=media_type,
+        headers=headers or {},
+        encoded=compression.compress(body, env.COMPRESSION_MIN_SIZE, best=best),
+        created=time.monotonic()
+    )
+
+
+def etag(body: bytes) -> str:
+    """
+    Returns a strong ETag for a body.
+    """
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def put(namespace: str, key: str, response: Response) -> CacheEntry:
+    """
+    Stores a response, compressing its body once with the fast compression level (the request is waiting).
+    Expired entries are dropped and the least recently used ones are evicted above RESPONSE_CACHE_SIZE.
+    """
+
+    headers = {name: value for name, value in response.headers.items() if name not in ('content-length', 'content-type')}
+
+    # Compress outside the lock, only the dict operations are guarded
+    entry = build_entry(response.body, response.media_type, headers, best=False)
+
+    with _lock:
+        _entries[(namespace, key)] = entry
+        _entries.move_to_end((namespace, key))
+
+        now = time.monotonic()
+        for cache_key in [cache_key for cache_key, cached_entry in _entries.items() if _expired(cached_entry, now)]:
+            del _entries[cache_key]
+
+        while len(_entries) > env.RESPONSE_CACHE_SIZE:
+            _entries.popitem(last=False)
+
+    return entry
+
+
+def invalidate(namespace: str):
+    """
+    Drops all cached responses built from a collection. Safe to call from any thread.
+    """
+    with _lock:
+        for cache_key in [cache_key for cache_key in _entries if cache_key[0] == namespace]:
+            del _entries[cache_key]
+
+
+def _matches(if_none_match: str | None, tag: str) -> bool:
+    # If-None-Match holds '*' or a list of (possibly weak) ETags
+    if not if_none_match:
+        return False
+    tags = {value.strip().removeprefix('W/') for value in if_none_match.split(',')}
+    return '*' in tags or tag in tags
+
+
+def respond(request: Request, entry: CacheEntry) -> Response:
+    """
+    Builds the response for a cached entry in the best encoding the client accepts.
+    """
+
+    headers = dict(entry.headers)
+    headers['Vary'] = 'Accept-Encoding'
+
+    # Clients that already have the body get an empty 304
+    if 'ETag' in headers and _matches(request.headers.get('if-none-match'), headers['ETag']):
+        return Response(status_code=304, headers=headers)
+
+    coding = compression.choose_encoding(request.headers.get('accept-encoding'), entry.encoded)
+    if coding is None:
+        return Response(entry.body, media_type=entry.media_type, headers=headers)
+
+    headers['Content-Encoding'] = coding
+    return Response(entry.encoded[coding], media_type=entry.media_type, headers=headers)
+
+
+def cached(request: Request, namespace: str, build: Callable[[], Response], **params) -> Response:
+    """
+    Returns the cached response for the request, building and caching it first if needed.
+
+    Args:
+        request (Request): The incoming request, its path is part of the cache key.
+        namespace (str): The collection the response is built from, used for invalidation.
+        build (Callable): Builds the response on a cache miss. Exceptions (for example 404) are not cached.
+        **params: The (validated) query parameters the route declares, they are the rest of the cache key. Other
+            query parameters are ignored.
+    """
+
+    key = request.url.path + '?' + urlencode(sorted(params.items()))
+
+    entry = get(namespace, key)
+    if entry is None:
+        entry = put(namespace, key, build())
+
+    return respond(request, entry)
@@ -0,0 +1,206 @@
+"""
+Revision history of blogs, stored as compressed deltas.
+
+Every edit that changes title, podnaslov or vsebina stores a revision in the 'blog_revision' collection.
+Revision n holds the line based diff from revision n-1 to n of those fields (zlib compressed JSON), every
+SNAPSHOT_EVERY-th revision holds the full fields instead. Revision 0 is the blog before its first edit. A
+revision is rebuilt from the nearest snapshot below it with a single query, and only the last MAX_REVISIONS
+revisions (rounded down to a snapshot) are kept.
+
+The blog stores the hash of its last versioned content ('revision_hash'). Writes that bypass update() (bulk
+edits, fixtures) change the content without a revision, so when the stored content doesn't match the hash
+anymore, the next revision is stored as a snapshot instead of a delta against content the chain never saw.
+"""
+
+import datetime
+import difflib
+import hashlib
+import json
+import zlib
+
+from pymongo import ReturnDocument
+
+from src.domain.blog import Blog
+from src.services import db, trusted
+
+# Versioned fields of a blog
+FIELDS = ('title', 'podnaslov', 'vsebina')
+
+# Every n-th revision stores the full fields
+SNAPSHOT_EVERY = 10
+
+# Number of revisions kept per blog
+MAX_REVISIONS = 50
+
+
+def _pack(data: dict) -> bytes:
+    return zlib.compress(json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode(), 9)
+
+
+def _unpack(data: bytes) -> dict:
+    return json.loads(zlib.decompress(data))
+
+
+def _content(blog: dict) -> dict:
+    # The versioned fields of a blog
+    return {field: blog.get(field) or '' for field in FIELDS}
+
+
+def _hash(content: dict) -> str:
+    return hashlib.sha256(json.dumps(content, ensure_ascii=False, sort_keys=True).encode()).hexdigest()
+
+
+def diff(old: str, new: str) -> list:
+    """
+    Returns the operations turning old into new: [start, end] copies lines of old, a string inserts text.
+    """
+
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+
+    operations = []
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            operations.append([i1, i2])
+        elif tag in ('replace', 'insert'):
+            operations.append(''.join(new_lines[j1:j2]))
+
+    return operations
+
+
+def patch(old: str, operations: list) -> str:
+    """
+    Applies the operations returned by diff() to old.
+    """
+
+    old_lines = old.splitlines(keepends=True)
+    return ''.join(
+        ''.join(old_lines[operation[0]:operation[1]]) if isinstance(operation, list) else operation
+        for operation in operations
+    )
+
+
+def _revision(blog_id: str, n: int, kind: str, data: dict, author: str | None) -> dict:
+    packed = _pack(data)
+    return {
+        '_id': f'{blog_id}:{n}',
+        'blog': blog_id,
+        'n': n,
+        'kind': kind,
+        'data': packed,
+        'size': len(packed),
+        'author': author,
+        'datum_vnosa': datetime.datetime.now()
+    }
+
+
+def update(blog_id: str, fields: dict, author: str | None = None) -> dict | None:
+    """
+    Sets the given fields on a blog and stores the new revision, if a versioned field was changed.
+
+    The current version is read first and the blog is only updated if it is still unchanged (the write filters
+    on the versioned fields and the revision number), otherwise both are repeated. So concurrent edits get
+    different numbers and every delta is computed against the content it is applied to. Edits that don't change
+    a versioned field don't store a revision.
+
+    Returns:
+        dict | None: The updated blog shaped like the Blog model, None if the blog doesn't exist.
+    """
+
+    projection = trusted.projection(Blog)
+
+    while True:
+        current = db.process.blog.find_one({'_id': blog_id}, {**{field: 1 for field in FIELDS},
+                                                              'revision': 1, 'revision_hash': 1})
+        if current is None:
+            return None
+
+        previous = _content(current)
+        content = {**previous, **{field: fields[field] or '' for field in FIELDS if field in fields}}
+        versioned = content != previous
+
+        update_query = {'$set': fields}
+        if versioned:
+            update_query = {'$set': {**fields, 'revision_hash': _hash(content)}, '$inc': {'revision': 1}}
+
+        # Only write if nobody changed the blog since it was read
+        unchanged = {'_id': blog_id, 'revision': current.get('revision'),
+                     **{field: current.get(field) for field in FIELDS}}
+
+        updated = db.process.blog.find_one_and_update(unchanged, update_query, projection=projection,
+                                                      return_document=ReturnDocument.AFTER)
+        if updated is not None:
+            break
+
+    if versioned:
+        # Content written past update() is not in the chain, so the hash of the last revision doesn't match it
+        n = (current.get('revision') or 0) + 1
+        intact = current.get('revision_hash') == _hash(previous)
+        _store(blog_id, n, previous, content, author, intact)
+
+    return updated
+
+
+def _store(blog_id: str, n: int, previous: dict, content: dict, author: str | None, intact: bool):
+    # Store revision n, and revision 0 (the original) on the first edit
+    revisions = []
+
+    if n == 1:
+        revisions.append(_revision(blog_id, 0, 'snapshot', previous, None))
+
+    # A delta needs the previous revision to be the previous content
+    if n % SNAPSHOT_EVERY == 0 or (n > 1 and not intact):
+        revisions.append(_revision(blog_id, n, 'snapshot', content, author))
+    else:
+        delta = {
+            field: diff(previous[field], content[field])
+            for field in FIELDS
+            if previous[field] != content[field]
+        }
+        revisions.append(_revision(blog_id, n, 'delta', delta, author))
+
+    db.process.blog_revision.insert_many(revisions, ordered=False)
+
+    # Drop the oldest revisions, the oldest kept one is always a snapshot
+    floor = (n - MAX_REVISIONS + 1) // SNAPSHOT_EVERY * SNAPSHOT_EVERY
+    if floor > 0:
+        db.process.blog_revision.delete_many({'blog': blog_id, 'n': {'$lt': floor}})
+
+
+def history(blog_id: str) -> list[dict]:
+    """
+    Returns the stored revisions of a blog without their content, newest first.
+    """
+
+    return list(db.process.blog_revision.find({'blog': blog_id}, {'_id': 0, 'data': 0, 'blog': 0}).sort('n', -1))
+
+
+def get(blog_id: str, n: int) -> dict | None:
+    """
+    Rebuilds revision n of a blog from the nearest snapshot, None if the revision is not stored.
+    """
+
+    base = n // SNAPSHOT_EVERY * SNAPSHOT_EVERY
+    revisions = list(db.process.blog_revision.find({'blog': blog_id, 'n': {'$gte': base, '$lte': n}}).sort('n', 1))
+
+    # The snapshot and all deltas up to n are needed
+    if len(revisions) != n - base + 1 or revisions[0]['kind'] != 'snapshot':
+        return None
+
+    # Start from the last snapshot, there are more than the regular ones after writes that bypassed update()
+    start = max(index for index, revision in enumerate(revisions) if revision['kind'] == 'snapshot')
+
+    content = _unpack(revisions[start]['data'])
+    for revision in revisions[start + 1:]:
+        for field, operations in _unpack(revision['data']).items():
+            content[field] = patch(content.get(field, ''), operations)
+
+    return {'n': n, **content, 'datum_vnosa': revisions[-1]['datum_vnosa']}
+
+
+def delete(blog_ids: list[str]):
+    """
+    Removes the revisions of deleted blogs.
+    """
+    db.process.blog_revision.delete_many({'blog': {'$in': blog_ids}})
@@ -0,0 +1,131 @@
+import datetime
+
+from src.services import db
+
+# Revoked access tokens: jti -> 'exp' of the token (unix time)
+_revoked_jtis: dict[str, float] = {}
+
+# Forced sign-outs: username -> unix time (whole seconds) up to which all tokens of the user are revoked
+_revoked_users: dict[str, float] = {}
+
+# 'datum_vnosa' of the newest revocation loaded from the database
+_synced_at: datetime.datetime | None = None
+
+# Revocations written by other workers can arrive slightly out of order, so each sync re-reads this window
+_SYNC_OVERLAP = datetime.timedelta(seconds=5)
+
+# Forced sign-outs are kept longer than any access token lives
+_USER_REVOCATION_LIFETIME = datetime.timedelta(days=1)
+
+
+def is_revoked(payload: dict) -> bool:
+    """
+    Checks if a decoded access token was revoked. Runs on every authenticated request, so it only does dict lookups
+    against the in-memory copy of the 'revoked_token' collection.
+
+    Args:
+        payload (dict): The decoded token.
+
+    Returns:
+        bool: True if the token itself or all tokens of its user were revoked.
+    """
+
+    if payload.get('jti') in _revoked_jtis:
+        return True
+
+    # 'iat' has whole seconds only, so tokens issued in the same second as the sign-out are revoked too
+    not_before = _revoked_users.get(payload.get('sub'))
+    return not_before is not None and payload.get('iat', 0) <= not_before
+
+
+def revoke_token(payload: dict) -> bool:
+    """
+    Revokes a single access token, for example on logout.
+
+    Args:
+        payload (dict): The decoded token. Tokens without 'jti' can't be revoked individually.
+
+    Returns:
+        bool: True if the token was revoked.
+    """
+
+    jti = payload.get('jti')
+    if jti is None:
+        return False
+
+    exp = datetime.datetime.utcfromtimestamp(payload['exp'])
+
+    db.process.revoked_token.update_one(
+        {'_id': jti},
+        {'$setOnInsert': {'kind': 'jti', 'exp': exp, 'datum_vnosa': datetime.datetime.utcnow()}},
+        upsert=True
+    )
+
+    # Apply locally right away, other workers pick it up on their next sync
+    _revoked_jtis[jti] = payload['exp']
+    return True
+
+
+def revoke_user(username: str):
+    """
+    Revokes all access tokens issued to a user until now (forced sign-out).
+
+    Token 'iat' claims have whole seconds only, so a token issued later in the same second (for example a re-login
+    right after the sign-out) is revoked as well and the user has to sign in again.
+
+    Args:
+        username (str): The user to sign out.
+    """
+
+    now = datetime.datetime.utcnow()
+    not_before = int(now.replace(tzinfo=datetime.timezone.utc).timestamp())
+
+    db.process.revoked_token.update_one(
+        {'_id': f'user:{username}'},
+        {'$set': {
+            'kind': 'user',
+            'username': username,
+            'not_before': not_before,
+            'exp': now + _USER_REVOCATION_LIFETIME,
+            'datum_vnosa': now
+        }},
+        upsert=True
+    )
+
+    _revoked_users[username] = not_before
+
+
+def sync():
+    """
+    Loads revocations written since the last sync (by this or other workers) into memory and forgets revocations
+    of tokens that have expired anyway.
+    """
+
+    global _synced_at
+
+    query = {}
+    if _synced_at is not None:
+        query['datum_vnosa'] = {'$gte': _synced_at - _SYNC_OVERLAP}
+
+    for document in db.process.revoked_token.find(query):
+        if document['kind'] == 'user':
+            _revoked_users[document['username']] = document['not_before']
+        else:
+            _revoked_jtis[document['_id']] = document['exp'].replace(tzinfo=datetime.timezone.utc).timestamp()
+
+        if _synced_at is None or document['datum_vnosa'] > _synced_at:
+            _synced_at = document['datum_vnosa']
+
+    if _synced_at is None:
+        _synced_at = datetime.datetime.utcnow()
+
+    # Expired tokens are rejected by jwt.decode, no need to remember them
+    # (list() copies the items atomically, requests may revoke tokens while this runs in a worker thread)
+    now = datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc).timestamp()
+    for jti, exp in list(_revoked_jtis.items()):
+        if exp <= now:
+            _revoked_jtis.pop(jti, None)
+
+    for username, not_before in list(_revoked_users.items()):
+        if not_before + _USER_REVOCATION_LIFETIME.total_seconds() <= now:
+            _revoked_users.pop(username, None)
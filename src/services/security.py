@@ -1,4 +1,5 @@
 # Import necessary modules and functions
+import uuid
 from datetime import datetime, timedelta
 
 from jose import JWTError, jwt
@@ -10,7 +11,7 @@ from fastapi import Depends, HTTPException, status
 from src import env
 from src.domain.user_in_db import UserInDB
 from src.domain.token_data import TokenData
-from src.services import db
+from src.services import db, token_cache, revocation
 
 # Initialize a password context with bcrypt hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -84,7 +85,7 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
 
     Behavior:
     - Calculates the expiration time for the token based on the provided expires_delta or defaults to 15 minutes if no expiration is provided.
-    - Updates the data dictionary with the expiration time.
+    - Updates the data dictionary with the expiration time, the issue time and a unique token ID (jti) used for revocation.
     - Encodes the updated data into a JWT using the jwt.encode function with the provided SECRET_KEY and ALGORITHM.
 
     Returns:
@@ -102,8 +103,8 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
         # If no expiration delta is provided, default to 15 minutes expiration
         expire = datetime.utcnow() + timedelta(minutes=60)
 
-    # Update the data with the expiration time
-    to_encode.update({"exp": expire})
+    # Update the data with the expiration time, issue time and token ID
+    to_encode.update({"exp": expire, "iat": datetime.utcnow(), "jti": uuid.uuid4().hex})
 
     # Encode the data into a JWT using the provided SECRET_KEY and algorithm
     encoded_jwt = jwt.encode(to_encode, env.SECRET_KEY, algorithm=env.ALGORITHM)
@@ -112,6 +113,35 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     return encoded_jwt
 
 
+def decode_token(token: str) -> dict:
+    """
+    Decodes and verifies a JWT, reusing the payload of tokens that were already verified.
+
+    Parameters:
+    - token (str): The encoded JWT.
+
+    Behavior:
+    - Looks up the sha256 digest of the token in the verified token cache and returns the cached payload on a hit.
+    - Otherwise verifies the token with jwt.decode and caches the payload until the token's 'exp'.
+    - Checks the payload against the in-memory revocation list.
+    - Raises JWTError if the token is invalid, expired or revoked.
+    """
+
+    # Tokens are sent hundreds of times during their lifetime, so skip the signature check if already verified
+    key = token_cache.digest(token)
+    payload = token_cache.get(key)
+
+    if payload is None:
+        payload = jwt.decode(token, env.SECRET_KEY, algorithms=[env.ALGORITHM])
+        token_cache.put(key, payload)
+
+    # Revoked tokens stay valid JWTs until 'exp', so check them on every request
+    if revocation.is_revoked(payload):
+        raise JWTError("Token has been revoked")
+
+    return payload
+
+
 async def get_payload(token: Annotated[str, Depends(oauth2_scheme)]):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -119,7 +149,7 @@ async def get_payload(token: Annotated[str, Depends(oauth2_scheme)]):
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, env.SECRET_KEY, algorithms=["HS256"])
+        payload = decode_token(token)
     except JWTError:
         raise credentials_exception
     return payload
@@ -145,8 +175,8 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
     )
 
     try:
-        # Decode the token and extract the username (subject)
-        payload = jwt.decode(token, env.SECRET_KEY, algorithms=[env.ALGORITHM])
+        # Decode the token (or reuse the already verified payload) and extract the username (subject)
+        payload = decode_token(token)
         username: str = payload.get("sub")
 
         if username is None:
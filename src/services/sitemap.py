@@ -0,0 +1,194 @@
+"""
+sitemap.xml of all blogs and books.
+
+The URLs and their last modification dates are kept in memory. Content changes (see hooks.py) only queue the
+changed IDs; a background job reads just those documents and re-renders the sitemap pages whose URLs changed.
+Above MAX_URLS URLs the sitemap is split into pages (/sitemap-1.xml, ...) and /sitemap.xml becomes a sitemap
+index. Rendered pages are kept precompressed (fast compression level, a full render of 100k URLs must stay
+cheap) and the whole map is reloaded every SITEMAP_RELOAD_SECONDS to pick up writes handled by other workers.
+
+Only the background job reads the database and renders, into locals that replace the served pages at the end.
+The lock only guards the queue of changed IDs, so queuing a change from a route never waits for a reload.
+"""
+
+import threading
+import time
+import xml.etree.ElementTree as ET
+
+from src import env
+from src.services import db, response_cache
+from src.services.response_cache import CacheEntry
+
+# Collections in the sitemap, the URL of a document is {DOMAIN}/{collection}/{_id}
+SOURCES = ('blog', 'book')
+
+# Maximum number of URLs in one sitemap file
+MAX_URLS = 50000
+
+NAMESPACE = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+# URL -> last modification date (YYYY-MM-DD)
+_lastmod: dict[str, str] = {}
+
+# Rendered pages: page number -> (URLs of the page, entry)
+_pages: dict[int, tuple[list[tuple[str, str]], CacheEntry]] = {}
+
+# Sitemap index, None while everything fits into one page
+_index: CacheEntry | None = None
+
+# Changed documents not applied yet: collection -> IDs, None means the whole collection
+_pending: dict[str, set[str] | None] = {}
+
+# Guards _pending, held only for a few dict operations
+_lock = threading.Lock()
+
+# Serializes loads and refreshes (the background job and the first get() of a worker)
+_refresh_lock = threading.Lock()
+_loaded_at = 0.0
+
+
+def _url(collection: str, _id: str = '') -> str:
+    return f'{env.DOMAIN}/{collection}/{_id}'
+
+
+def _entry(root: ET.Element) -> CacheEntry:
+    body = ET.tostring(root, encoding='utf-8', xml_declaration=True)
+    return response_cache.build_entry(body, 'application/xml', {'ETag': response_cache.etag(body)}, best=False)
+
+
+def _render_page(urls: list[tuple[str, str]]) -> CacheEntry:
+    urlset = ET.Element('urlset', xmlns=NAMESPACE)
+    for loc, lastmod in urls:
+        url = ET.SubElement(urlset, 'url')
+        ET.SubElement(url, 'loc').text = loc
+        ET.SubElement(url, 'lastmod').text = lastmod
+    return _entry(urlset)
+
+
+def _render_index(pages: dict[int, list[tuple[str, str]]]) -> CacheEntry:
+    index = ET.Element('sitemapindex', xmlns=NAMESPACE)
+    for number, urls in pages.items():
+        sitemap = ET.SubElement(index, 'sitemap')
+        ET.SubElement(sitemap, 'loc').text = f'{env.SITEMAP_URL}/sitemap-{number}.xml'
+        ET.SubElement(sitemap, 'lastmod').text = max(lastmod for _, lastmod in urls)
+    return _entry(index)
+
+
+def _render(lastmod: dict[str, str]):
+    # Split the sorted URLs into pages, only render the pages whose URLs changed and replace the served ones
+    global _pages, _index
+
+    urls = sorted(lastmod.items())
+    chunks = {number: urls[start:start + MAX_URLS] for number, start in enumerate(range(0, len(urls), MAX_URLS), 1)}
+
+    pages = {}
+    for number, chunk in (chunks or {1: []}).items():
+        previous = _pages.get(number)
+        pages[number] = previous if previous and previous[0] == chunk else (chunk, _render_page(chunk))
+
+    index = _render_index(chunks) if len(chunks) > 1 else None
+    _pages, _index = pages, index
+
+
+def _read(lastmod: dict[str, str], collection: str, query: dict):
+    # Store the last modification date of the matching documents
+    for doc in db.process[collection].find(query, {'datum_vnosa': 1}):
+        lastmod[_url(collection, doc['_id'])] = doc['datum_vnosa'].date().isoformat()
+
+
+def _take_pending() -> dict[str, set[str] | None]:
+    # Swap the queue, changes queued from now on go into the next run
+    global _pending
+    with _lock:
+        pending, _pending = _pending, {}
+    return pending
+
+
+def load():
+    """
+    Reads the URLs of all blogs and books and renders the sitemap.
+    """
+
+    global _lastmod, _loaded_at
+
+    with _refresh_lock:
+        # Everything is read again, so the queued changes are included
+        _take_pending()
+
+        lastmod = {}
+        for collection in SOURCES:
+            _read(lastmod, collection, {})
+        _render(lastmod)
+
+        _lastmod = lastmod
+        _loaded_at = time.monotonic()
+
+
+def changed(collection: str, ids: list[str] | None = None):
+    """
+    Queues changed documents of a collection, they are applied by the next run of the background job.
+
+    Args:
+        collection (str): The collection that changed.
+        ids (list[str] | None): The added, edited or deleted IDs, None if unknown.
+    """
+
+    with _lock:
+        if ids is None or collection in _pending and _pending[collection] is None:
+            _pending[collection] = None
+        else:
+            _pending.setdefault(collection, set()).update(ids)
+
+
+def refresh_if_due():
+    """
+    Background job: applies the queued changes, or reloads everything every SITEMAP_RELOAD_SECONDS.
+    """
+
+    if _loaded_at + env.SITEMAP_RELOAD_SECONDS <= time.monotonic():
+        load()
+        return
+
+    with _refresh_lock:
+        pending = _take_pending()
+        if not pending:
+            return
+
+        try:
+            # _lastmod is only used by the job, the served pages are replaced by _render()
+            for collection, ids in pending.items():
+                if ids is None:
+                    # Reread the whole collection
+                    prefix = _url(collection)
+                    for url in [url for url in _lastmod if url.startswith(prefix)]:
+                        del _lastmod[url]
+                    _read(_lastmod, collection, {})
+                else:
+                    # Deleted documents are not found again, so they drop out
+                    for _id in ids:
+                        _lastmod.pop(_url(collection, _id), None)
+                    _read(_lastmod, collection, {'_id': {'$in': list(ids)}})
+
+            _render(_lastmod)
+        except Exception:
+            # Queue the changes again, they are applied by the next run
+            for collection, ids in pending.items():
+                changed(collection, None if ids is None else list(ids))
+            raise
+
+
+def get(page: int | None = None) -> CacheEntry | None:
+    """
+    Returns /sitemap.xml (page None) or one page of a split sitemap, None if there is no such page.
+    """
+
+    if not _pages:
+        load()
+
+    if page is None:
+        return _index or _pages[1][1]
+
+    # Pages are only served separately when there is an index
+    if _index is None or page not in _pages:
+        return None
+    return _pages[page][1]
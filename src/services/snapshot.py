@@ -0,0 +1,147 @@
+"""
+Static JSON snapshots of the public blog and book endpoints.
+
+After blogs or books change (see hooks.py) a background job renders the public responses into a new release
+directory under SNAPSHOT_DIR and atomically points the 'current' symlink at it:
+
+    SNAPSHOT_DIR/current -> releases/<release>
+        blog/index.json     GET /blog/
+        blog/limited.json   GET /blog/limited/
+        blog/<_id>.json     GET /blog/<_id>
+        book/index.json     GET /book/
+        book/<_id>.json     GET /book/<_id>
+
+Every file also gets precompressed .br/.gz siblings, so a web server can send them without touching Python
+(see README.md). Snapshots are disabled while SNAPSHOT_DIR is not set.
+"""
+
+import datetime
+import os
+import re
+import shutil
+
+from src import env
+from src.domain.blog import Blog
+from src.domain.blog_detail import BlogDetail
+from src.domain.book import Book
+from src.services import db, trusted
+from src.utils import compression
+from src.utils.responses import FastJSONResponse
+
+# Collections in the snapshot
+SOURCES = ('blog', 'book')
+
+# Number of releases kept on disk, the current one included
+KEEP = 3
+
+# Default limit of GET /blog/limited/
+LIMITED = 4
+
+# File extensions of the precompressed siblings
+EXTENSIONS = {'br': '.br', 'gzip': '.gz'}
+
+_SAFE_ID = re.compile(r'^[\w-]+$')
+
+_dirty = True
+
+
+def enabled() -> bool:
+    return bool(env.SNAPSHOT_DIR)
+
+
+def _write(directory: str, name: str, content):
+    # Write the JSON body exactly as the route would send it, plus its compressed versions
+    body = FastJSONResponse(content).body
+    path = os.path.join(directory, name)
+
+    with open(path, 'wb') as file:
+        file.write(body)
+
+    for coding, encoded in compression.compress(body, env.COMPRESSION_MIN_SIZE, best=True).items():
+        with open(path + EXTENSIONS[coding], 'wb') as file:
+            file.write(encoded)
+
+
+def _render(release: str):
+    # Render all public endpoints into the release directory
+    blog_dir = os.path.join(release, 'blog')
+    book_dir = os.path.join(release, 'book')
+    os.makedirs(blog_dir)
+    os.makedirs(book_dir)
+
+    blogs = trusted.find_many(db.process.blog, Blog)
+    _write(blog_dir, 'index.json', blogs)
+    _write(blog_dir, 'limited.json', blogs[:LIMITED])
+
+    for blog in trusted.find_many(db.process.blog, BlogDetail):
+        if _SAFE_ID.match(blog['_id']):
+            blog.setdefault('related', [])
+            _write(blog_dir, f"{blog['_id']}.json", blog)
+
+    books = trusted.find_many(db.process.book, Book)
+    _write(book_dir, 'index.json', books)
+
+    for book in books:
+        if _SAFE_ID.match(book['_id']):
+            _write(book_dir, f"{book['_id']}.json", book)
+
+
+def _swap(name: str):
+    # Replace the 'current' symlink in one rename, so readers see either the old or the new release
+    link = os.path.join(env.SNAPSHOT_DIR, 'current')
+    temporary = f'{link}.{os.getpid()}'
+
+    if os.path.lexists(temporary):
+        os.remove(temporary)
+    os.symlink(os.path.join('releases', name), temporary)
+    os.replace(temporary, link)
+
+
+def _prune(releases: str, current: str):
+    # Remove the oldest releases, never the current one
+    names = sorted(os.listdir(releases), reverse=True)
+    for name in names[KEEP:]:
+        if name != current:
+            shutil.rmtree(os.path.join(releases, name), ignore_errors=True)
+
+
+def publish():
+    """
+    Renders a new release of the snapshot and makes it the current one.
+    """
+
+    global _dirty
+
+    # Reset the flag first, so changes made while rendering trigger another release
+    _dirty = False
+
+    releases = os.path.join(env.SNAPSHOT_DIR, 'releases')
+    name = f"{datetime.datetime.now().strftime('%Y%m%d%H%M%S%f')}-{os.getpid()}"
+    release = os.path.join(releases, name)
+
+    try:
+        _render(release)
+    except Exception:
+        shutil.rmtree(release, ignore_errors=True)
+        raise
+
+    _swap(name)
+    _prune(releases, name)
+
+
+def publish_if_dirty():
+    """
+    Background job: publishes a new release after blogs or books changed.
+    """
+
+    if _dirty:
+        publish()
+
+
+def mark_dirty():
+    """
+    Marks the snapshot as outdated.
+    """
+
+    global _dirty
+    _dirty = True
@@ -0,0 +1,132 @@
+"""
+Dashboard statistics (subscriber growth, confirmation rate, contact volume, posts per category).
+
+The figures are built with aggregation pipelines in the database, stored in the 'stats' collection and served
+from memory. They are rebuilt in the background shortly after a write (see hooks.py) and at least every
+STATS_REFRESH_SECONDS, so requests never run the pipelines themselves.
+"""
+
+import datetime
+import time
+
+from src import env
+from src.services import db
+
+# Collections the statistics are built from
+SOURCES = ('blog', 'book', 'contact', 'newsletter', 'subscriber')
+
+_snapshot: dict | None = None
+_dirty = True
+_refreshed_at = 0.0
+
+
+def _per_month(collection: str, extra: dict | None = None) -> list[dict]:
+    # Number of documents (and the extra sums) per month of 'datum_vnosa'
+    group = {'_id': {'$dateToString': {'format': '%Y-%m', 'date': '$datum_vnosa'}}, 'count': {'$sum': 1}}
+    group.update(extra or {})
+
+    pipeline = [{'$group': group}, {'$sort': {'_id': 1}}]
+    return [{'month': row.pop('_id'), **row} for row in db.process[collection].aggregate(pipeline)]
+
+
+def _per_field(collection: str, field: str) -> list[dict]:
+    # Number of documents per value of a field, most common first
+    pipeline = [{'$group': {'_id': f'${field}', 'count': {'$sum': 1}}}, {'$sort': {'count': -1, '_id': 1}}]
+    return [{field: row['_id'], 'count': row['count']} for row in db.process[collection].aggregate(pipeline)]
+
+
+def compute() -> dict:
+    """
+    Builds the statistics with aggregation pipelines and stores them in the 'stats' collection.
+    """
+
+    subscribers_per_month = _per_month('subscriber', {'confirmed': {'$sum': {'$cond': ['$confirmed', 1, 0]}}})
+
+    # Cumulative number of subscribers at the end of every month
+    subscriber_total = 0
+    for month in subscribers_per_month:
+        subscriber_total += month['count']
+        month['total'] = subscriber_total
+
+    confirmed = sum(month['confirmed'] for month in subscribers_per_month)
+    contacts_per_month = _per_month('contact')
+    blogs_per_category = _per_field('blog', 'kategorija')
+
+    document = {
+        '_id': 'dashboard',
+        'subscribers': {
+            'total': subscriber_total,
+            'confirmed': confirmed,
+            'confirmation_rate': round(confirmed / subscriber_total, 4) if subscriber_total else 0.0,
+            'per_month': subscribers_per_month
+        },
+        'contacts': {
+            'total': sum(month['count'] for month in contacts_per_month),
+            'per_month': contacts_per_month
+        },
+        'blogs': {
+            'total': sum(category['count'] for category in blogs_per_category),
+            'per_category': blogs_per_category
+        },
+        'books': {
+            'per_technology': _per_field('book', 'tehnologija')
+        },
+        'newsletters': {
+            'total': db.process.newsletter.estimated_document_count()
+        },
+        'datum_vnosa': datetime.datetime.now()
+    }
+
+    db.process.stats.replace_one({'_id': 'dashboard'}, document, upsert=True)
+    return document
+
+
+def refresh():
+    """
+    Rebuilds the statistics and replaces the in-memory copy.
+    """
+
+    global _snapshot, _dirty, _refreshed_at
+
+    # Reset the flag first, so writes that happen while computing trigger another refresh
+    _dirty = False
+    _snapshot = compute()
+    _refreshed_at = time.monotonic()
+
+
+def refresh_if_due():
+    """
+    Background job: rebuilds the statistics if a source collection changed or they are older than
+    STATS_REFRESH_SECONDS.
+    """
+
+    if _dirty or _refreshed_at + env.STATS_REFRESH_SECONDS <= time.monotonic():
+        refresh()
+
+
+def mark_dirty():
+    """
+    Marks the statistics as outdated, they are rebuilt by the next run of the background job.
+    """
+
+    global _dirty
+    _dirty = True
+
+
+def load():
+    """
+    Loads the last stored statistics into memory on startup, so the first requests don't wait for the pipelines.
+    """
+
+    global _snapshot
+    _snapshot = db.process.stats.find_one({'_id': 'dashboard'})
+
+
+def get() -> dict:
+    """
+    Returns the statistics from memory, building them first if there are none yet.
+    """
+
+    if _snapshot is None:
+        refresh()
+    return _snapshot
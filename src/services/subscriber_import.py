@@ -0,0 +1,242 @@
+import codecs
+import csv
+import datetime
+import re
+from typing import BinaryIO, Iterator
+
+import pandas as pd
+from bson import ObjectId
+from openpyxl import load_workbook
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from src.services import db
+
+# Simple syntax check, validating the domain of every address would make large imports take hours
+EMAIL_PATTERN = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+# Accepted column names (lowercase) for every subscriber field
+COLUMNS = {
+    'name': ('name', 'ime', 'first name', 'first_name'),
+    'surname': ('surname', 'priimek', 'last name', 'last_name'),
+    'email': ('email', 'e-mail', 'e-pošta', 'mail'),
+    'confirmed': ('confirmed', 'potrjen')
+}
+
+TRUE_VALUES = ('1', 'true', 'yes', 'y', 'da')
+
+# Encodings tried in order, Excel exports CSV files in cp1250 on Slovenian systems. latin-1 decodes any bytes.
+ENCODINGS = ('utf-8-sig', 'cp1250', 'latin-1')
+
+# Delimiters recognized in CSV files, Excel uses ';' on Slovenian systems
+DELIMITERS = ',;\t|'
+
+# Bytes of the file used to recognize the delimiter
+SAMPLE_SIZE = 64 * 1024
+
+
+class InvalidFile(ValueError):
+    pass
+
+
+def _encoding(file: BinaryIO) -> str:
+    # The first encoding that decodes the whole file, read in chunks
+    for encoding in ENCODINGS:
+        decoder = codecs.getincrementaldecoder(encoding)()
+        file.seek(0)
+        try:
+            while chunk := file.read(1024 * 1024):
+                decoder.decode(chunk)
+            decoder.decode(b'', final=True)
+        except UnicodeDecodeError:
+            continue
+        return encoding
+    raise InvalidFile('Unknown file encoding')
+
+
+def _check_header(header) -> list[str]:
+    # The column names of the first row, one of them must be an email column
+    names = [str(column).strip().lower() for column in header if column is not None]
+    if not any(name in COLUMNS['email'] for name in names):
+        raise InvalidFile(f"No email column, the first row must contain one of: {', '.join(COLUMNS['email'])}")
+    return names
+
+
+def _read_csv(file: BinaryIO, encoding: str, delimiter: str, chunk_size: int) -> Iterator[dict]:
+    # Read the file in chunks, so only one chunk is in memory at a time
+    for chunk in pd.read_csv(file, dtype=str, keep_default_na=False, encoding=encoding, sep=delimiter,
+                             chunksize=chunk_size):
+        yield from chunk.to_dict('records')
+
+
+def _open_csv(file: BinaryIO, chunk_size: int) -> Iterator[dict]:
+    # Recognize the encoding and the delimiter and check the header before any row is read
+    encoding = _encoding(file)
+
+    file.seek(0)
+    sample = file.read(SAMPLE_SIZE).decode(encoding, errors='ignore')
+    lines = sample.splitlines()
+    if not lines:
+        raise InvalidFile('The file is empty')
+
+    # A sample with a single column has no delimiter to recognize
+    try:
+        delimiter = csv.Sniffer().sniff('\n'.join(lines[:50]), delimiters=DELIMITERS).delimiter
+    except csv.Error:
+        delimiter = ','
+
+    _check_header(next(csv.reader([lines[0]], delimiter=delimiter)))
+
+    file.seek(0)
+    return _read_csv(file, encoding, delimiter, chunk_size)
+
+
+def _read_xlsx(workbook, header: list[str], rows) -> Iterator[dict]:
+    # Read-only mode streams the rows instead of loading the whole workbook
+    try:
+        for row in rows:
+            yield {column: '' if value is None else str(value) for column, value in zip(header, row)}
+    finally:
+        workbook.close()
+
+
+def _open_xlsx(file: BinaryIO) -> Iterator[dict]:
+    # Open the workbook and check the header before any row is read
+    try:
+        workbook = load_workbook(file, read_only=True, data_only=True)
+    except Exception as e:
+        raise InvalidFile('The file is not a valid XLSX workbook') from e
+
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(cell) if cell is not None else '' for cell in next(rows, ())]
+        _check_header(header)
+    except BaseException:
+        workbook.close()
+        raise
+
+    return _read_xlsx(workbook, header, rows)
+
+
+def read_rows(file: BinaryIO, filename: str, chunk_size: int = 1000) -> Iterator[dict]:
+    """
+    Streams the rows of a CSV or XLSX file as dicts keyed by the column names of the first row. The encoding
+    (UTF-8, cp1250 or latin-1) and the delimiter (',', ';', tab or '|') of a CSV file are recognized.
+
+    The file is checked before the rows are returned, so a caller can reject it before it starts a response.
+
+    Args:
+        file (BinaryIO): The file opened in binary mode.
+        filename (str): The name of the file, its extension decides the format.
+        chunk_size (int): The number of CSV rows read at a time.
+
+    Raises:
+        InvalidFile: If the file can't be read or has no email column.
+    """
+
+    if filename.lower().endswith(('.xlsx', '.xlsm')):
+        return _open_xlsx(file)
+    return _open_csv(file, chunk_size)
+
+
+def normalize(row: dict) -> dict | None:
+    """
+    Maps a row to the subscriber fields and normalizes the values.
+
+    Returns:
+        dict | None: The normalized subscriber fields, or None if the row has no valid email address.
+    """
+
+    values = {}
+    lowered = {str(column).strip().lower(): value for column, value in row.items()}
+    for field, names in COLUMNS.items():
+        values[field] = next((str(lowered[name]).strip() for name in names if name in lowered), '')
+
+    email = values['email'].lower()
+    if not EMAIL_PATTERN.match(email):
+        return None
+
+    return {
+        'name': ' '.join(values['name'].split()),
+        'surname': ' '.join(values['surname'].split()),
+        'email': email,
+        'confirmed': values['confirmed'].lower() in TRUE_VALUES
+    }
+
+
+def _write_batch(batch: dict[str, dict]) -> tuple[int, int]:
+    """
+    Upserts a batch of subscribers by email with a single unordered bulk write.
+
+    Returns:
+        tuple[int, int]: The number of inserted and updated subscribers.
+    """
+
+    now = datetime.datetime.now()
+    requests = [
+        UpdateOne(
+            {'email': email},
+            {
+                '$set': {'name': subscriber['name'], 'surname': subscriber['surname']},
+                '$setOnInsert': {
+                    '_id': str(ObjectId()),
+                    'confirmed': subscriber['confirmed'],
+                    'datum_vnosa': now
+                }
+            },
+            upsert=True
+        )
+        for email, subscriber in batch.items()
+    ]
+
+    try:
+        details = db.process.subscriber.bulk_write(requests, ordered=False).bulk_api_result
+    except BulkWriteError as e:
+        # A concurrent import inserted some of the emails first, the unique index rejected the duplicates
+        details = e.details
+
+    return details['nUpserted'], details['nModified']
+
+
+def import_rows(rows: Iterator[dict], batch_size: int = 1000) -> Iterator[dict]:
+    """
+    Validates the rows and upserts them into the 'subscriber' collection in batches. Existing subscribers
+    (matched by email) get their name and surname updated, their confirmation status is kept.
+
+    Args:
+        rows (Iterator[dict]): The rows, see read_rows().
+        batch_size (int): The number of subscribers written with one bulk write.
+
+    Returns:
+        Iterator[dict]: The progress after every batch, the last item has 'done' set to True.
+    """
+
+    progress = {'rows': 0, 'invalid': 0, 'inserted': 0, 'updated': 0, 'done': False}
+
+    # Subscribers of the current batch by email, so duplicates within a batch become one write
+    batch: dict[str, dict] = {}
+
+    for row in rows:
+        progress['rows'] += 1
+
+        subscriber = normalize(row)
+        if subscriber is None:
+            progress['invalid'] += 1
+            continue
+
+        batch[subscriber['email']] = subscriber
+
+        if len(batch) >= batch_size:
+            inserted, updated = _write_batch(batch)
+            progress['inserted'] += inserted
+            progress['updated'] += updated
+            batch = {}
+            yield dict(progress)
+
+    if batch:
+        inserted, updated = _write_batch(batch)
+        progress['inserted'] += inserted
+        progress['updated'] += updated
+
+    progress['done'] = True
+    yield dict(progress)
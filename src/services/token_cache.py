@@ -0,0 +1,76 @@
+import hashlib
+import time
+from collections import OrderedDict
+
+from src import env
+
+# Verified tokens: sha256(token) -> (decoded payload, exp timestamp or None)
+_cache: OrderedDict[bytes, tuple[dict, float | None]] = OrderedDict()
+
+
+def digest(token: str) -> bytes:
+    """
+    Returns the sha256 digest of a token, used as the cache key so raw tokens are never kept in memory.
+    """
+    return hashlib.sha256(token.encode()).digest()
+
+
+def get(key: bytes) -> dict | None:
+    """
+    Returns the cached payload of an already verified token.
+
+    Args:
+        key (bytes): Digest of the token, see digest().
+
+    Returns:
+        dict | None: The decoded payload, or None if the token is not cached or its 'exp' has passed.
+    """
+
+    entry = _cache.get(key)
+    if entry is None:
+        return None
+
+    payload, expires = entry
+
+    # Drop entries whose token has expired, jwt.decode will then raise ExpiredSignatureError
+    if expires is not None and expires <= time.time():
+        del _cache[key]
+        return None
+
+    # Mark the entry as recently used
+    _cache.move_to_end(key)
+    return payload
+
+
+def put(key: bytes, payload: dict):
+    """
+    Stores the payload of a verified token, evicting the least recently used entry when the cache is full.
+
+    Args:
+        key (bytes): Digest of the token, see digest().
+        payload (dict): The payload returned by jwt.decode.
+    """
+
+    if env.TOKEN_CACHE_SIZE <= 0:
+        return
+
+    exp = payload.get('exp')
+    _cache[key] = (payload, float(exp) if exp is not None else None)
+    _cache.move_to_end(key)
+
+    while len(_cache) > env.TOKEN_CACHE_SIZE:
+        _cache.popitem(last=False)
+
+
+def discard(key: bytes):
+    """
+    Removes a token from the cache.
+    """
+    _cache.pop(key, None)
+
+
+def clear():
+    """
+    Removes all tokens from the cache.
+    """
+    _cache.clear()
@@ -0,0 +1,56 @@
+"""
+Trusted reads for documents from our own collections.
+
+Everything in the collections was written through the domain models, so documents don't have to be validated
+again when they are read. These helpers return the raw documents (projected to the fields of the model) and the
+routes return them in a FastJSONResponse, which FastAPI sends as is, without validating the response model.
+"""
+
+from functools import lru_cache
+
+from pydantic import BaseModel
+from pymongo import ReturnDocument
+from pymongo.collection import Collection
+
+
+@lru_cache(maxsize=None)
+def _projection(model: type[BaseModel]) -> tuple[str, ...]:
+    # Aliases of the model fields ('_id' instead of 'id'), so documents look exactly like model.dict(by_alias=True)
+    return tuple(field.alias for field in model.__fields__.values())
+
+
+def projection(model: type[BaseModel]) -> dict:
+    """
+    Returns a MongoDB projection with only the fields of the model, so extra fields stored on the documents
+    (for example counters) are not sent to clients.
+    """
+    return {field: 1 for field in _projection(model)}
+
+
+def find_many(collection: Collection, model: type[BaseModel], query: dict | None = None, limit: int = 0) -> list[dict]:
+    """
+    Returns the documents matching the query as dicts shaped like the model, without validating them.
+
+    Args:
+        collection (Collection): The collection to read from.
+        model (type[BaseModel]): The domain model the documents were written with.
+        query (dict | None): The filter, all documents by default.
+        limit (int): The maximum number of documents, 0 means no limit.
+    """
+    return list(collection.find(query or {}, projection(model), limit=limit))
+
+
+def find_one(collection: Collection, model: type[BaseModel], query: dict) -> dict | None:
+    """
+    Returns the first document matching the query as a dict shaped like the model, or None if there is none.
+    """
+    return collection.find_one(query, projection(model))
+
+
+def update_one(collection: Collection, model: type[BaseModel], query: dict, fields: dict) -> dict | None:
+    """
+    Sets the given fields on the first document matching the query and returns the updated document shaped like
+    the model, in a single round-trip (find_one_and_update). Returns None if no document matches.
+    """
+    return collection.find_one_and_update(query, {'$set': fields}, projection=projection(model),
+                                          return_document=ReturnDocument.AFTER)
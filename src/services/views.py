@@ -0,0 +1,101 @@
+"""
+Buffered view counts of blog and book detail pages.
+
+Views are counted in memory and flushed every VIEW_FLUSH_SECONDS as one unordered bulk write per collection
+with write concern w=0: '$inc views' on the document itself and a daily bucket in the 'view' collection.
+Views of a failed flush are put back and written with the next one. The last flush on shutdown waits for the
+server to acknowledge the writes, so the counts survive a graceful shutdown. The read path only touches the
+in-memory counter.
+"""
+
+import datetime
+import threading
+from collections import Counter
+
+from pymongo import UpdateOne
+from pymongo.write_concern import WriteConcern
+
+from src.services import db, popular
+
+# Collections whose documents are counted
+COLLECTIONS = ('blog', 'book')
+
+# Views not yet written to the database: (collection, document ID, day) -> number of views
+_pending: Counter[tuple[str, str, datetime.datetime]] = Counter()
+
+# Views already written to the daily buckets, whose '$inc views' failed: (collection, document ID) -> number of views
+_unsummed: Counter[tuple[str, str]] = Counter()
+
+_lock = threading.Lock()
+
+
+def record(collection: str, _id: str):
+    """
+    Counts one view of a document.
+    """
+
+    day = datetime.datetime.combine(datetime.date.today(), datetime.time())
+    with _lock:
+        _pending[(collection, _id, day)] += 1
+
+
+def flush(acknowledged: bool = False):
+    """
+    Background job: writes the pending views to the database. If a write fails, the views that were not written
+    are put back and the error is raised.
+
+    Args:
+        acknowledged (bool): Wait for the server to acknowledge the writes (used on shutdown, before the client is
+            closed). Otherwise the writes are not acknowledged, as counts are not critical.
+    """
+
+    global _pending, _unsummed
+
+    # Swap the buffers, so views recorded during the write go into the next batch
+    with _lock:
+        if not _pending and not _unsummed:
+            return
+        pending, _pending = _pending, Counter()
+        unsummed, _unsummed = _unsummed, Counter()
+
+    # Sum the daily views per document, with the views left over from a failed flush
+    totals: dict[str, Counter[str]] = {collection: Counter() for collection in COLLECTIONS}
+    for (collection, _id), count in unsummed.items():
+        totals[collection][_id] += count
+    for (collection, _id, _), count in pending.items():
+        totals[collection][_id] += count
+
+    write_concern = WriteConcern() if acknowledged else WriteConcern(w=0)
+
+    # Write the daily buckets first, if that fails nothing was written and everything is put back
+    try:
+        if pending:
+            db.process.view.with_options(write_concern=write_concern).bulk_write([
+                UpdateOne({'collection': collection, 'document': _id, 'day': day}, {'$inc': {'count': count}},
+                          upsert=True)
+                for (collection, _id, day), count in pending.items()
+            ], ordered=False)
+    except Exception:
+        with _lock:
+            _pending.update(pending)
+            _unsummed.update(unsummed)
+        raise
+
+    for position, (collection, documents) in enumerate(totals.items()):
+        if not documents:
+            continue
+
+        try:
+            db.process[collection].with_options(write_concern=write_concern).bulk_write(
+                [UpdateOne({'_id': _id}, {'$inc': {'views': count}}) for _id, count in documents.items()],
+                ordered=False
+            )
+        except Exception:
+            # The buckets are written, only the totals of this and the remaining collections are put back
+            with _lock:
+                for name in COLLECTIONS[position:]:
+                    _unsummed.update({(name, _id): count for _id, count in totals[name].items()})
+            raise
+
+    # Update the most viewed blogs
+    popular.update(totals['blog'])
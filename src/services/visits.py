@@ -0,0 +1,55 @@
+"""
+Write-behind counter of visits to the start page.
+
+Visits are counted in memory per hour and flushed to the 'visit' collection as one batch of $inc upserts
+every VISIT_FLUSH_SECONDS, so recording a visit never waits on the database.
+"""
+
+import datetime
+import threading
+from collections import Counter
+
+from pymongo import UpdateOne
+
+from src.services import db
+
+# Visits not yet written to the database: start of the hour -> number of visits
+_pending: Counter[datetime.datetime] = Counter()
+_lock = threading.Lock()
+
+
+def record():
+    """
+    Counts one visit in the bucket of the current hour.
+    """
+
+    hour = datetime.datetime.now().replace(minute=0, second=0, microsecond=0)
+    with _lock:
+        _pending[hour] += 1
+
+
+def flush():
+    """
+    Background job: writes the pending visits to the database with a single unordered bulk write.
+    """
+
+    global _pending
+
+    # Swap the buffer, so visits recorded during the write go into the next batch
+    with _lock:
+        if not _pending:
+            return
+        pending, _pending = _pending, Counter()
+
+    operations = [
+        UpdateOne({'_id': hour}, {'$inc': {'count': count}}, upsert=True)
+        for hour, count in pending.items()
+    ]
+
+    try:
+        db.process.visit.bulk_write(operations, ordered=False)
+    except Exception:
+        # Put the visits back, they are written with the next flush
+        with _lock:
+            _pending.update(pending)
+        raise
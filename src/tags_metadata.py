@@ -43,5 +43,21 @@ tags_metadata = [
     {
         "name": "Comment",
         "description": "Route je namenjen pregledu prejetih komentarjev",
+    },
+    {
+        "name": "Admin",
+        "description": "Route je namenjen administraciji in statistiki strani",
+    },
+    {
+        "name": "Sitemap",
+        "description": "Sitemap vseh blogov in knjig za iskalnike",
+    },
+    {
+        "name": "Image",
+        "description": "Route je namenjen nalaganju in prikazu slik blogov in knjig",
+    },
+    {
+        "name": "Health",
+        "description": "Preverjanje delovanja (liveness) in pripravljenosti (readiness) za load balancer",
     }
 ]
@@ -0,0 +1,156 @@
+import gzip
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional, responses are then compressed with gzip only
+    brotli = None
+
+# Content types that are already compressed (images, archives,...) are sent as they are
+_COMPRESSIBLE_TYPES = ('application/json', 'application/xml', 'application/rss+xml', 'application/atom+xml',
+                       'application/javascript', 'text/')
+
+
+def is_compressible(content_type: str | None) -> bool:
+    return content_type is not None and content_type.startswith(_COMPRESSIBLE_TYPES)
+
+
+# Supported content-codings in order of preference
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def encode(body: bytes, coding: str, best: bool = False) -> bytes:
+    """
+    Compresses a body with the given content-coding ('br' or 'gzip').
+
+    Args:
+        body (bytes): The uncompressed body.
+        coding (str): The content-coding.
+        best (bool): Use the best (slowest) compression level, for bodies that are compressed once and sent many times.
+    """
+
+    if coding == 'br':
+        return brotli.compress(body, quality=11 if best else 4)
+    return gzip.compress(body, compresslevel=9 if best else 6)
+
+
+def compress(body: bytes, minimum_size: int, best: bool = False) -> dict[str, bytes]:
+    """
+    Compresses a response body with every supported encoding.
+
+    Args:
+        body (bytes): The uncompressed body.
+        minimum_size (int): Bodies smaller than this are not compressed, the headers would cost more than they save.
+        best (bool): Use the best (slowest) compression level.
+
+    Returns:
+        dict[str, bytes]: Encoded bodies by content-coding, empty if the body is too small.
+    """
+
+    if len(body) < minimum_size:
+        return {}
+
+    return {coding: encode(body, coding, best) for coding in ENCODINGS}
+
+
+def choose_encoding(accept_encoding: str | None, available) -> str | None:
+    """
+    Picks the content-coding to send, preferring brotli over gzip.
+
+    Args:
+        accept_encoding (str | None): The Accept-Encoding header of the request.
+        available: The encodings the response can be sent with.
+
+    Returns:
+        str | None: 'br', 'gzip' or None if the body has to be sent uncompressed.
+    """
+
+    if not accept_encoding:
+        return None
+
+    accepted = set()
+    refused = set()
+    for part in accept_encoding.split(','):
+        coding, _, params = part.strip().partition(';')
+        # Encodings with q=0 are explicitly refused by the client
+        if params.replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            refused.add(coding.strip().lower())
+        else:
+            accepted.add(coding.strip().lower())
+
+    # '*' stands for the encodings that are not named, a refused one stays refused
+    for coding in ('br', 'gzip'):
+        if coding in available and coding not in refused and (coding in accepted or '*' in accepted):
+            return coding
+
+    return None
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses with brotli or gzip, depending on the Accept-Encoding header of the request.
+
+    Only complete (non-streaming) responses larger than minimum_size with a text-like content type are compressed.
+    Responses that already have a Content-Encoding (for example precompressed cache entries) are sent as they are.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        coding = choose_encoding(Headers(scope=scope).get('accept-encoding'), ENCODINGS)
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Message | None = None
+        passthrough = False
+
+        async def send_wrapper(message: Message):
+            nonlocal start_message, passthrough
+
+            if message['type'] == 'http.response.start':
+                # Hold back the headers until we know if the body gets compressed
+                start_message = message
+                headers = Headers(raw=message['headers'])
+                passthrough = 'content-encoding' in headers or not is_compressible(headers.get('content-type'))
+                if passthrough:
+                    await send(message)
+                return
+
+            if message['type'] != 'http.response.body' or passthrough:
+                await send(message)
+                return
+
+            body = message.get('body', b'')
+
+            # Streaming responses are sent as they are
+            if message.get('more_body', False):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            headers = MutableHeaders(raw=start_message['headers'])
+
+            # Cached responses already vary on Accept-Encoding
+            vary = {value.strip().lower() for value in headers.get('vary', '').split(',')}
+            if 'accept-encoding' not in vary:
+                headers.add_vary_header('Accept-Encoding')
+
+            if len(body) >= self.minimum_size:
+                body = encode(body, coding)
+                headers['Content-Encoding'] = coding
+                headers['Content-Length'] = str(len(body))
+
+            await send(start_message)
+            await send({'type': 'http.response.body', 'body': body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,34 @@
+"""
+Imports subscribers from a CSV or XLSX file.
+
+Usage:
+    python -m src.utils.import_subscribers subscribers.csv [--batch-size 1000]
+"""
+
+import argparse
+
+from src.services import db, subscriber_import
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import subscribers from a CSV or XLSX file.')
+    parser.add_argument('file', help='path to the CSV or XLSX file, the first row must contain the column names')
+    parser.add_argument('--batch-size', type=int, default=1000, help='subscribers written with one bulk write')
+    args = parser.parse_args()
+
+    db.connect()
+
+    with open(args.file, 'rb') as file:
+        try:
+            rows = subscriber_import.read_rows(file, args.file, chunk_size=args.batch_size)
+        except subscriber_import.InvalidFile as e:
+            raise SystemExit(f'Cannot import {args.file}: {e}')
+        for progress in subscriber_import.import_rows(rows, batch_size=args.batch_size):
+            print(f"Rows: {progress['rows']}, inserted: {progress['inserted']}, updated: {progress['updated']}, "
+                  f"invalid: {progress['invalid']}")
+
+    print('Done! Subscribers have been imported')
+
+
+if __name__ == '__main__':
+    main()
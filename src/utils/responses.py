@@ -0,0 +1,37 @@
+from typing import Any
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional, fall back to the standard json encoder
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    """
+    Serializes the types orjson doesn't know natively (datetime, dict, list,... are handled by orjson itself).
+    """
+
+    if isinstance(obj, BaseModel):
+        return obj.dict(by_alias=True)
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson, which serializes dicts, lists, datetimes and Pydantic models natively.
+    Pydantic models are dumped by alias, so the output is the same as FastAPI's default ('_id' instead of 'id').
+
+    Falls back to the standard JSONResponse rendering if orjson is not installed.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(jsonable_encoder(content, by_alias=True))
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
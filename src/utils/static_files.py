@@ -0,0 +1,18 @@
+import os
+
+from starlette.responses import PlainTextResponse
+from starlette.staticfiles import StaticFiles
+from starlette.types import Receive, Scope, Send
+
+
+class OptionalStaticFiles(StaticFiles):
+    """
+    StaticFiles for a directory that may not exist yet, for example the snapshot before its first release is
+    published. Requests get a 404 until the directory exists, instead of the RuntimeError StaticFiles raises.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if self.directory is not None and not os.path.isdir(self.directory):
+            await PlainTextResponse('Not Found', status_code=404)(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
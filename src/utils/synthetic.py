@@ -0,0 +1,162 @@
+"""
+Deterministic synthetic data for load tests.
+
+Every batch of documents is generated from its own random.Random seeded with (seed, collection, batch), so the
+batches can be generated and written in parallel and the same seed always gives the same documents (including
+their IDs). Documents are written with unordered insert_many batches from a thread pool.
+
+Usage:
+    python -m src seed --blogs 100000 --subscribers 1000000 --seed 42
+"""
+
+import datetime
+import random
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from pymongo.errors import BulkWriteError
+
+from src.services import blog_render, db
+
+# Dates are spread over the three years before this day
+START = datetime.datetime(2022, 1, 1)
+SPAN_SECONDS = 3 * 365 * 24 * 60 * 60
+
+FIRST_NAMES = ('Ana', 'Maja', 'Nina', 'Eva', 'Sara', 'Petra', 'Katja', 'Tina', 'Luka', 'Jan', 'Marko', 'Žiga',
+               'Nejc', 'Rok', 'Matej', 'Danilo', 'Tilen', 'Gregor', 'Urška', 'Mojca')
+LAST_NAMES = ('Novak', 'Horvat', 'Kovačič', 'Krajnc', 'Zupančič', 'Potočnik', 'Kovač', 'Mlakar', 'Kos', 'Vidmar',
+              'Golob', 'Turk', 'Božič', 'Kralj', 'Korošec', 'Jezernik', 'Zupan', 'Bizjak', 'Hribar', 'Kavčič')
+DOMAINS = ('gmail.com', 'outlook.com', 'siol.net', 'yahoo.com', 'example.com')
+CATEGORIES = ('angular', 'python', 'typescript', 'fastapi', 'mongodb', 'docker', 'vue', 'javascript')
+TECHNOLOGIES = ('TypeScript', 'Angular', 'Vue', 'Python', 'FastAPI', 'MongoDB', 'Docker', 'JavaScript')
+WORDS = ('komponenta', 'storitev', 'podatki', 'aplikacija', 'strežnik', 'odjemalec', 'poizvedba', 'indeks',
+         'predpomnilnik', 'zmogljivost', 'testiranje', 'gradnja', 'namestitev', 'razvoj', 'knjižnica', 'modul',
+         'funkcija', 'razred', 'vmesnik', 'napaka', 'rešitev', 'primer', 'vzorec', 'arhitektura', 'varnost',
+         'prijava', 'žeton', 'uporabnik', 'obrazec', 'usmerjanje', 'signal', 'stanje', 'dogodek', 'zanka')
+
+# Emails are plain ASCII
+_ASCII = str.maketrans('čšžćđ', 'cszcd')
+
+
+def _id(rng: random.Random) -> str:
+    # 24 hex characters, like the ObjectId strings of the domain models
+    return f'{rng.getrandbits(96):024x}'
+
+
+def _date(rng: random.Random) -> datetime.datetime:
+    return START + datetime.timedelta(seconds=rng.randrange(SPAN_SECONDS))
+
+
+def _sentence(rng: random.Random, low: int = 6, high: int = 16) -> str:
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(low, high))).capitalize() + '.'
+
+
+def _paragraphs(rng: random.Random, count: int) -> str:
+    return '\n\n'.join(' '.join(_sentence(rng) for _ in range(rng.randint(3, 7))) for _ in range(count))
+
+
+def blog(rng: random.Random, index: int) -> dict:
+    document = {
+        '_id': _id(rng),
+        'title': _sentence(rng, 3, 7).rstrip('.'),
+        'kategorija': rng.choice(CATEGORIES),
+        'podnaslov': _sentence(rng),
+        'vsebina': _paragraphs(rng, rng.randint(3, 12)),
+        'image': f'blog-{index}.jpg',
+        'datum_vnosa': _date(rng)
+    }
+    return blog_render.with_rendered(document)
+
+
+def book(rng: random.Random, index: int) -> dict:
+    return {
+        '_id': _id(rng),
+        'naslov': _sentence(rng, 2, 5).rstrip('.'),
+        'podnaslov': _sentence(rng),
+        'tehnologija': rng.choice(TECHNOLOGIES),
+        'vsebina': _paragraphs(rng, rng.randint(1, 4)),
+        'image': f'book-{index}.jpg',
+        'datum_vnosa': _date(rng)
+    }
+
+
+def _person(rng: random.Random, index: int) -> dict:
+    name, surname = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+
+    # The index keeps the emails unique
+    email = f'{name}.{surname}.{index}@{rng.choice(DOMAINS)}'.lower().translate(_ASCII)
+    return {'name': name, 'surname': surname, 'email': email}
+
+
+def subscriber(rng: random.Random, index: int) -> dict:
+    return {'_id': _id(rng), **_person(rng, index), 'confirmed': rng.random() < 0.7, 'datum_vnosa': _date(rng)}
+
+
+def contact(rng: random.Random, index: int) -> dict:
+    return {'_id': _id(rng), **_person(rng, index), 'message': _paragraphs(rng, 1), 'datum_vnosa': _date(rng)}
+
+
+def newsletter(rng: random.Random, index: int) -> dict:
+    return {
+        '_id': _id(rng),
+        'title': _sentence(rng, 3, 6).rstrip('.'),
+        'content': _paragraphs(rng, rng.randint(2, 6)),
+        'datum_vnosa': _date(rng)
+    }
+
+
+# Collection -> generator of one document
+GENERATORS: dict[str, Callable[[random.Random, int], dict]] = {
+    'blog': blog,
+    'book': book,
+    'subscriber': subscriber,
+    'contact': contact,
+    'newsletter': newsletter
+}
+
+
+def generate(collection: str, seed: int, batch: int, start: int, size: int) -> list[dict]:
+    """
+    Returns the documents start..start+size of a collection, always the same for the same seed and batch.
+    """
+
+    rng = random.Random(f'{seed}:{collection}:{batch}')
+    return [GENERATORS[collection](rng, index) for index in range(start, start + size)]
+
+
+def _insert_batch(collection: str, seed: int, batch: int, start: int, size: int) -> int:
+    documents = generate(collection, seed, batch, start, size)
+    try:
+        return len(db.process[collection].insert_many(documents, ordered=False).inserted_ids)
+    except BulkWriteError as e:
+        # Documents of an earlier run with the same seed have the same IDs and are skipped
+        return e.details['nInserted']
+
+
+def insert(collection: str, count: int, seed: int = 42, batch_size: int = 10000, workers: int = 4) -> int:
+    """
+    Generates and inserts count documents into a collection with parallel unordered insert_many batches.
+
+    Args:
+        collection (str): One of GENERATORS.
+        count (int): The number of documents.
+        seed (int): The seed, the same seed gives the same documents.
+        batch_size (int): The number of documents per insert_many.
+        workers (int): The number of batches generated and written at the same time.
+
+    Returns:
+        int: The number of inserted documents.
+    """
+
+    batches = [(batch, start, min(batch_size, count - start)) for batch, start in
+               enumerate(range(0, count, batch_size))]
+    inserted = 0
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_insert_batch, collection, seed, *batch) for batch in batches]
+        for future in futures:
+            inserted += future.result()
+            print(f'{collection}: {inserted}/{count}', end='\r', flush=True)
+
+    print(f'{collection}: {inserted}/{count} inserted')
+    return inserted
@@ -0,0 +1,23 @@
+import os
+
+import mongomock
+import pytest
+
+# src.env reads these on import, the tests never connect to a server
+os.environ.setdefault('PORT', '8000')
+os.environ.setdefault('DB_MAIN', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_PROCESS', 'test')
+os.environ.setdefault('ALGORITHM', 'HS256')
+os.environ.setdefault('SECRET_KEY', 'test')
+
+from src.services import db  # noqa: E402
+
+
+@pytest.fixture
+def database(monkeypatch):
+    """
+    Replaces the process database with an in-memory mongomock database.
+    """
+    database = mongomock.MongoClient().get_database('test')
+    monkeypatch.setattr(db, 'process', database)
+    return database
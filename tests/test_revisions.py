@@ -0,0 +1,143 @@
+import pytest
+
+from src.services import revisions
+
+BLOG_ID = 'blog'
+
+
+def _content(i: int) -> dict:
+    # Versioned fields of edit i, every edit changes some lines and keeps the others
+    return {
+        'title': f'Naslov {i // 3}',
+        'podnaslov': 'Podnaslov',
+        'vsebina': ''.join(f'<p>Odstavek {line}: {i if line % 4 == i % 4 else 0}</p>\n' for line in range(12))
+    }
+
+
+def _edit(start: int, stop: int) -> list[dict]:
+    # Makes the edits start..stop-1 through update() and returns their content
+    contents = []
+    for i in range(start, stop):
+        revisions.update(BLOG_ID, _content(i), author='admin')
+        contents.append(_content(i))
+    return contents
+
+
+def _get(n: int) -> dict | None:
+    # Revision n without its date
+    revision = revisions.get(BLOG_ID, n)
+    if revision is None:
+        return None
+    return {field: value for field, value in revision.items() if field != 'datum_vnosa'}
+
+
+def _kinds(database) -> dict[int, str]:
+    # Stored revisions: n -> 'snapshot' or 'delta'
+    return {revision['n']: revision['kind'] for revision in database.blog_revision.find({'blog': BLOG_ID})}
+
+
+@pytest.fixture
+def blog(database):
+    database.blog.insert_one({'_id': BLOG_ID, **_content(0)})
+    return database.blog
+
+
+@pytest.mark.parametrize('old, new', [
+    ('', ''),
+    ('', 'nova vrstica\n'),
+    ('stara vrstica\n', ''),
+    ('a\nb\nc\n', 'a\nb\nc\n'),
+    ('a\nb\nc\n', 'a\nx\nc\n'),
+    ('a\nb\nc\n', 'z\na\nb\nc\nd\n'),
+    ('a\nb\nc\nd\n', 'b\nd\n'),
+    ('brez nove vrstice na koncu', 'brez nove vrstice na koncu\nin še ena'),
+    ('a\r\nb\r\n', 'a\r\nč\r\nb\r\n'),
+])
+def test_patch_applies_diff(old, new):
+    assert revisions.patch(old, revisions.diff(old, new)) == new
+
+
+def test_diff_copies_unchanged_lines():
+    old = ''.join(f'vrstica {i}\n' for i in range(100))
+    new = old.replace('vrstica 50\n', 'spremenjena\n')
+
+    assert revisions.diff(old, new) == [[0, 50], 'spremenjena\n', [51, 100]]
+
+
+def test_get_across_snapshots(database, blog):
+    contents = [_content(0), *_edit(1, 26)]
+
+    kinds = _kinds(database)
+    assert sorted(n for n, kind in kinds.items() if kind == 'snapshot') == [0, 10, 20]
+    assert len(kinds) == 26
+
+    for n, content in enumerate(contents):
+        assert _get(n) == {'n': n, **content}
+
+    assert _get(26) is None
+    assert blog.find_one({'_id': BLOG_ID})['revision'] == 25
+
+
+def test_get_after_pruning(database, blog):
+    contents = [_content(0), *_edit(1, 66)]
+
+    # The oldest kept revision is the snapshot at or below the 50th newest one
+    floor = (65 - revisions.MAX_REVISIONS + 1) // revisions.SNAPSHOT_EVERY * revisions.SNAPSHOT_EVERY
+    assert min(_kinds(database)) == floor == 10
+
+    for n in range(floor):
+        assert _get(n) is None
+    for n in range(floor, 66):
+        assert _get(n) == {'n': n, **contents[n]}
+
+
+def test_get_missing_delta(database, blog):
+    _edit(1, 15)
+    database.blog_revision.delete_one({'blog': BLOG_ID, 'n': 12})
+
+    # Revisions after a missing delta can't be rebuilt, the ones before it still can
+    assert _get(11) == {'n': 11, **_content(11)}
+    assert _get(12) is None
+    assert _get(14) is None
+
+
+def test_update_without_changes_skips_revision(database, blog):
+    _edit(1, 3)
+
+    # The same content and a field that is not versioned
+    revisions.update(BLOG_ID, _content(2), author='admin')
+    updated = revisions.update(BLOG_ID, {'image': 'nova.jpg'}, author='admin')
+
+    assert updated['image'] == 'nova.jpg'
+    assert blog.find_one({'_id': BLOG_ID})['revision'] == 2
+    assert sorted(_kinds(database)) == [0, 1, 2]
+
+
+def test_update_missing_blog(database):
+    assert revisions.update('missing', {'title': 'Naslov'}) is None
+    assert database.blog_revision.count_documents({}) == 0
+
+
+def test_write_outside_chain_stores_snapshot(database, blog):
+    _edit(1, 4)
+
+    # A write that bypasses update(), the chain never saw this content
+    blog.update_one({'_id': BLOG_ID}, {'$set': {'vsebina': 'Vsebina iz uvoza\n'}})
+    _edit(4, 6)
+
+    kinds = _kinds(database)
+    assert kinds[4] == 'snapshot'
+    assert kinds[5] == 'delta'
+
+    for n in range(6):
+        assert _get(n) == {'n': n, **_content(n)}
+
+
+def test_write_outside_chain_before_first_edit(database, blog):
+    blog.update_one({'_id': BLOG_ID}, {'$set': {'title': 'Uvoženo'}})
+    _edit(1, 3)
+
+    # Revision 0 is the content the first edit replaced, so the first delta applies to it
+    assert _kinds(database) == {0: 'snapshot', 1: 'delta', 2: 'delta'}
+    assert _get(0) == {'n': 0, **_content(0), 'title': 'Uvoženo'}
+    assert _get(2) == {'n': 2, **_content(2)}